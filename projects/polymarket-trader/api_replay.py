@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Polymarket API Replay
+Local stand-in for the Gamma and CLOB REST APIs.
+
+In --record mode the server is a pass-through proxy to the live APIs that
+saves every response it relays under data/api_recordings. Otherwise it
+replays those recordings: /events, /markets, /markets/{id}, /price, /book and
+anything else that was captured, keyed by method, path, query and body.
+Paging past the recorded events (or markets) returns an empty page, so the
+scanner stops where the recording does; any other miss is a 404.
+
+Latency (with jitter), 5xx errors and per-API rate limits (429 with
+Retry-After) can be injected. The APIs are mounted under /gamma and /clob;
+point the client at them with the environment variables http_client reads:
+
+    POLYMARKET_GAMMA_API=http://127.0.0.1:9200/gamma \\
+    POLYMARKET_CLOB_API=http://127.0.0.1:9200/clob \\
+    POLYMARKET_RATE_LIMIT=1000 \\
+    python polymarket_trader.py --scan --full --workers 32
+
+Usage:
+    python api_replay.py --record                    # Record live responses through the proxy
+    python api_replay.py                             # Replay the recordings on 127.0.0.1:9200
+    python api_replay.py --latency 80 --jitter 30 --error-rate 0.02 --rate-limit 20,40
+    python api_replay.py --list                      # Summarize the recordings
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import requests
+
+from http_client import (DEFAULT_RATE_LIMIT, LIVE_CLOB_API, LIVE_GAMMA_API, RATE_LIMITS, TokenBucket,
+                         parse_rate_limit)
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+RECORDINGS_DIR = DATA_DIR / "api_recordings"
+
+REPLAY_PORT = 9200
+UPSTREAMS = {"gamma": LIVE_GAMMA_API, "clob": LIVE_CLOB_API}
+# Paginated list endpoints: a request past the recording gets an empty page
+LIST_PATHS = {("gamma", "/events"), ("gamma", "/markets")}
+ERROR_STATUSES = (500, 502, 503)
+UPSTREAM_TIMEOUT = 30
+
+# handler(query pairs, request body) -> (status, JSON-serializable payload)
+Handler = Callable[[list, bytes], tuple]
+
+
+def request_key(method: str, path: str, params=None, body: bytes = b"") -> str:
+    """
+    Recording key for a request. `params` is a dict (list values repeat the
+    key, as requests sends them) or a list of (key, value) pairs.
+    """
+    items = params.items() if isinstance(params, dict) else (params or [])
+    pairs = []
+    for name, value in items:
+        for v in value if isinstance(value, (list, tuple)) else [value]:
+            pairs.append((name, str(v)))
+    key = f"{method.upper()} {path}"
+    if pairs:
+        key += "?" + urlencode(sorted(pairs))
+    if body:
+        key += " #" + hashlib.sha1(body).hexdigest()
+    return key
+
+
+class Recordings:
+    """Responses on disk: <root>/<api>/index.jsonl plus one body file per request."""
+
+    def __init__(self, root: Path = RECORDINGS_DIR):
+        self.root = Path(root)
+        self._index = {}
+        self._lock = threading.Lock()
+        for api in UPSTREAMS:
+            index = self.root / api / "index.jsonl"
+            if not index.exists():
+                continue
+            with open(index) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    # Later lines win, so re-recording a request replaces it
+                    self._index[(api, entry["key"])] = entry
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def get(self, api: str, key: str) -> Optional[tuple]:
+        """(status, content type, body bytes), or None if never recorded."""
+        entry = self._index.get((api, key))
+        if entry is None:
+            return None
+        try:
+            body = (self.root / api / entry["file"]).read_bytes()
+        except OSError:
+            return None
+        return entry["status"], entry["content_type"], body
+
+    def put(self, api: str, key: str, status: int, body: bytes, content_type: str = "application/json"):
+        entry = {
+            "key": key,
+            "file": hashlib.sha1(key.encode()).hexdigest() + ".body",
+            "status": status,
+            "content_type": content_type,
+            "recorded_at": time.time(),
+        }
+        directory = self.root / api
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / entry["file"]).write_bytes(body)
+        with self._lock:
+            with open(directory / "index.jsonl", "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            self._index[(api, key)] = entry
+
+    def summary(self) -> dict:
+        """{api: {path: recorded requests}}."""
+        out = {}
+        for api, key in self._index:
+            path = re.sub(r"/\d+(?=/|$)", "/{id}", key.split(" ")[1].split("?")[0])
+            counts = out.setdefault(api, {})
+            counts[path] = counts.get(path, 0) + 1
+        return out
+
+
+class ApiReplayServer(ThreadingHTTPServer):
+    """Local stand-in for the Gamma and CLOB APIs; see the module docstring."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        recordings=None,
+        host: str = "127.0.0.1",
+        port: int = REPLAY_PORT,
+        record: bool = False,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: Optional[tuple] = None,
+        seed: Optional[int] = None,
+        handlers: Optional[dict] = None
+    ):
+        """
+        `latency` and `jitter` are seconds (mean and standard deviation per
+        response), `error_rate` is the share of requests answered with a 5xx,
+        and `rate_limit` is (requests per second, burst) per API. `handlers`
+        maps (method, api, path) to a Handler that answers instead of the
+        recordings, for responses computed from the request.
+        """
+        if not isinstance(recordings, Recordings):
+            recordings = Recordings(recordings or RECORDINGS_DIR)
+        self.recordings = recordings
+        self.record = record
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.handlers = handlers or {}
+        self.buckets = {api: TokenBucket(*rate_limit) for api in UPSTREAMS} if rate_limit else {}
+        self.rng = random.Random(seed)
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._upstream = requests.Session() if record else None
+        self._upstream_buckets = {
+            api: TokenBucket(*RATE_LIMITS.get(urlparse(url).netloc, DEFAULT_RATE_LIMIT)) for api, url in UPSTREAMS.items()
+        }
+        super().__init__((host, port), _ApiHandler)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def base_url(self, api: str) -> str:
+        return f"{self.url}/{api}"
+
+    def env(self) -> dict:
+        """Environment that points http_client at this server."""
+        return {"POLYMARKET_GAMMA_API": self.base_url("gamma"), "POLYMARKET_CLOB_API": self.base_url("clob")}
+
+    def start(self) -> "ApiReplayServer":
+        """Serve from a daemon thread."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def close(self):
+        self.shutdown()
+        self.server_close()
+        if self._upstream is not None:
+            self._upstream.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"recordings": len(self.recordings), **self.counters}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    def _draw(self) -> tuple:
+        """(latency to add, whether to fail) for one request."""
+        with self._lock:
+            delay = max(0.0, self.rng.gauss(self.latency, self.jitter)) if self.latency or self.jitter else 0.0
+            status = self.rng.choice(ERROR_STATUSES) if self.rng.random() < self.error_rate else None
+        return delay, status
+
+    # -- responses -----------------------------------------------------------
+
+    def respond(self, method: str, target: str, body: bytes = b"") -> tuple:
+        """Answer one request. Returns (status, headers, body bytes)."""
+        url = urlparse(target)
+        if url.path == "/_replay/stats":
+            return _json(200, self.stats())
+        api, _, path = url.path.lstrip("/").partition("/")
+        path = "/" + path
+        if api not in UPSTREAMS:
+            return _json(404, {"error": f"unknown API {api!r}; use /gamma or /clob"})
+        query = parse_qsl(url.query, keep_blank_values=True)
+        self._count("requests")
+
+        bucket = self.buckets.get(api)
+        if bucket is not None:
+            wait = bucket.try_acquire()
+            if wait:
+                self._count("rate_limited")
+                status, headers, payload = _json(429, {"error": "rate limited"})
+                headers["Retry-After"] = f"{wait:.3f}"
+                return status, headers, payload
+
+        delay, error = self._draw()
+        if delay:
+            time.sleep(delay)
+        if error:
+            self._count("injected_errors")
+            return _json(error, {"error": "injected failure"})
+
+        handler = self.handlers.get((method, api, path))
+        if handler is not None:
+            self._count("handled")
+            return _json(*handler(query, body))
+
+        key = request_key(method, path, query, body)
+        if self.record:
+            return self._forward(api, method, path, query, body, key)
+
+        hit = self.recordings.get(api, key)
+        if hit is not None:
+            self._count("hits")
+            status, content_type, payload = hit
+            return status, {"Content-Type": content_type}, payload
+
+        self._count("misses")
+        if method == "GET" and (api, path) in LIST_PATHS:
+            return _json(200, [])
+        return _json(404, {"error": f"no recording for {key}"})
+
+    def _forward(self, api: str, method: str, path: str, query: list, body: bytes, key: str) -> tuple:
+        self._upstream_buckets[api].acquire()
+        try:
+            resp = self._upstream.request(
+                method, UPSTREAMS[api] + path, params=query, data=body or None,
+                headers={"Content-Type": "application/json"} if body else None, timeout=UPSTREAM_TIMEOUT
+            )
+        except requests.RequestException as e:
+            self._count("upstream_errors")
+            return _json(502, {"error": f"upstream: {e}"})
+        content_type = resp.headers.get("Content-Type", "application/json")
+        # Transient upstream failures are passed on but never replayed
+        if resp.status_code < 500:
+            self.recordings.put(api, key, resp.status_code, resp.content, content_type)
+            self._count("recorded")
+        return resp.status_code, {"Content-Type": content_type}, resp.content
+
+
+def _json(status: int, payload) -> tuple:
+    return status, {"Content-Type": "application/json"}, json.dumps(payload).encode()
+
+
+class _ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _handle(self, method: str):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        status, headers, payload = self.server.respond(method, self.path, body)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Local record/replay stand-in for the Gamma and CLOB APIs")
+    parser.add_argument("--record", action="store_true", help="Proxy to the live APIs and record responses")
+    parser.add_argument("--dir", default=str(RECORDINGS_DIR), help="Recordings directory")
+    parser.add_argument("--port", type=int, default=REPLAY_PORT, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean added latency (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Latency standard deviation (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with a 5xx")
+    parser.add_argument("--rate-limit", metavar="RATE[,BURST]", help="Per-API limit; excess requests get 429")
+    parser.add_argument("--seed", type=int, help="Seed for injected latency and errors")
+    parser.add_argument("--list", action="store_true", help="Summarize the recordings and exit")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+
+    if args.list:
+        recordings = Recordings(args.dir)
+        print(f"{len(recordings)} recorded responses in {args.dir}")
+        for api, paths in sorted(recordings.summary().items()):
+            for path, count in sorted(paths.items()):
+                print(f"  {api:<6} {path:<30} {count:>7}")
+    else:
+        server = ApiReplayServer(
+            args.dir, port=args.port, record=args.record, latency=args.latency / 1000,
+            jitter=args.jitter / 1000, error_rate=args.error_rate, seed=args.seed,
+            rate_limit=parse_rate_limit(args.rate_limit) if args.rate_limit else None
+        )
+        mode = "Recording" if args.record else f"Replaying {len(server.recordings)} responses"
+        print(f"{mode} on {server.url}")
+        for name, value in server.env().items():
+            print(f"  export {name}={value}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+        print(json.dumps(server.stats(), indent=2))
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Polymarket Arbitrage Scanner
+Sum-of-prices checks across the markets of each event, over the whole
+universe in one vectorized pass.
+
+In a mutually exclusive (negRisk) event exactly one market resolves YES, so
+    buying every YES pays $1        -> edge = 1 - sum(YES asks)
+    buying every NO pays $(n - 1)   -> edge = (n - 1) - sum(NO asks)
+less the CLOB fee on each leg. Prices sit in the store's event-contiguous
+layout (event_index.EventLayout), so the per-event sums, costs, fees and
+touch depth are a handful of np.add.reduceat / np.minimum.reduceat calls
+however many events there are; only the hits become dicts.
+
+Legs are priced at the best ask from a fresh market_stream snapshot when
+there is one, else at the last scanned price ("last"), which only says the
+basket is worth checking on the book.
+
+Usage:
+    python arbitrage.py                          # Scan stored markets (+ live books)
+    python arbitrage.py --min-edge 0.01          # Only baskets with >= 1c edge per $1
+    python arbitrage.py --all-events             # Also report events not flagged exclusive
+    python arbitrage.py --watch 1                # Re-scan the live snapshot every second
+"""
+
+import json
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+import metrics
+from event_index import EventLayout
+from fill_simulator import FEE_RATE_BPS, fee_for
+from market_record import as_markets
+from market_store import get_store
+from market_stream import load_live_snapshot
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+ARBITRAGE_FILE = DATA_DIR / "arbitrage.json"
+
+# Edge per basket (in $ per basket share) worth reporting
+MIN_EDGE = 0.005
+TOP_K = 25
+
+
+def utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _column(rows: list, field: str) -> np.ndarray:
+    return np.fromiter((np.nan if m is None else getattr(m, field) for m in rows),
+                       dtype=np.float64, count=len(rows))
+
+
+class ArbitrageScanner:
+    """
+    Per-event basket arithmetic over an EventLayout.
+
+    Built once per layout; a tick overwrites the changed prices and asks in
+    place (apply_quotes / apply_books) and scan() reduces every event again.
+    Markets missing from `markets` are NaN, which leaves their event out;
+    unpriced() counts those events.
+    """
+
+    def __init__(self, layout: EventLayout, markets: dict):
+        self.layout = layout
+        self.markets = as_markets(markets)
+        rows = [self.markets.get(m) for m in layout.market_ids]
+        self.yes = _column(rows, "yes_price")
+        self.no = _column(rows, "no_price")
+        # Best ask and the size resting at it, per outcome; NaN until a book is seen
+        self.yes_ask = np.full(len(rows), np.nan)
+        self.no_ask = np.full(len(rows), np.nan)
+        self.yes_size = np.full(len(rows), np.nan)
+        self.no_size = np.full(len(rows), np.nan)
+        self.titles = [None] * len(layout)
+        self._tokens = {}
+        for i, m in enumerate(rows):
+            if m is None:
+                continue
+            if len(m.token_ids) >= 2:
+                self._tokens[m.token_ids[0]] = (i, True)
+                self._tokens[m.token_ids[1]] = (i, False)
+        for j, start in enumerate(layout.starts):
+            m = rows[start]
+            self.titles[j] = m.event_title if m is not None else None
+
+    def apply_quotes(self, quotes: dict):
+        """Overwrite last prices from {market_id: {"yes_price", "no_price"}} (live_quotes() shape)."""
+        rows = self.layout.rows
+        for market_id, quote in quotes.items():
+            i = rows.get(market_id)
+            if i is not None:
+                self.yes[i] = quote["yes_price"]
+                self.no[i] = quote["no_price"]
+
+    def apply_books(self, tokens: dict):
+        """Set best asks from {token_id: OrderBook.summary()}, as in a live snapshot's "tokens"."""
+        for token_id, top in tokens.items():
+            found = self._tokens.get(token_id)
+            if found is None:
+                continue
+            i, is_yes = found
+            ask = top.get("best_ask")
+            asks = top.get("asks") or ()
+            size = asks[0][1] if asks else np.nan
+            if is_yes:
+                self.yes_ask[i], self.yes_size[i] = (np.nan, np.nan) if ask is None else (ask, size)
+            else:
+                self.no_ask[i], self.no_size[i] = (np.nan, np.nan) if ask is None else (ask, size)
+
+    def apply_snapshot(self, snap: dict):
+        """Overlay a market_stream snapshot: mids for prices, books for asks."""
+        self.apply_quotes(snap.get("markets", {}))
+        self.apply_books(snap.get("tokens", {}))
+
+    def unpriced(self) -> int:
+        """Events left out of scans because a leg has no price."""
+        if not len(self.layout):
+            return 0
+        missing = np.isnan(self.yes) | np.isnan(self.no)
+        return int(np.logical_or.reduceat(missing, self.layout.starts).sum())
+
+    def sums(self, fee_rate_bps: float = FEE_RATE_BPS) -> dict:
+        """
+        Per-event arrays, aligned with layout.event_ids: YES/NO price sums,
+        basket costs (asks where quoted, else last prices, plus fees), edges,
+        whether every leg was priced off a book, and shares available at the
+        touch on the thinnest leg (NaN without books).
+        """
+        starts = self.layout.starts
+        out = {"yes_sum": np.add.reduceat(self.yes, starts), "no_sum": np.add.reduceat(self.no, starts)}
+        for side, last, ask, size in (("yes", self.yes, self.yes_ask, self.yes_size),
+                                      ("no", self.no, self.no_ask, self.no_size)):
+            quoted = ~np.isnan(ask)
+            price = np.where(quoted, ask, last)
+            out[f"{side}_cost"] = np.add.reduceat(price + fee_for(1, price, fee_rate_bps), starts)
+            out[f"{side}_booked"] = ~np.logical_or.reduceat(~quoted, starts)
+            out[f"{side}_depth"] = np.minimum.reduceat(size, starts)
+        out["yes_edge"] = 1 - out["yes_cost"]
+        out["no_edge"] = (self.layout.sizes - 1) - out["no_cost"]
+        return out
+
+    def scan(
+        self,
+        min_edge: float = MIN_EDGE,
+        top_k: Optional[int] = TOP_K,
+        exclusive_only: bool = True,
+        fee_rate_bps: float = FEE_RATE_BPS
+    ) -> list:
+        """Baskets with at least `min_edge`, best first. top_k=None returns every hit."""
+        layout = self.layout
+        if not len(layout):
+            return []
+        s = self.sums(fee_rate_bps)
+        yes_side = s["yes_edge"] >= s["no_edge"]
+        edge = np.where(yes_side, s["yes_edge"], s["no_edge"])
+        mask = np.isfinite(edge) & (edge >= min_edge)
+        if exclusive_only:
+            mask &= layout.exclusive
+        hits = np.flatnonzero(mask)
+        hits = hits[np.argsort(-edge[hits], kind="stable")][:top_k]
+        return [self._opportunity(j, "YES" if yes_side[j] else "NO", s) for j in hits]
+
+    def _opportunity(self, j: int, basket: str, s: dict) -> dict:
+        layout = self.layout
+        side = basket.lower()
+        start, size = int(layout.starts[j]), int(layout.sizes[j])
+        prices = self.yes if basket == "YES" else self.no
+        asks = self.yes_ask if basket == "YES" else self.no_ask
+        cost = float(s[f"{side}_cost"][j])
+        depth = float(s[f"{side}_depth"][j])
+        legs = []
+        for i in range(start, start + size):
+            market = self.markets.get(layout.market_ids[i])
+            legs.append({
+                "market_id": layout.market_ids[i],
+                "question": market.question if market is not None else None,
+                "price": float(prices[i]),
+                "ask": None if np.isnan(asks[i]) else float(asks[i]),
+            })
+        return {
+            "event_id": layout.event_ids[j],
+            "event_title": self.titles[j],
+            "exclusive": bool(layout.exclusive[j]),
+            "markets": size,
+            "basket": basket,
+            "cost": cost,
+            "payout": 1.0 if basket == "YES" else float(size - 1),
+            "edge": float(s[f"{side}_edge"][j]),
+            "return_pct": float(s[f"{side}_edge"][j]) / cost * 100 if cost > 0 else None,
+            "yes_sum": float(s["yes_sum"][j]),
+            "no_sum": float(s["no_sum"][j]),
+            "priced": "book" if s[f"{side}_booked"][j] else "last",
+            "depth": None if np.isnan(depth) else depth,
+            "legs": legs,
+        }
+
+
+def build_scanner(markets: Optional[dict] = None) -> ArbitrageScanner:
+    """Scanner over the store's event index; prices from `markets` or every stored market."""
+    store = get_store()
+    return ArbitrageScanner(store.event_index.layout(), store.all_markets() if markets is None else markets)
+
+
+def scan_arbitrage(
+    markets: Optional[dict] = None,
+    live: bool = True,
+    min_edge: float = MIN_EDGE,
+    exclusive_only: bool = True,
+    save: bool = True
+) -> dict:
+    """
+    One pass over every multi-market event. With live=True a fresh
+    market_stream snapshot overrides the stored prices and supplies asks.
+    The result is written to ARBITRAGE_FILE unless save=False.
+    """
+    started = time.perf_counter()
+    with metrics.stage("arbitrage.load"):
+        scanner = build_scanner(markets)
+        snap = load_live_snapshot() if live else {}
+        scanner.apply_snapshot(snap)
+    with metrics.stage("arbitrage.scan"):
+        opportunities = scanner.scan(min_edge=min_edge, exclusive_only=exclusive_only)
+    metrics.inc("arbitrage_opportunities", len(opportunities))
+    layout = scanner.layout
+    result = {
+        "generated_at": utcnow(),
+        "events": len(layout),
+        "exclusive_events": int(layout.exclusive.sum()),
+        "markets": len(layout.market_ids),
+        "unpriced_events": scanner.unpriced(),
+        "live": bool(snap),
+        "min_edge": min_edge,
+        "elapsed_ms": (time.perf_counter() - started) * 1000,
+        "opportunities": opportunities,
+    }
+    if save:
+        save_result(result)
+    return result
+
+
+def save_result(result: dict, path: Optional[Path] = None):
+    """Write atomically so a reader polling the file never sees half of it."""
+    path = Path(path or ARBITRAGE_FILE)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with metrics.stage("file.write", file=path.name):
+        tmp.write_text(json.dumps(result, indent=2))
+        os.replace(tmp, path)
+
+
+def print_opportunities(opportunities: list, limit: int = 10):
+    for o in opportunities[:limit]:
+        flag = "" if o["exclusive"] else " [not flagged exclusive]"
+        depth = f" | {o['depth']:,.0f} sh at touch" if o["depth"] is not None else ""
+        print(f"  {o['event_title'] or o['event_id']}{flag}")
+        print(f"    Buy {o['markets']} x {o['basket']} for ${o['cost']:.4f}, pays ${o['payout']:.0f}: "
+              f"edge ${o['edge']:.4f} ({o['return_pct']:.2f}%) priced off {o['priced']}{depth}")
+        print(f"    YES sum {o['yes_sum']:.4f} | NO sum {o['no_sum']:.4f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Polymarket cross-market arbitrage scanner")
+    parser.add_argument("--min-edge", type=float, default=MIN_EDGE, help="Minimum edge per basket ($)")
+    parser.add_argument("--all-events", action="store_true",
+                        help="Include multi-market events not flagged mutually exclusive")
+    parser.add_argument("--no-live", action="store_true", help="Ignore the market_stream snapshot")
+    parser.add_argument("--watch", type=float, metavar="SECONDS",
+                        help="Re-scan every SECONDS against the latest live snapshot")
+    parser.add_argument("--limit", type=int, default=10, help="Opportunities to print")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+    exclusive_only = not args.all_events
+
+    if args.watch:
+        store = get_store()
+        scanner, updated, sequence = None, None, None
+        try:
+            while True:
+                # Another process's scan may have changed the universe; rebuild from the store
+                rebuilt = scanner is None or store.updated() != updated
+                if rebuilt:
+                    updated = store.updated()
+                    store.reload_indexes()
+                    scanner = build_scanner()
+                snap = {} if args.no_live else load_live_snapshot()
+                if rebuilt or snap.get("sequence") != sequence:
+                    sequence = snap.get("sequence")
+                    started = time.perf_counter()
+                    scanner.apply_snapshot(snap)
+                    found = scanner.scan(min_edge=args.min_edge, exclusive_only=exclusive_only)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    metrics.observe("arbitrage_tick_seconds", elapsed / 1000)
+                    print(f"\n{utcnow()[:19]}  {len(scanner.layout)} events "
+                          f"({scanner.unpriced()} unpriced), "
+                          f"{len(found)} opportunities in {elapsed:.1f}ms"
+                          f"{'' if snap else ' (no live snapshot)'}")
+                    print_opportunities(found, limit=args.limit)
+                time.sleep(args.watch)
+        except KeyboardInterrupt:
+            pass
+    else:
+        result = scan_arbitrage(live=not args.no_live, min_edge=args.min_edge, exclusive_only=exclusive_only)
+        print(f"\n{'='*70}")
+        print(f"ARBITRAGE - {result['events']} multi-market events ({result['exclusive_events']} exclusive), "
+              f"{result['markets']} markets in {result['elapsed_ms']:.1f}ms")
+        print(f"{'='*70}\n")
+        if not result["live"]:
+            print("  (no live snapshot: legs priced at last scanned prices)\n")
+        if result["unpriced_events"]:
+            print(f"  ({result['unpriced_events']} events skipped: a market has no price)\n")
+        print_opportunities(result["opportunities"], limit=args.limit)
+        print(f"\n{len(result['opportunities'])} opportunities saved to {ARBITRAGE_FILE}")
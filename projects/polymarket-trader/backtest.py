@@ -0,0 +1,572 @@
+#!/usr/bin/env python3
+"""
+Polymarket Backtester
+Replays recorded price history, order books and resolutions through
+MarketAnalyzer signals, so a strategy can be judged in minutes instead of
+waiting a week for paper bets to resolve.
+
+The clock advances in fixed steps. Prices for a block of steps are read for
+every market at once by bisecting each market's memory-mapped timestamps,
+resolutions and recorded feed messages are merged in as their timestamps
+pass, and every strategy trades on the same pass. Strategies that share a
+signal and parameters share its computation each step.
+
+Signals only see what was known at each step: prices, 24h volume and
+liquidity all come from the recorded history, never from today's market
+record. Points recorded before volume and liquidity were kept have them as
+NaN, so volume and liquidity thresholds (high_volume, political,
+extreme_prices' min_liquidity) don't fire on them. End dates are the listed
+ones.
+
+A settled-looking last price only counts as a resolution once the market is
+over (its end date has passed, or Gamma reports it closed with
+--check-closed); anything else needs data/resolutions.json.
+
+Usage:
+    python backtest.py                                   # Every signal, $10 bets, hourly steps
+    python backtest.py --strategy cheap=extreme_prices:min_liquidity=5000 --size 15
+    python backtest.py --feed feed.jsonl --step 60       # Fill against replayed books
+    python backtest.py --resolutions resolutions.json --start 2026-09-01 --end 2026-10-01
+    python backtest.py --check-closed                    # Resolve settled markets Gamma has closed
+"""
+
+import heapq
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from fill_simulator import FEE_RATE_BPS, simulate_fill
+from market_record import Market
+from market_store import get_store
+from market_stream import LiveBooks, ReplayFeed
+from price_history import get_history_store, to_epoch
+from strategies import SIGNAL_REGISTRY, MarketAnalyzer
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+RESOLUTIONS_FILE = DATA_DIR / "resolutions.json"
+BACKTEST_FILE = DATA_DIR / "backtest_results.json"
+
+DEFAULT_STEP = 3600
+DEFAULT_BANKROLL = 1000.0
+DEFAULT_BET_SIZE = 10.0
+# Steps whose prices are read from history at once
+BLOCK_STEPS = 1024
+# History columns replayed into the universe each step
+STEP_FIELDS = ("yes", "no", "volume", "liquidity")
+# A final recorded price this close to 0 or 1 counts as a resolution
+SETTLED_EPSILON = 0.01
+
+
+def utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def price_matrix(columns: dict, market_ids: list, ends: np.ndarray, fields: tuple = ("yes", "no")) -> tuple:
+    """
+    One array per field, of shape (steps, markets), holding each market's last
+    recorded value at or before each step end; NaN before its first point.
+    """
+    matrices = tuple(np.full((len(ends), len(market_ids)), np.nan, dtype=np.float32) for _ in fields)
+    for col, market_id in enumerate(market_ids):
+        cols = columns.get(market_id)
+        if cols is None:
+            continue
+        idx = np.searchsorted(cols["ts"], ends, side="right") - 1
+        seen = idx >= 0
+        for matrix, field in zip(matrices, fields):
+            matrix[seen, col] = cols[field][idx[seen]]
+    return matrices
+
+
+# ---------------------------------------------------------------------------
+# Strategies and sizing
+# ---------------------------------------------------------------------------
+
+def fixed_size(amount: float = DEFAULT_BET_SIZE) -> Callable:
+    """Bet the same USDC amount every time."""
+    return lambda result, price, equity: amount
+
+
+def equity_fraction(fraction: float) -> Callable:
+    """Bet a fixed fraction of current equity."""
+    return lambda result, price, equity: max(equity, 0.0) * fraction
+
+
+class Strategy:
+    """
+    A signal plus the rules for trading its hits.
+
+    `outcome` picks the side to buy: "YES", "NO", or None to follow the
+    signal's own direction (EXTREME_LOW_NO buys NO) and otherwise buy YES.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        signal: str,
+        params: Optional[dict] = None,
+        top_k: Optional[int] = None,
+        sizing: Optional[Callable] = None,
+        outcome: Optional[str] = None,
+        bankroll: float = DEFAULT_BANKROLL
+    ):
+        if signal not in SIGNAL_REGISTRY:
+            raise ValueError(f"Unknown signal: {signal}")
+        self.name = name
+        self.signal = signal
+        self.params = params or {}
+        self.top_k = top_k if top_k is not None else SIGNAL_REGISTRY[signal].top_k
+        self.sizing = sizing or fixed_size()
+        self.outcome = outcome.upper() if outcome else None
+        self.bankroll = bankroll
+
+    def side_for(self, result: dict) -> str:
+        if self.outcome:
+            return self.outcome
+        return "NO" if str(result.get("signal", "")).endswith("_NO") else "YES"
+
+
+def parse_strategy(spec: str, sizing: Callable) -> Strategy:
+    """NAME=SIGNAL[:key=value,...], e.g. cheap=extreme_prices:min_liquidity=5000."""
+    name, _, rest = spec.partition("=")
+    signal, _, raw_params = (rest or name).partition(":")
+    params = {}
+    for pair in filter(None, raw_params.split(",")):
+        key, _, value = pair.partition("=")
+        params[key] = float(value)
+    return Strategy(name, signal, params=params, sizing=sizing)
+
+
+class _Account:
+    """Running state of one strategy during a backtest."""
+
+    def __init__(self, strategy: Strategy):
+        self.strategy = strategy
+        self.cash = strategy.bankroll
+        # Open positions as parallel lists; marked to market every step
+        self.rows, self.is_no, self.shares, self.cost = [], [], [], []
+        self.held = set()
+        self.bets = self.wins = self.losses = 0
+        self.invested = self.realized = self.fees = 0.0
+        self.slippage = []
+        self.peak = strategy.bankroll
+        self.max_drawdown = 0.0
+        self.max_drawdown_pct = 0.0
+        self.equity = strategy.bankroll
+
+
+# ---------------------------------------------------------------------------
+# Inputs
+# ---------------------------------------------------------------------------
+
+def load_resolutions(path: Path = RESOLUTIONS_FILE) -> dict:
+    """{market_id: (outcome, resolved epoch)} from {"id": {"outcome", "resolved_at"}}."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    resolutions = {}
+    for market_id, entry in json.loads(path.read_text()).items():
+        resolved_at = entry.get("resolved_at")
+        resolutions[str(market_id)] = (
+            entry["outcome"].upper(),
+            to_epoch(resolved_at) if resolved_at is not None else None,
+        )
+    return resolutions
+
+
+def history_markets(history) -> dict:
+    """
+    {market_id: Market} for every market with recorded history. Markets pruned
+    from the store once closed still replay, as bare records with no question
+    or end date.
+    """
+    market_ids = history.markets()
+    markets = get_store().get_many(market_ids)
+    for market_id in market_ids:
+        if market_id not in markets:
+            markets[market_id] = Market(market_id)
+    return markets
+
+
+def settled_markets(history, market_ids) -> dict:
+    """{market_id: (outcome, ts)} for markets whose last recorded YES price is ~0 or ~1."""
+    settled = {}
+    for market_id in market_ids:
+        latest = history.latest(market_id)
+        if latest is None:
+            continue
+        ts, yes, _ = latest
+        if yes >= 1 - SETTLED_EPSILON:
+            settled[market_id] = ("YES", ts)
+        elif yes <= SETTLED_EPSILON:
+            settled[market_id] = ("NO", ts)
+    return settled
+
+
+def closed_on_gamma(market_ids) -> set:
+    """The markets Gamma reports closed."""
+    from polymarket_trader import fetch_market_statuses
+    statuses, _ = fetch_market_statuses([str(m) for m in market_ids])
+    return {m for m, status in statuses.items() if status["closed"]}
+
+
+def infer_resolutions(history, markets: dict, closed=(), now: Optional[float] = None) -> dict:
+    """
+    Settled markets (see settled_markets) that are also over: in `closed`, or
+    past their end date, resolving at their last point or their end date,
+    whichever is later. A price near 0 or 1 on a market that is still open
+    is only a long shot.
+    """
+    now = time.time() if now is None else now
+    closed = set(closed)
+    resolutions = {}
+    for market_id, (outcome, ts) in settled_markets(history, markets).items():
+        end = markets[market_id].end_epoch
+        if market_id in closed:
+            resolutions[market_id] = (outcome, ts)
+        # NaN (no end date) never compares as passed
+        elif end <= now:
+            resolutions[market_id] = (outcome, max(ts, int(end)))
+    return resolutions
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+class Backtester:
+    """Replays history through many strategies in one timestamp-ordered pass."""
+
+    def __init__(
+        self,
+        strategies: list,
+        markets: Optional[dict] = None,
+        history=None,
+        resolutions: Optional[dict] = None,
+        feed_path: Optional[Path] = None,
+        start=None,
+        end=None,
+        step: float = DEFAULT_STEP,
+        fee_rate_bps: float = FEE_RATE_BPS,
+        prices: Optional[tuple] = None
+    ):
+        """
+        `prices` is an optional prebuilt (step_ends, *matrices) with one
+        price_matrix() per STEP_FIELDS over the universe's markets, e.g. shared
+        between sweep workers; history is then never read and steps follow
+        step_ends.
+        """
+        self.strategies = strategies
+        self.history = history or get_history_store()
+        if markets is None:
+            markets = history_markets(self.history)
+        self.analyzer = MarketAnalyzer(markets=markets, stream=False)
+        self.universe = self.analyzer.universe
+        self.market_ids = list(self.universe.ids)
+
+        if resolutions is None:
+            resolutions = {**infer_resolutions(self.history, self.analyzer.markets), **load_resolutions()}
+        self.resolutions = resolutions
+
+        self.prices = prices
+        self.columns = {}
+        first, last = [], []
+        if prices is None:
+            for market_id in self.market_ids:
+                cols = self.history.read(market_id)
+                if len(cols["ts"]):
+                    self.columns[market_id] = cols
+                    first.append(int(cols["ts"][0]))
+                    last.append(int(cols["ts"][-1]))
+        elif len(prices[0]):
+            first, last = [int(prices[0][0]) - step], [int(prices[0][-1])]
+        self.start = to_epoch(start) if start is not None else (min(first) if first else 0)
+        self.end = to_epoch(end) if end is not None else (max(last) if last else self.start)
+        self.step = step
+        self.fee_rate_bps = fee_rate_bps
+
+        self.feed_path = feed_path
+        self.books = LiveBooks()
+        self.tokens = {}
+        for market_id, market in self.analyzer.markets.items():
+            if len(market.token_ids) >= 2:
+                self.tokens[str(market_id)] = market.token_ids[:2]
+
+    # -- inputs --------------------------------------------------------------
+
+    def step_ends(self) -> np.ndarray:
+        """Decision times: every step from start (exclusive) through end."""
+        if self.prices is not None:
+            ends = self.prices[0]
+            return ends[(ends > self.start) & (ends <= self.end)]
+        return np.arange(self.start + self.step, self.end + self.step, self.step)
+
+    def _price_block(self, ends: np.ndarray) -> tuple:
+        if self.prices is not None:
+            all_ends, *matrices = self.prices
+            lo = int(np.searchsorted(all_ends, ends[0]))
+            return tuple(m[lo:lo + len(ends)] for m in matrices)
+        return price_matrix(self.columns, self.market_ids, ends, fields=STEP_FIELDS)
+
+    def _resolution_events(self) -> list:
+        """(ts, market_id, outcome) heap; undated resolutions land at the market's last point."""
+        events = []
+        for market_id, (outcome, ts) in self.resolutions.items():
+            if market_id not in self.universe.index:
+                continue
+            if ts is None:
+                cols = self.columns.get(market_id)
+                ts = int(cols["ts"][-1]) if cols is not None else self.end
+            events.append((ts, market_id, outcome))
+        heapq.heapify(events)
+        return events
+
+    def _feed_messages(self):
+        """Recorded feed messages as (epoch, message), in recorded order."""
+        if not self.feed_path:
+            return iter(())
+        def stamped():
+            for msg in ReplayFeed(self.feed_path).messages():
+                try:
+                    yield float(msg.get("timestamp")) / 1000, msg
+                except (TypeError, ValueError):
+                    continue
+        return stamped()
+
+    def _book_for(self, market_id: str, outcome: str):
+        tokens = self.tokens.get(market_id)
+        if not tokens:
+            return None
+        yes_token, no_token = tokens
+        token, pair = (yes_token, no_token) if outcome == "YES" else (no_token, yes_token)
+        if token in self.books.books:
+            return self.books.books[token]
+        if pair in self.books.books:
+            return self.books.books[pair].complement(token_id=token)
+        return None
+
+    # -- trading -------------------------------------------------------------
+
+    def _enter(self, account: _Account, result: dict):
+        market_id = str(result["market_id"])
+        row = self.universe.index.get(market_id)
+        if row is None or market_id in account.held or market_id in self.resolved:
+            return
+        outcome = account.strategy.side_for(result)
+        price = float(self.universe.no[row] if outcome == "NO" else self.universe.yes[row])
+        if not 0 < price < 1:
+            return
+        amount = min(account.strategy.sizing(result, price, account.equity), account.cash)
+        if amount <= 0:
+            return
+
+        order_book = self._book_for(market_id, outcome)
+        if order_book is not None:
+            fill = simulate_fill(order_book, amount, fee_rate_bps=self.fee_rate_bps)
+            if fill["shares"] <= 0:
+                return
+            shares, cost, fee = fill["shares"], fill["cost"], fill["fee"]
+            if cost > account.cash:
+                return
+            account.slippage.append(fill["slippage_bps"])
+        else:
+            # No recorded book: assume the recorded price had enough size
+            shares, cost, fee = amount / price, amount, 0.0
+
+        account.cash -= cost
+        account.rows.append(row)
+        account.is_no.append(outcome == "NO")
+        account.shares.append(shares)
+        account.cost.append(cost)
+        account.held.add(market_id)
+        account.bets += 1
+        account.invested += cost
+        account.fees += fee
+
+    def _resolve(self, market_id: str, outcome: str):
+        self.resolved.add(market_id)
+        row = self.universe.index[market_id]
+        self.resolved_rows.append(row)
+        for account in self.accounts:
+            if market_id not in account.held:
+                continue
+            i = account.rows.index(row)
+            won = account.is_no[i] == (outcome == "NO")
+            payout = account.shares[i] if won else 0.0
+            account.cash += payout
+            account.realized += payout - account.cost[i]
+            if won:
+                account.wins += 1
+            else:
+                account.losses += 1
+            account.held.discard(market_id)
+            for column in (account.rows, account.is_no, account.shares, account.cost):
+                del column[i]
+
+    def _mark(self, account: _Account):
+        """Mark open positions to market and update the drawdown."""
+        if account.rows:
+            rows = np.asarray(account.rows)
+            prices = np.where(account.is_no, self.universe.no[rows], self.universe.yes[rows])
+            value = float(np.nansum(np.asarray(account.shares) * prices))
+        else:
+            value = 0.0
+        account.equity = account.cash + value
+        account.peak = max(account.peak, account.equity)
+        drawdown = account.peak - account.equity
+        if drawdown > account.max_drawdown:
+            account.max_drawdown = drawdown
+            account.max_drawdown_pct = drawdown / account.peak * 100 if account.peak > 0 else 0.0
+
+    # -- run -----------------------------------------------------------------
+
+    def run(self) -> dict:
+        started = time.perf_counter()
+        self.resolved = set()
+        self.resolved_rows = []
+        self.accounts = [_Account(s) for s in self.strategies]
+        resolutions = self._resolution_events()
+        feed = self._feed_messages()
+        pending_msg = next(feed, None)
+        steps = messages = 0
+
+        ends = self.step_ends()
+        for block_start in range(0, len(ends), BLOCK_STEPS):
+            block = ends[block_start:block_start + BLOCK_STEPS]
+            yes_block, no_block, volume_block, liquidity_block = self._price_block(block)
+            for k, now in enumerate(block):
+                now = float(now)
+                self.universe.yes[:] = yes_block[k]
+                self.universe.no[:] = no_block[k]
+                self.universe.volume[:] = volume_block[k]
+                self.universe.liquidity[:] = liquidity_block[k]
+
+                while pending_msg is not None and pending_msg[0] <= now:
+                    self.books.apply(pending_msg[1])
+                    messages += 1
+                    pending_msg = next(feed, None)
+
+                while resolutions and resolutions[0][0] <= now:
+                    _, market_id, outcome = heapq.heappop(resolutions)
+                    self._resolve(market_id, outcome)
+
+                # Markets not yet listed or already resolved can't be traded
+                if self.resolved_rows:
+                    self.universe.yes[self.resolved_rows] = np.nan
+                    self.universe.no[self.resolved_rows] = np.nan
+
+                shared = {}
+                for account in self.accounts:
+                    s = account.strategy
+                    key = (s.signal, s.top_k, tuple(sorted(s.params.items())))
+                    if key not in shared:
+                        shared[key] = self.analyzer.run_signal(s.signal, top_k=s.top_k, now=now, **s.params)
+                    for result in shared[key]:
+                        self._enter(account, result)
+                    self._mark(account)
+                steps += 1
+
+        return {
+            "generated_at": utcnow(),
+            "start": self.start,
+            "end": self.end,
+            "step_s": self.step,
+            "steps": steps,
+            "markets": len(self.market_ids),
+            "markets_with_history": len(self.columns),
+            "resolutions": len(self.resolved),
+            "feed_messages": messages,
+            "elapsed_s": time.perf_counter() - started,
+            "strategies": {a.strategy.name: self._summary(a) for a in self.accounts},
+        }
+
+    def _summary(self, account: _Account) -> dict:
+        closed = account.wins + account.losses
+        unrealized = account.equity - account.cash - sum(account.cost)
+        return {
+            "signal": account.strategy.signal,
+            "params": account.strategy.params,
+            "bets": account.bets,
+            "open": len(account.rows),
+            "wins": account.wins,
+            "losses": account.losses,
+            "win_rate": account.wins / closed * 100 if closed else 0,
+            "invested": account.invested,
+            "realized_pnl": account.realized,
+            "unrealized_pnl": unrealized,
+            "roi": account.realized / account.invested * 100 if account.invested > 0 else 0,
+            "final_equity": account.equity,
+            "total_pnl": account.equity - account.strategy.bankroll,
+            "max_drawdown": account.max_drawdown,
+            "max_drawdown_pct": account.max_drawdown_pct,
+            "fees": account.fees,
+            "avg_slippage_bps": float(np.mean(account.slippage)) if account.slippage else None,
+        }
+
+
+def print_results(results: dict):
+    """Print per-strategy backtest results."""
+    span_days = (results["end"] - results["start"]) / 86400
+    print(f"\n{'='*100}")
+    print(f"BACKTEST: {results['markets_with_history']} markets, {span_days:.1f} days, "
+          f"{results['steps']} steps, {results['resolutions']} resolutions "
+          f"in {results['elapsed_s']:.1f}s")
+    print(f"{'='*100}\n")
+    print(f"{'strategy':<24} {'bets':>6} {'open':>5} {'win%':>6} {'realized':>10} "
+          f"{'unreal':>9} {'roi%':>7} {'maxDD':>9} {'dd%':>6}")
+    for name, r in results["strategies"].items():
+        print(f"{name:<24} {r['bets']:>6} {r['open']:>5} {r['win_rate']:>6.1f} {r['realized_pnl']:>10.2f} "
+              f"{r['unrealized_pnl']:>9.2f} {r['roi']:>7.1f} {r['max_drawdown']:>9.2f} {r['max_drawdown_pct']:>6.1f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Polymarket strategy backtester")
+    parser.add_argument("--strategy", action="append",
+                        help="NAME=SIGNAL[:key=value,...] (repeatable; default: every registered signal)")
+    parser.add_argument("--size", type=float, default=DEFAULT_BET_SIZE, help="Fixed bet size in USDC")
+    parser.add_argument("--fraction", type=float, help="Bet this fraction of equity instead of --size")
+    parser.add_argument("--start", help="Start time (ISO or epoch; default: first recorded point)")
+    parser.add_argument("--end", help="End time (ISO or epoch; default: last recorded point)")
+    parser.add_argument("--step", type=float, default=DEFAULT_STEP, help="Seconds between decisions")
+    parser.add_argument("--feed", help="Recorded feed JSONL to fill against replayed books")
+    parser.add_argument("--resolutions", help="Resolutions JSON (default: data/resolutions.json)")
+    parser.add_argument("--check-closed", action="store_true",
+                        help="Ask Gamma which settled-looking markets have closed")
+    parser.add_argument("--fee-bps", type=float, default=FEE_RATE_BPS, help="Fee rate in bps")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+
+    sizing = equity_fraction(args.fraction) if args.fraction else fixed_size(args.size)
+    specs = args.strategy or list(SIGNAL_REGISTRY)
+    strategies = [parse_strategy(spec, sizing) for spec in specs]
+
+    history = get_history_store()
+    markets = history_markets(history)
+    closed = closed_on_gamma(settled_markets(history, markets)) if args.check_closed else ()
+    resolutions = {
+        **infer_resolutions(history, markets, closed=closed),
+        **load_resolutions(args.resolutions or RESOLUTIONS_FILE),
+    }
+
+    def epoch_arg(value):
+        return None if value is None else (float(value) if value.replace(".", "", 1).isdigit() else value)
+
+    backtester = Backtester(strategies, markets=markets, history=history, resolutions=resolutions,
+                            feed_path=args.feed, start=epoch_arg(args.start), end=epoch_arg(args.end),
+                            step=args.step, fee_rate_bps=args.fee_bps)
+    results = backtester.run()
+    print_results(results)
+    BACKTEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    BACKTEST_FILE.write_text(json.dumps(results, indent=2))
+    print(f"\nResults saved to {BACKTEST_FILE}")
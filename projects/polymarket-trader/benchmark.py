@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+Polymarket Benchmarks
+Times the pipeline's entry points on synthetic universes of 1k to 1M records,
+fully offline.
+
+Fixtures are generated from a fixed seed the first time a size is needed and
+recorded under data/bench/fixtures, so every later run (and every machine)
+replays exactly the same inputs:
+    gamma_<n>/                       api_replay recordings of the Gamma /events
+                                     pages, 4 markets per event, every other
+                                     event negRisk
+    ledger_<n>.json                  paper bets against that universe
+    tenk_<n>.html                    a 10-K with n risk-factor paragraphs
+
+Each size runs in its own scratch workspace (store, history, ledger, cache),
+with the recorded Gamma pages and CLOB midpoints served by an api_replay
+server, so scan_markets and check_open_bets go through the real client
+(--latency and --error-rate inject the server's faults). A
+second, tracemalloc-traced pass over a fresh workspace gives peak memory
+without slowing the timed pass.
+
+Results are JSON (one row per entry point and size) in data/bench/results;
+--compare diffs two of them.
+
+Usage:
+    python benchmark.py                              # 1k, 10k, 100k
+    python benchmark.py --sizes 1000 1000000 --only scan_markets analyze_all
+    python benchmark.py --no-memory --out results.json
+    python benchmark.py --sizes 10000 --latency 50 --workers 32
+    python benchmark.py --compare OLD.json NEW.json
+"""
+
+import json
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+BENCH_DIR = DATA_DIR / "bench"
+FIXTURES_DIR = BENCH_DIR / "fixtures"
+RESULTS_DIR = BENCH_DIR / "results"
+
+sys.path.insert(0, str(WORKSPACE / "projects" / "ai-investment-agent"))
+
+from api_replay import ApiReplayServer, Recordings, request_key
+import arbitrage
+import http_client
+import ledger
+import market_data
+import market_store
+import polymarket_trader
+import price_history
+import rolling_analytics
+import strategies
+from sec_edgar_fetcher import extract_risk_factors
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+ENTRY_POINTS = ["scan_markets", "analyze_all", "scan_arbitrage", "check_open_bets", "calculate_performance",
+                "extract_risk_factors"]
+SEED = 20260215
+MARKETS_PER_EVENT = 4
+# Fraction of ledger bets still open
+OPEN_SHARE = 0.4
+
+WORDS = ("trump fed bitcoin election tariff rate cut senate ethereum nomination iran china "
+         "price above below reach win championship final game match season record").split()
+RISK_WORDS = ("our business could be adversely affected by changes in economic conditions supply "
+              "chain disruptions competition regulation cybersecurity litigation currency interest "
+              "rates demand for our products and services may decline").split()
+
+
+def utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Fixtures
+# ---------------------------------------------------------------------------
+
+def _token(market_id: int, side: int) -> str:
+    # Real CLOB token ids are ~77-digit decimals
+    return str((market_id * 2 + side + 1) * 10 ** 70 + zlib.crc32(f"{market_id}:{side}".encode()))
+
+
+def midpoint(token_id: str) -> float:
+    """The recorded CLOB midpoint for a fixture token."""
+    return (zlib.crc32(token_id.encode()) % 9800 + 100) / 10000
+
+
+def gamma_fixture(n: int) -> Path:
+    """Recorded Gamma /events pages holding n markets, as the full scan requests them."""
+    root = FIXTURES_DIR / f"gamma_{n}"
+    if (root / "complete").exists():
+        return root
+    shutil.rmtree(root, ignore_errors=True)
+    recordings = Recordings(root)
+    rng = random.Random(SEED + n)
+    base = datetime(2026, 2, 15, tzinfo=timezone.utc)
+    page_size = polymarket_trader.EVENTS_PAGE_SIZE
+    events = (n + MARKETS_PER_EVENT - 1) // MARKETS_PER_EVENT
+    market_id = 100000
+    for offset in range(0, events, page_size):
+        page = []
+        for event_id in range(offset, min(offset + page_size, events)):
+            title = " ".join(rng.choices(WORDS, k=4)).capitalize()
+            markets = []
+            for _ in range(min(MARKETS_PER_EVENT, n - (market_id - 100000))):
+                yes = round(rng.uniform(0.005, 0.995), 4)
+                end = base + timedelta(hours=rng.uniform(-24, 24 * 90))
+                markets.append({
+                    "id": str(market_id),
+                    "question": f"Will {' '.join(rng.choices(WORDS, k=5))} by {end:%B %d}?",
+                    "slug": f"market-{market_id}",
+                    "outcomes": '["Yes", "No"]',
+                    "outcomePrices": json.dumps([str(yes), str(round(1 - yes, 4))]),
+                    "volumeNum": round(rng.lognormvariate(11, 2), 2),
+                    "liquidityNum": round(rng.lognormvariate(9, 1.5), 2),
+                    "clobTokenIds": json.dumps([_token(market_id, 0), _token(market_id, 1)]),
+                    "endDate": end.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                })
+                market_id += 1
+            page.append({"id": str(event_id), "title": title, "negRisk": event_id % 2 == 0, "markets": markets})
+        query = polymarket_trader.events_query(offset, page_size, order="id", ascending=True)
+        recordings.put("gamma", request_key("GET", "/events", query), 200, json.dumps(page).encode())
+    (root / "complete").write_text(str(market_id - 100000))
+    return root
+
+
+def ledger_fixture(n: int, markets: int) -> Path:
+    """n paper bets spread over the first `markets` fixture markets."""
+    path = FIXTURES_DIR / f"ledger_{n}.json"
+    if path.exists():
+        return path
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(SEED - n)
+    placed = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    bets = []
+    for i in range(n):
+        price = round(rng.uniform(0.05, 0.95), 4)
+        amount = round(rng.uniform(5, 50), 2)
+        bet = {
+            "id": f"bet_{i + 1}_{1767225600 + i}",
+            "market_id": str(100000 + rng.randrange(markets)),
+            "question": "Synthetic bet",
+            "outcome": rng.choice(["YES", "NO"]),
+            "strategy": rng.choice(["extreme_prices", "high_volume", "resolving_soon", "political"]),
+            "categories": rng.sample(["politics", "crypto", "sports", "economics"], k=rng.randint(0, 2)),
+            "entry_price": price,
+            "amount": amount,
+            "shares": amount / price,
+            "reasoning": "",
+            "placed_at": (placed + timedelta(minutes=i)).isoformat(),
+            "status": "open",
+            "exit_price": None,
+            "exit_at": None,
+            "pnl": None,
+        }
+        if rng.random() > OPEN_SHARE:
+            won = rng.random() < price
+            bet.update(status="won" if won else "lost", exit_price=1.0 if won else 0.0,
+                       exit_at=(placed + timedelta(minutes=i, days=3)).isoformat(),
+                       pnl=bet["shares"] - amount if won else -amount)
+        bets.append(bet)
+    path.write_text(json.dumps({"bets": bets}))
+    return path
+
+
+def tenk_fixture(n: int) -> Path:
+    """A 10-K filing whose Item 1A holds n risk-factor paragraphs, in EDGAR's inline-XBRL style."""
+    path = FIXTURES_DIR / f"tenk_{n}.html"
+    if path.exists():
+        return path
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(SEED * 3 + n)
+    with open(path, "w") as f:
+        f.write("<html><head><style>p {margin: 0}</style><script>var x = 1;</script></head><body>\n")
+        f.write('<div><span style="font-weight:700">Item 1.</span> Business</div>\n')
+        for _ in range(max(n // 10, 1)):
+            f.write(f"<p>{' '.join(rng.choices(RISK_WORDS, k=30))}</p>\n")
+        f.write('<div><span style="font-weight:700">Item 1A.</span>&#160;<span>Risk Factors</span></div>\n')
+        for i in range(n):
+            f.write(f'<p style="text-indent:2em"><ix:nonNumeric name="rf{i}">{" ".join(rng.choices(RISK_WORDS, k=40))}'
+                    f" &amp; related matters&#8217; effects</ix:nonNumeric></p>\n")
+        f.write('<div><span style="font-weight:700">Item 1B.</span> Unresolved Staff Comments</div>\n')
+        f.write("<div>Item 2. Properties</div></body></html>\n")
+    return path
+
+
+# ---------------------------------------------------------------------------
+# Offline server
+# ---------------------------------------------------------------------------
+
+def _midpoints(query: list, body: bytes) -> tuple:
+    """POST /midpoints handler: the recorded midpoint of every requested token."""
+    return 200, {r["token_id"]: str(midpoint(r["token_id"])) for r in json.loads(body)}
+
+
+def fixture_server(gamma_dir: Path, latency: float = 0.0, error_rate: float = 0.0) -> ApiReplayServer:
+    """A running replay server for one fixture universe (latency in seconds)."""
+    return ApiReplayServer(
+        gamma_dir, port=0, latency=latency, error_rate=error_rate, seed=SEED,
+        handlers={("POST", "clob", "/midpoints"): _midpoints}
+    ).start()
+
+
+# ---------------------------------------------------------------------------
+# Workspace
+# ---------------------------------------------------------------------------
+
+class Workspace:
+    """Scratch data paths and a fresh HTTP client pointed at a replay server."""
+
+    def __init__(self, server: ApiReplayServer):
+        self.root = Path(tempfile.mkdtemp(prefix="pm-bench-"))
+        market_store.MARKET_DB_FILE = self.root / "markets.db"
+        market_store.MARKET_CACHE_FILE = self.root / "market_cache.json"
+        price_history.HISTORY_DIR = self.root / "history"
+        rolling_analytics.ANALYTICS_FILE = self.root / "analytics.npz"
+        arbitrage.ARBITRAGE_FILE = self.root / "arbitrage.json"
+        ledger.LEDGER_DB_FILE = self.root / "ledger.db"
+        ledger.PAPER_BETS_FILE = self.root / "paper_bets.json"
+        strategies.SIGNALS_FILE = self.root / "signals.json"
+        polymarket_trader.PERFORMANCE_FILE = self.root / "performance.json"
+        polymarket_trader.STRATEGY_PERFORMANCE_FILE = self.root / "strategy_performance.json"
+        polymarket_trader.GAMMA_API = server.base_url("gamma")
+        polymarket_trader.CLOB_API = server.base_url("clob")
+        market_data.CLOB_API = server.base_url("clob")
+        # The benchmark measures our pipeline, not the politeness limiter
+        host = urlparse(server.url).netloc
+        http_client._client = http_client.PolymarketClient(
+            cache_dir=self.root / "http_cache", rate_limits={host: (1e9, 10 ** 9)}
+        )
+
+    def close(self):
+        for store in market_store._stores.values():
+            store.close()
+        market_store._stores.clear()
+        for book in ledger._ledgers.values():
+            book.close()
+        ledger._ledgers.clear()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
+# ---------------------------------------------------------------------------
+# Runs
+# ---------------------------------------------------------------------------
+
+def _measure(fn, trace: bool) -> tuple:
+    """(result, seconds, peak bytes or None)."""
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        result = fn()
+    finally:
+        elapsed = time.perf_counter() - started
+        peak = None
+        if trace:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_size(n: int, only: list, trace: bool = False, workers: int = polymarket_trader.SCAN_WORKERS,
+             latency: float = 0.0, error_rate: float = 0.0) -> dict:
+    """Run every selected entry point once at size n. Returns {entry: {seconds, peak_bytes, ...}}."""
+    gamma_dir = gamma_fixture(n)
+    markets = int((gamma_dir / "complete").read_text())
+    server = fixture_server(gamma_dir, latency=latency, error_rate=error_rate)
+    workspace = Workspace(server)
+    out = {}
+    try:
+        # Later stages read the store, so scan always runs; it is only reported if selected
+        scan_stats = {}
+        _, seconds, peak = _measure(lambda: polymarket_trader.scan_markets(full=True, workers=workers,
+                                                                          stats=scan_stats), trace)
+        if "scan_markets" in only:
+            out["scan_markets"] = {"seconds": seconds, "peak_bytes": peak, "records": scan_stats["markets"],
+                                   "pages": scan_stats["pages"]}
+
+        if "analyze_all" in only:
+            signals, seconds, peak = _measure(strategies.analyze_all, trace)
+            out["analyze_all"] = {"seconds": seconds, "peak_bytes": peak, "records": signals["total_markets"]}
+
+        if "scan_arbitrage" in only:
+            result, seconds, peak = _measure(lambda: arbitrage.scan_arbitrage(live=False), trace)
+            # A tick on a built scanner: overwrite every price, reduce every event
+            scanner = arbitrage.build_scanner()
+            quotes = {m: {"yes_price": 0.5, "no_price": 0.5} for m in scanner.layout.market_ids}
+            _, tick, _ = _measure(lambda: (scanner.apply_quotes(quotes), scanner.scan()), False)
+            out["scan_arbitrage"] = {"seconds": seconds, "peak_bytes": peak, "records": result["markets"],
+                                     "events": result["events"], "tick_ms": tick * 1000}
+
+        if {"check_open_bets", "calculate_performance"} & set(only):
+            ledger.get_ledger().import_json(ledger_fixture(n, markets))
+            if "check_open_bets" in only:
+                bets, seconds, peak = _measure(lambda: polymarket_trader.check_open_bets(workers=workers), trace)
+                out["check_open_bets"] = {"seconds": seconds, "peak_bytes": peak, "records": len(bets),
+                                          "priced": sum(1 for b in bets if "current_price" in b)}
+            if "calculate_performance" in only:
+                perf, seconds, peak = _measure(lambda: polymarket_trader.calculate_performance(by="strategy"), trace)
+                out["calculate_performance"] = {"seconds": seconds, "peak_bytes": peak,
+                                                "records": perf["total_bets"]}
+
+        if "extract_risk_factors" in only:
+            html = tenk_fixture(n).read_text()
+            text, seconds, peak = _measure(lambda: extract_risk_factors(html), trace)
+            out["extract_risk_factors"] = {"seconds": seconds, "peak_bytes": peak, "records": n,
+                                           "input_bytes": len(html), "output_chars": len(text or "")}
+    finally:
+        workspace.close()
+        server.close()
+    return out
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=WORKSPACE, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run_benchmarks(sizes: list = DEFAULT_SIZES, only: Optional[list] = None, memory: bool = True,
+                   workers: int = polymarket_trader.SCAN_WORKERS, latency: float = 0.0,
+                   error_rate: float = 0.0) -> dict:
+    """Time (and optionally trace) each entry point at each size. `latency` is in seconds."""
+    only = only or ENTRY_POINTS
+    rows = []
+    server = {"latency": latency, "error_rate": error_rate}
+    for n in sizes:
+        timed = run_size(n, only, workers=workers, **server)
+        traced = run_size(n, only, trace=True, workers=workers, **server) if memory else {}
+        for entry in ENTRY_POINTS:
+            if entry not in timed:
+                continue
+            row = {"entry": entry, "size": n, **timed[entry]}
+            row["peak_bytes"] = traced.get(entry, {}).get("peak_bytes")
+            row["records_per_s"] = row["records"] / row["seconds"] if row["seconds"] > 0 else None
+            rows.append(row)
+            print_row(row)
+    return {
+        "generated_at": utcnow(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": SEED,
+        "sizes": sizes,
+        "workers": workers,
+        "server": server,
+        "results": rows,
+    }
+
+
+def print_row(row: dict):
+    peak = f"{row['peak_bytes'] / 2 ** 20:.1f}" if row.get("peak_bytes") is not None else "-"
+    rate = f"{row['records_per_s']:,.0f}" if row.get("records_per_s") else "-"
+    print(f"{row['entry']:<22} {row['size']:>9,} {row['seconds']:>10.3f}s {rate:>14}/s {peak:>10} MB")
+
+
+def compare(old: dict, new: dict):
+    """Print new/old time and memory ratios for every (entry, size) in both runs."""
+    before = {(r["entry"], r["size"]): r for r in old["results"]}
+    print(f"\n{old.get('commit')} -> {new.get('commit')}")
+    print(f"{'entry':<22} {'size':>9} {'old s':>9} {'new s':>9} {'time':>7} {'old MB':>8} {'new MB':>8} {'mem':>7}")
+    for r in new["results"]:
+        o = before.get((r["entry"], r["size"]))
+        if o is None:
+            continue
+        mem = ""
+        if o.get("peak_bytes") and r.get("peak_bytes"):
+            mem = (f"{o['peak_bytes'] / 2 ** 20:>8.1f} {r['peak_bytes'] / 2 ** 20:>8.1f} "
+                   f"{r['peak_bytes'] / o['peak_bytes']:>6.2f}x")
+        print(f"{r['entry']:<22} {r['size']:>9,} {o['seconds']:>9.3f} {r['seconds']:>9.3f} "
+              f"{r['seconds'] / o['seconds']:>6.2f}x {mem}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Offline pipeline benchmarks")
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES, help="Record counts to run")
+    parser.add_argument("--only", nargs="+", choices=ENTRY_POINTS, help="Entry points to run (default: all)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--workers", type=int, default=polymarket_trader.SCAN_WORKERS,
+                        help="Concurrent requests for scans and pricing")
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean latency the server adds (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests the server fails")
+    parser.add_argument("--out", help="Results path (default: data/bench/results/<timestamp>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Compare two results files")
+    parser.add_argument("--regenerate", action="store_true", help="Re-record fixtures for these sizes")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+
+    if args.compare:
+        compare(*(json.loads(Path(p).read_text()) for p in args.compare))
+    else:
+        if args.regenerate:
+            for n in args.sizes:
+                shutil.rmtree(FIXTURES_DIR / f"gamma_{n}", ignore_errors=True)
+                for path in (FIXTURES_DIR / f"ledger_{n}.json", FIXTURES_DIR / f"tenk_{n}.html"):
+                    path.unlink(missing_ok=True)
+        print(f"{'entry':<22} {'size':>9} {'time':>11} {'throughput':>16} {'peak':>13}")
+        results = run_benchmarks(args.sizes, only=args.only, memory=not args.no_memory, workers=args.workers,
+                                 latency=args.latency / 1000, error_rate=args.error_rate)
+        out = Path(args.out) if args.out else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(results, indent=2))
+        print(f"\nResults saved to {out}")
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Polymarket Event Index
+Markets grouped by the event they were listed under, maintained at ingest.
+
+Scans flatten events into markets; this puts them back together. Besides
+per-event lookups it keeps a contiguous layout (every event's markets in one
+run, plus the offset where each run starts) so per-event sums, minimums and
+counts over the whole universe are single np.add.reduceat / np.minimum.reduceat
+calls. The layout is rebuilt only after an event gains or loses a market.
+
+Events flagged negRisk by Gamma are mutually exclusive: exactly one of their
+markets resolves YES.
+
+Usage:
+    python event_index.py --stats                # Events, group sizes, exclusive events
+    python event_index.py --event EVENT_ID       # Markets listed under an event
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+class EventLayout:
+    """
+    Event-contiguous arrays: market_ids[starts[i]:starts[i] + sizes[i]] are the
+    markets of event_ids[i].
+    """
+
+    __slots__ = ("event_ids", "market_ids", "starts", "sizes", "exclusive", "rows")
+
+    def __init__(self, groups: list, exclusive: set):
+        self.event_ids = np.array([e for e, _ in groups], dtype=object)
+        self.sizes = np.fromiter((len(m) for _, m in groups), dtype=np.int64, count=len(groups))
+        self.starts = np.zeros(len(groups), dtype=np.int64)
+        np.cumsum(self.sizes[:-1], out=self.starts[1:])
+        self.market_ids = np.array([m for _, markets in groups for m in markets], dtype=object)
+        self.exclusive = np.fromiter((e in exclusive for e, _ in groups), dtype=bool, count=len(groups))
+        self.rows = {market_id: i for i, market_id in enumerate(self.market_ids)}
+
+    def __len__(self) -> int:
+        return len(self.event_ids)
+
+
+class EventIndex:
+    """Market ids per event id, with incremental add/remove."""
+
+    def __init__(self, entries: Iterable[tuple] = (), exclusive: Iterable[str] = ()):
+        # Insertion-ordered dicts used as sets, so layouts are stable between rebuilds
+        self._events = {}
+        self._by_id = {}
+        self._exclusive = {str(e) for e in exclusive}
+        self._layouts = {}
+        for market_id, event_id in entries:
+            self.add(market_id, event_id)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __contains__(self, event_id: str) -> bool:
+        return str(event_id) in self._events
+
+    def add(self, market_id: str, event_id: Optional[str]):
+        """Insert or move a market. A market without an event is just removed."""
+        market_id = str(market_id)
+        event_id = None if event_id is None else str(event_id)
+        if self._by_id.get(market_id) == event_id and event_id is not None:
+            return
+        self.remove(market_id)
+        if event_id is None:
+            return
+        self._events.setdefault(event_id, {})[market_id] = None
+        self._by_id[market_id] = event_id
+        self._layouts.clear()
+
+    def remove(self, market_id: str):
+        """Drop a market (e.g. once it has closed); empty events go with it."""
+        event_id = self._by_id.pop(str(market_id), None)
+        if event_id is None:
+            return
+        markets = self._events[event_id]
+        del markets[str(market_id)]
+        if not markets:
+            del self._events[event_id]
+        self._layouts.clear()
+
+    def set_exclusive(self, event_id: str, exclusive: bool):
+        """Mark an event mutually exclusive (negRisk) or not."""
+        event_id = str(event_id)
+        if (event_id in self._exclusive) != bool(exclusive):
+            if exclusive:
+                self._exclusive.add(event_id)
+            else:
+                self._exclusive.discard(event_id)
+            self._layouts.clear()
+
+    def is_exclusive(self, event_id: str) -> bool:
+        return str(event_id) in self._exclusive
+
+    def markets(self, event_id: str) -> list:
+        return list(self._events.get(str(event_id), ()))
+
+    def event_of(self, market_id: str) -> Optional[str]:
+        return self._by_id.get(str(market_id))
+
+    def layout(self, min_markets: int = 2) -> EventLayout:
+        """Contiguous layout of the events with at least `min_markets` markets, cached until the next change."""
+        if min_markets not in self._layouts:
+            groups = [(e, list(m)) for e, m in self._events.items() if len(m) >= min_markets]
+            self._layouts[min_markets] = EventLayout(groups, self._exclusive)
+        return self._layouts[min_markets]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+    from market_store import get_store
+
+    parser = argparse.ArgumentParser(description="Polymarket event index")
+    parser.add_argument("--stats", action="store_true", help="Events, group sizes and exclusive events")
+    parser.add_argument("--event", help="Markets listed under an event ID")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+    store = get_store()
+    index = store.event_index
+
+    if args.event:
+        markets = store.get_many(index.markets(args.event))
+        flag = " (exclusive)" if index.is_exclusive(args.event) else ""
+        print(f"Event {args.event}{flag}: {len(markets)} markets")
+        for m in sorted(markets.values(), key=lambda m: -m.yes_price):
+            print(f"  {m.market_id:>8}  YES {m.yes_price:6.1%}  {(m.question or '')[:60]}")
+    elif args.stats:
+        layout = index.layout(min_markets=1)
+        multi = layout.sizes >= 2
+        print(f"Events: {len(layout)} | Markets: {len(layout.market_ids)}")
+        print(f"Multi-market events: {int(multi.sum())} | Exclusive (negRisk): {int(layout.exclusive.sum())}")
+        if len(layout):
+            print(f"Largest event: {int(layout.sizes.max())} markets")
+    else:
+        parser.print_help()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Polymarket Expiry Index
+End dates parsed to epoch once at ingest and kept sorted, so "resolving within
+N hours" is two bisections instead of parsing every market's end date.
+
+Usage:
+    python expiry_index.py --within 48           # Markets resolving in the next 48h
+    python expiry_index.py --between 24 168      # Resolving in 1-7 days
+    python expiry_index.py --expired             # Past their end date
+"""
+
+import bisect
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+def parse_end_epoch(end_date: Optional[str]) -> float:
+    """Epoch seconds for an ISO end date, NaN if missing or unparseable."""
+    if not end_date:
+        return np.nan
+    try:
+        return datetime.fromisoformat(end_date.replace("Z", "+00:00")).timestamp()
+    except (ValueError, TypeError, AttributeError):
+        return np.nan
+
+
+class ExpiryIndex:
+    """Market ids sorted by end epoch, with incremental add/remove."""
+
+    def __init__(self, entries: Iterable[tuple] = ()):
+        self._epochs = []
+        self._ids = []
+        self._by_id = {}
+        pairs = sorted((float(e), str(m)) for m, e in entries if e is not None and e == e)
+        for epoch, market_id in pairs:
+            self._epochs.append(epoch)
+            self._ids.append(market_id)
+            self._by_id[market_id] = epoch
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, market_id: str) -> bool:
+        return market_id in self._by_id
+
+    def add(self, market_id: str, epoch: Optional[float]):
+        """Insert or move a market. A missing/NaN epoch just removes it."""
+        market_id = str(market_id)
+        self.remove(market_id)
+        if epoch is None or epoch != epoch:
+            return
+        epoch = float(epoch)
+        i = bisect.bisect_right(self._epochs, epoch)
+        self._epochs.insert(i, epoch)
+        self._ids.insert(i, market_id)
+        self._by_id[market_id] = epoch
+
+    def remove(self, market_id: str):
+        """Drop a market (e.g. once it has closed)."""
+        epoch = self._by_id.pop(str(market_id), None)
+        if epoch is None:
+            return
+        lo = bisect.bisect_left(self._epochs, epoch)
+        hi = bisect.bisect_right(self._epochs, epoch)
+        i = self._ids.index(str(market_id), lo, hi)
+        del self._epochs[i]
+        del self._ids[i]
+
+    def between(self, start: float, end: float) -> list:
+        """Market ids with start < end_epoch <= end, soonest first."""
+        lo = bisect.bisect_right(self._epochs, start)
+        hi = bisect.bisect_right(self._epochs, end)
+        return self._ids[lo:hi]
+
+    def within_hours(self, max_hours: float, min_hours: float = 0, now: Optional[float] = None) -> list:
+        """Market ids resolving between min_hours and max_hours from now."""
+        now = time.time() if now is None else now
+        return self.between(now + min_hours * 3600, now + max_hours * 3600)
+
+    def expired(self, now: Optional[float] = None) -> list:
+        """Market ids whose end date has passed."""
+        now = time.time() if now is None else now
+        return self._ids[:bisect.bisect_right(self._epochs, now)]
+
+    def epoch(self, market_id: str) -> Optional[float]:
+        return self._by_id.get(str(market_id))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+    from market_store import get_store
+
+    parser = argparse.ArgumentParser(description="Polymarket expiry index")
+    parser.add_argument("--within", type=float, help="Resolving within N hours")
+    parser.add_argument("--between", nargs=2, type=float, metavar=("MIN_H", "MAX_H"),
+                        help="Resolving between MIN_H and MAX_H hours from now")
+    parser.add_argument("--expired", action="store_true", help="Markets past their end date")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+    store = get_store()
+
+    if args.within is not None:
+        ids = store.expiry_index.within_hours(args.within)
+    elif args.between:
+        ids = store.expiry_index.within_hours(args.between[1], min_hours=args.between[0])
+    elif args.expired:
+        ids = store.expiry_index.expired()
+    else:
+        parser.print_help()
+        ids = None
+
+    if ids is not None:
+        markets = store.get_many(ids)
+        now = time.time()
+        for market_id in ids:
+            m = markets[market_id]
+            hours = (m["end_epoch"] - now) / 3600
+            print(f"  {hours:+8.1f}h  {market_id:>8}  YES {m['yes_price']:.1%}  {m['question'][:60]}")
+        print(f"\n{len(ids)} markets")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Polymarket Fill Simulator
+Walks an OrderBook to fill a USDC amount the way a marketable order would,
+instead of assuming unlimited liquidity at the typed price.
+
+Every fill reports the VWAP, how much of the request actually filled, the fee
+and the slippage against the touch in basis points. simulate_fills() does the
+same for a whole array of order sizes against one book in a few NumPy calls,
+which is what backtests use.
+
+Usage:
+    python fill_simulator.py TOKEN_ID 100 250 1000   # Simulate buys on a live book
+    python fill_simulator.py TOKEN_ID 100 --limit 0.55 --fee-bps 200
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from orderbook import ASK, BID, OrderBook
+
+# CLOB fee rate in bps; most markets are fee-free. The fee is charged on
+# min(price, 1 - price) per share, so it is symmetric between YES and NO.
+FEE_RATE_BPS = 0.0
+# Bisection steps when sizing a fill so notional plus fee fits a budget
+BUDGET_SEARCH_STEPS = 50
+
+
+def fee_for(shares, price, fee_rate_bps: float = FEE_RATE_BPS):
+    """Polymarket fee for `shares` traded at `price` (works on arrays too)."""
+    return fee_rate_bps / 1e4 * np.minimum(price, 1 - price) * shares
+
+
+def _walkable(book: OrderBook, side: str, limit_price: Optional[float]) -> tuple:
+    """(prices, cum_size, cum_notional) for the levels an order may take."""
+    levels = book.asks if side == ASK else book.bids
+    n = len(levels) if limit_price is None else levels.levels_through(limit_price)
+    return levels.prices[:n], levels.cum_size()[:n], levels.cum_notional()[:n]
+
+
+def simulate_fill(
+    book: OrderBook,
+    amount: float,
+    side: str = ASK,
+    limit_price: Optional[float] = None,
+    fee_rate_bps: float = FEE_RATE_BPS,
+    fee_inclusive: bool = False
+) -> dict:
+    """
+    Fill `amount` USDC against one side of `book` (buys take asks, sells hit bids).
+
+    Levels worse than `limit_price` are never taken. The fee is charged on top
+    of the filled notional, so "cost" is what the fill actually spent. With
+    fee_inclusive=True a buy is sized so that cost (notional plus fee) stays
+    within `amount`.
+    """
+    if fee_inclusive and side == ASK and fee_rate_bps > 0 and amount > 0:
+        def cost(notional: float) -> float:
+            return simulate_fill(book, notional, side, limit_price, fee_rate_bps)["cost"]
+
+        # Cost grows with notional, so bisect for the largest notional within budget
+        budget = float(amount)
+        if cost(budget) > amount:
+            lo, hi = 0.0, budget
+            for _ in range(BUDGET_SEARCH_STEPS):
+                mid = (lo + hi) / 2
+                lo, hi = (mid, hi) if cost(mid) <= amount else (lo, mid)
+            budget = lo
+        fill = simulate_fill(book, budget, side, limit_price, fee_rate_bps)
+        fill["requested"] = amount
+        return fill
+
+    prices, cum_size, cum_notional = _walkable(book, side, limit_price)
+    touch = book.best_ask if side == ASK else book.best_bid
+    fill = {
+        "requested": amount,
+        "filled": 0.0,
+        "shares": 0.0,
+        "vwap": None,
+        "touch": touch,
+        "levels": 0,
+        "partial": True,
+        "fee": 0.0,
+        "cost": 0.0,
+        "slippage_bps": None,
+    }
+    if amount <= 0 or not len(prices):
+        return fill
+
+    i = int(np.searchsorted(cum_notional, amount, side="left"))
+    if i >= len(prices):
+        notional, shares, levels = float(cum_notional[-1]), float(cum_size[-1]), len(prices)
+    else:
+        before_notional = float(cum_notional[i - 1]) if i > 0 else 0.0
+        before_size = float(cum_size[i - 1]) if i > 0 else 0.0
+        notional = float(amount)
+        shares = before_size + (amount - before_notional) / float(prices[i])
+        levels = i + 1
+
+    vwap = notional / shares
+    fee = float(fee_for(shares, vwap, fee_rate_bps))
+    # Positive slippage is always a worse price than the touch
+    slippage = (vwap - touch) / touch if side == ASK else (touch - vwap) / touch
+    fill.update({
+        "filled": notional,
+        "shares": shares,
+        "vwap": vwap,
+        "levels": levels,
+        "partial": notional < amount - 1e-9,
+        "fee": fee,
+        "cost": notional + fee if side == ASK else notional - fee,
+        "slippage_bps": slippage * 1e4,
+    })
+    return fill
+
+
+def simulate_fills(
+    book: OrderBook,
+    amounts,
+    side: str = ASK,
+    limit_price: Optional[float] = None,
+    fee_rate_bps: float = FEE_RATE_BPS
+) -> dict:
+    """
+    Vectorized simulate_fill() for many USDC amounts against the same book.
+
+    Returns a dict of arrays ("filled", "shares", "vwap", "fee",
+    "slippage_bps", "partial"); rows that fill nothing have NaN vwap/slippage.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    prices, cum_size, cum_notional = _walkable(book, side, limit_price)
+    touch = book.best_ask if side == ASK else book.best_bid
+    if not len(prices):
+        zeros = np.zeros_like(amounts)
+        nans = np.full_like(amounts, np.nan)
+        return {"filled": zeros, "shares": zeros, "vwap": nans, "fee": zeros,
+                "slippage_bps": nans, "partial": amounts > 0}
+
+    amounts = np.maximum(amounts, 0.0)
+    i = np.searchsorted(cum_notional, amounts, side="left")
+    exhausted = i >= len(prices)
+    j = np.minimum(i, len(prices) - 1)
+    # Prefix sums up to (but excluding) the level each order finishes on
+    before_notional = np.where(j > 0, cum_notional[j - 1], 0.0)
+    before_size = np.where(j > 0, cum_size[j - 1], 0.0)
+
+    filled = np.where(exhausted, cum_notional[-1], amounts)
+    shares = np.where(exhausted, cum_size[-1], before_size + (amounts - before_notional) / prices[j])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vwap = np.where(shares > 0, filled / shares, np.nan)
+    slippage = (vwap - touch) / touch if side == ASK else (touch - vwap) / touch
+    return {
+        "filled": filled,
+        "shares": shares,
+        "vwap": vwap,
+        "fee": fee_for(shares, np.nan_to_num(vwap), fee_rate_bps),
+        "slippage_bps": slippage * 1e4,
+        "partial": filled < amounts - 1e-9,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    import metrics
+    from market_data import fetch_token_data
+
+    parser = argparse.ArgumentParser(description="Walk-the-book fill simulator")
+    parser.add_argument("token_id", help="CLOB token id")
+    parser.add_argument("amounts", nargs="+", type=float, help="USDC amounts to fill")
+    parser.add_argument("--sell", action="store_true", help="Hit the bids instead of lifting the asks")
+    parser.add_argument("--limit", type=float, help="Limit price")
+    parser.add_argument("--fee-bps", type=float, default=FEE_RATE_BPS, help="Fee rate in bps")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+
+    data = fetch_token_data([args.token_id], sides=())[args.token_id]
+    if data["book"] is None:
+        print(f"Could not fetch book: {data['errors']}")
+    else:
+        book = OrderBook.from_json(data["book"], token_id=args.token_id)
+        for amount in args.amounts:
+            fill = simulate_fill(book, amount, side=BID if args.sell else ASK,
+                                 limit_price=args.limit, fee_rate_bps=args.fee_bps)
+            print(json.dumps(fill))
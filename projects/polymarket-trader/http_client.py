@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Polymarket HTTP Client
+One client layer for every Gamma and CLOB call: keep-alive pools per host,
+jittered retries, a token-bucket rate limiter per host, ETag/If-Modified-Since
+revalidation, an on-disk TTL response cache, and per-endpoint counters (also
+fed to the metrics registry, with a latency histogram per endpoint).
+
+The disk cache is pruned as it is written: entries older than CACHE_MAX_AGE
+go, then the oldest ones until it fits in CACHE_MAX_BYTES.
+
+POLYMARKET_GAMMA_API / POLYMARKET_CLOB_API point every module at another base
+URL (e.g. an api_replay.py server), and POLYMARKET_RATE_LIMIT="RATE,BURST"
+sets the limit for hosts without their own entry in RATE_LIMITS.
+
+Usage:
+    python http_client.py --clear-cache      # Drop the on-disk response cache
+    python http_client.py --prune-cache      # Apply the cache's age and size caps now
+"""
+
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlencode, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+HTTP_CACHE_DIR = DATA_DIR / "http_cache"
+
+LIVE_GAMMA_API = "https://gamma-api.polymarket.com"
+LIVE_CLOB_API = "https://clob.polymarket.com"
+GAMMA_API = os.environ.get("POLYMARKET_GAMMA_API", LIVE_GAMMA_API).rstrip("/")
+CLOB_API = os.environ.get("POLYMARKET_CLOB_API", LIVE_CLOB_API).rstrip("/")
+
+POOL_SIZE = 32
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# (requests per second, burst) per host
+RATE_LIMITS = {
+    "gamma-api.polymarket.com": (20, 40),
+    "clob.polymarket.com": (50, 100),
+}
+DEFAULT_RATE_LIMIT = (20, 40)
+
+# Disk cache caps, enforced every CACHE_PRUNE_EVERY writes
+CACHE_MAX_AGE = 7 * 86400
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+CACHE_PRUNE_EVERY = 500
+
+
+def parse_rate_limit(value: str) -> tuple:
+    """Parse "RATE" or "RATE,BURST"; the burst defaults to twice the rate."""
+    rate, _, burst = value.partition(",")
+    return float(rate), int(burst) if burst else max(1, int(float(rate) * 2))
+
+
+if os.environ.get("POLYMARKET_RATE_LIMIT"):
+    DEFAULT_RATE_LIMIT = parse_rate_limit(os.environ["POLYMARKET_RATE_LIMIT"])
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token. Returns seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def try_acquire(self) -> float:
+        """Take one token without blocking. Returns 0 on success, else seconds until one is free."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+def endpoint_name(url: str) -> str:
+    """Stats key for a URL: host plus path with numeric ids collapsed."""
+    parsed = urlparse(url)
+    path = re.sub(r"/\d+(?=/|$)", "/{id}", parsed.path)
+    return f"{parsed.netloc}{path}"
+
+
+class PolymarketClient:
+    """Pooled, rate-limited, caching JSON client shared by every module."""
+
+    def __init__(
+        self,
+        pool_size: int = POOL_SIZE,
+        max_retries: int = MAX_RETRIES,
+        rate_limits: Optional[dict] = None,
+        cache_dir: Optional[Path] = None
+    ):
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.rate_limits = {**RATE_LIMITS, **(rate_limits or {})}
+        self.cache_dir = Path(cache_dir or HTTP_CACHE_DIR)
+        self._sessions = {}
+        self._buckets = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._cache_writes = 0
+
+    # -- plumbing ------------------------------------------------------------
+
+    def session(self, host: str) -> requests.Session:
+        with self._lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+                rate, burst = self.rate_limits.get(host, DEFAULT_RATE_LIMIT)
+                self._buckets[host] = TokenBucket(rate, burst)
+            return self._sessions[host]
+
+    def _record(self, endpoint: str, **deltas):
+        with self._lock:
+            entry = self._stats.setdefault(endpoint, {
+                "requests": 0, "errors": 0, "retries": 0, "bytes": 0,
+                "cache_hits": 0, "not_modified": 0, "latency_s": 0.0,
+                "max_latency_s": 0.0, "throttled_s": 0.0,
+            })
+            for key, value in deltas.items():
+                if key == "max_latency_s":
+                    entry[key] = max(entry[key], value)
+                else:
+                    entry[key] += value
+        for key, value in deltas.items():
+            if key == "latency_s":
+                metrics.observe("http_request_seconds", value, endpoint=endpoint)
+            elif key == "throttled_s":
+                metrics.inc("http_throttled_seconds", value, endpoint=endpoint)
+            elif key != "max_latency_s":
+                metrics.inc(f"http_{key}", value, endpoint=endpoint)
+
+    def stats(self) -> dict:
+        """Per-endpoint counters, with mean latency filled in."""
+        with self._lock:
+            out = {}
+            for endpoint, entry in self._stats.items():
+                out[endpoint] = dict(entry)
+                out[endpoint]["mean_latency_s"] = entry["latency_s"] / entry["requests"] if entry["requests"] else 0.0
+            return out
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    # -- disk cache ----------------------------------------------------------
+
+    def _cache_path(self, url: str, params: Optional[dict]) -> Path:
+        key = url + "?" + urlencode(sorted((params or {}).items()), doseq=True)
+        return self.cache_dir / (hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def _cache_read(self, path: Path) -> Optional[dict]:
+        try:
+            return json.loads(path.read_text())
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _cache_write(self, path: Path, entry: dict):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(entry))
+        os.replace(tmp, path)
+        with self._lock:
+            prune = self._cache_writes % CACHE_PRUNE_EVERY == 0
+            self._cache_writes += 1
+        if prune:
+            self.prune_cache()
+
+    def prune_cache(self, max_age: float = CACHE_MAX_AGE, max_bytes: int = CACHE_MAX_BYTES) -> int:
+        """Drop entries older than max_age, then the oldest until the cache fits max_bytes. Returns entries removed."""
+        entries = []
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob("*.json"):
+                try:
+                    st = path.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        entries.sort(key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        cutoff = time.time() - max_age
+        removed = 0
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+    def clear_cache(self) -> int:
+        removed = 0
+        if self.cache_dir.exists():
+            for path in self.cache_dir.glob("*.json"):
+                path.unlink()
+                removed += 1
+        return removed
+
+    # -- requests ------------------------------------------------------------
+
+    def get_json(
+        self,
+        url: str,
+        params: Optional[dict] = None,
+        timeout: float = 10,
+        cache_ttl: Optional[float] = None
+    ):
+        """GET a JSON payload (see request_json)."""
+        return self.request_json("GET", url, params=params, timeout=timeout, cache_ttl=cache_ttl)
+
+    def post_json(self, url: str, payload, timeout: float = 10):
+        """POST a JSON body and return the JSON response, e.g. for CLOB batch endpoints."""
+        return self.request_json("POST", url, payload=payload, timeout=timeout)
+
+    def request_json(
+        self,
+        method: str,
+        url: str,
+        params: Optional[dict] = None,
+        payload=None,
+        timeout: float = 10,
+        cache_ttl: Optional[float] = None
+    ):
+        """
+        Send a request and decode its JSON payload.
+
+        cache_ttl=None skips the disk cache entirely (it is only ever used for
+        GETs). Otherwise a cached body younger than cache_ttl is returned
+        without a request, and an older one is revalidated with
+        If-None-Match / If-Modified-Since.
+
+        Retries connection errors, timeouts, 429 and 5xx with jittered
+        exponential backoff; raises the last requests exception when out of
+        retries.
+        """
+        endpoint = endpoint_name(url)
+        cache_path = cached = None
+        if cache_ttl is not None and method == "GET":
+            cache_path = self._cache_path(url, params)
+            cached = self._cache_read(cache_path)
+            if cached and time.time() - cached["fetched_at"] < cache_ttl:
+                self._record(endpoint, cache_hits=1)
+                return cached["body"]
+
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        host = urlparse(url).netloc
+        session = self.session(host)
+        attempt = 0
+        while True:
+            throttled = self._buckets[host].acquire()
+            started = time.perf_counter()
+            try:
+                resp = session.request(method, url, params=params, json=payload, headers=headers,
+                                       timeout=timeout)
+                elapsed = time.perf_counter() - started
+                self._record(endpoint, requests=1, bytes=len(resp.content), latency_s=elapsed,
+                             max_latency_s=elapsed, throttled_s=throttled)
+
+                if resp.status_code == 304 and cached:
+                    self._record(endpoint, not_modified=1)
+                    cached["fetched_at"] = time.time()
+                    self._cache_write(cache_path, cached)
+                    return cached["body"]
+
+                if resp.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    attempt += 1
+                    self._record(endpoint, retries=1)
+                    self._sleep_backoff(attempt, resp.headers.get("Retry-After"))
+                    continue
+
+                resp.raise_for_status()
+                with metrics.stage("http.decode"):
+                    body = resp.json()
+                if cache_path is not None:
+                    self._cache_write(cache_path, {
+                        "url": url,
+                        "params": params,
+                        "etag": resp.headers.get("ETag"),
+                        "last_modified": resp.headers.get("Last-Modified"),
+                        "fetched_at": time.time(),
+                        "body": body,
+                    })
+                return body
+
+            except (requests.ConnectionError, requests.Timeout) as e:
+                elapsed = time.perf_counter() - started
+                self._record(endpoint, requests=1, latency_s=elapsed, max_latency_s=elapsed)
+                if attempt < self.max_retries:
+                    attempt += 1
+                    self._record(endpoint, retries=1)
+                    self._sleep_backoff(attempt)
+                    continue
+                self._record(endpoint, errors=1)
+                raise
+            except (requests.HTTPError, ValueError):
+                self._record(endpoint, errors=1)
+                raise
+
+    @staticmethod
+    def _sleep_backoff(attempt: int, retry_after: Optional[str] = None):
+        """Full-jitter exponential backoff, but never sooner than Retry-After."""
+        delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        try:
+            delay = max(delay, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+        time.sleep(delay)
+
+
+_client: Optional[PolymarketClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> PolymarketClient:
+    """The process-wide client, so every module shares its pools and counters."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = PolymarketClient()
+        return _client
+
+
+def print_stats(stats: Optional[dict] = None):
+    """Print per-endpoint request counters."""
+    stats = stats if stats is not None else get_client().stats()
+    if not stats:
+        return
+    print(f"\n{'endpoint':<45} {'reqs':>6} {'hits':>6} {'304':>5} {'retry':>6} {'err':>5} {'KB':>9} {'ms avg':>8}")
+    for endpoint, s in sorted(stats.items()):
+        print(f"{endpoint:<45} {s['requests']:>6} {s['cache_hits']:>6} {s['not_modified']:>5} "
+              f"{s['retries']:>6} {s['errors']:>5} {s['bytes'] / 1024:>9.1f} {s['mean_latency_s'] * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Polymarket HTTP client")
+    parser.add_argument("--clear-cache", action="store_true", help="Drop the on-disk response cache")
+    parser.add_argument("--prune-cache", action="store_true", help="Apply the cache's age and size caps now")
+
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+
+    if args.clear_cache:
+        print(f"Removed {get_client().clear_cache()} cached responses from {HTTP_CACHE_DIR}")
+    elif args.prune_cache:
+        print(f"Pruned {get_client().prune_cache()} cached responses from {HTTP_CACHE_DIR}")
+    else:
+        parser.print_help()
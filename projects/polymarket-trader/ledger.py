@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Polymarket Bet Ledger
+Transactional SQLite (WAL) ledger for paper bets.
+
+Replaces rewriting paper_bets.json on every bet: each write is one small
+transaction under SQLite's write lock, so concurrent heartbeat processes
+serialize instead of losing each other's bets, and bet ids are allocated
+inside that transaction so they can't collide. Lookups by bet id, market and
+status go through indexes, and the history view reads only the newest rows.
+
+Counts, invested and realized P&L per strategy, day and category are kept
+as running totals updated in the same transaction as each place, resolve and
+sell, so performance reports read a handful of rows.
+
+Usage:
+    python ledger.py --stats                    # Bet counts by status
+    python ledger.py --get BET_ID               # Print one bet
+    python ledger.py --tail 20                  # Newest bets
+    python ledger.py --import-json              # (Re)import paper_bets.json
+    python ledger.py --rebuild                  # Recompute aggregates from the bets
+"""
+
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+LEDGER_DB_FILE = DATA_DIR / "ledger.db"
+PAPER_BETS_FILE = DATA_DIR / "paper_bets.json"
+
+# Seconds a writer waits for another process's transaction
+LOCK_TIMEOUT = 30
+
+# Columns stored per bet; anything else in a bet dict lands in `extra`
+BET_FIELDS = [
+    "id", "market_id", "question", "outcome", "strategy", "entry_price",
+    "amount", "shares", "reasoning", "placed_at", "status",
+    "exit_price", "exit_at", "pnl",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bets (
+    seq         INTEGER PRIMARY KEY,
+    id          TEXT NOT NULL UNIQUE,
+    market_id   TEXT,
+    question    TEXT,
+    outcome     TEXT,
+    strategy    TEXT,
+    entry_price REAL,
+    amount      REAL,
+    shares      REAL,
+    reasoning   TEXT,
+    placed_at   TEXT,
+    status      TEXT NOT NULL,
+    exit_price  REAL,
+    exit_at     TEXT,
+    pnl         REAL,
+    extra       TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_bets_market ON bets(market_id);
+CREATE INDEX IF NOT EXISTS idx_bets_status ON bets(status);
+CREATE TABLE IF NOT EXISTS aggregates (
+    scope        TEXT NOT NULL,
+    key          TEXT NOT NULL,
+    total_bets   INTEGER NOT NULL DEFAULT 0,
+    open_bets    INTEGER NOT NULL DEFAULT 0,
+    closed_bets  INTEGER NOT NULL DEFAULT 0,
+    wins         INTEGER NOT NULL DEFAULT 0,
+    losses       INTEGER NOT NULL DEFAULT 0,
+    sold         INTEGER NOT NULL DEFAULT 0,
+    invested     REAL NOT NULL DEFAULT 0,
+    realized_pnl REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, key)
+);
+CREATE TABLE IF NOT EXISTS equity (
+    ts             REAL PRIMARY KEY,
+    positions      INTEGER NOT NULL,
+    cost           REAL NOT NULL,
+    value          REAL NOT NULL,
+    unrealized_pnl REAL NOT NULL,
+    realized_pnl   REAL NOT NULL,
+    equity         REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# One portfolio valuation per mark-to-market pass
+EQUITY_FIELDS = ["ts", "positions", "cost", "value", "unrealized_pnl", "realized_pnl", "equity"]
+
+# Running totals kept per (scope, key); scopes are "all", "strategy", "day"
+# (placement date) and "category" (the market's tags when the bet was placed)
+AGGREGATE_FIELDS = [
+    "total_bets", "open_bets", "closed_bets", "wins", "losses", "sold",
+    "invested", "realized_pnl",
+]
+AGGREGATES_VERSION = "1"
+
+
+def utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def aggregate_keys(bet: dict) -> list:
+    """Every (scope, key) a bet counts towards."""
+    keys = [
+        ("all", ""),
+        ("strategy", bet.get("strategy") or "unlabeled"),
+        ("day", (bet.get("placed_at") or "")[:10] or "unknown"),
+    ]
+    keys.extend(("category", c) for c in bet.get("categories") or ["uncategorized"])
+    return keys
+
+
+def placed_delta(bet: dict) -> dict:
+    return {"total_bets": 1, "open_bets": 1, "invested": bet.get("amount") or 0.0}
+
+
+def closed_delta(bet: dict) -> dict:
+    """Moving a bet from open to won, lost or sold."""
+    delta = {"open_bets": -1, "closed_bets": 1, "realized_pnl": bet.get("pnl") or 0.0}
+    key = {"won": "wins", "lost": "losses", "sold": "sold"}.get(bet["status"])
+    if key:
+        delta[key] = 1
+    return delta
+
+
+def summarize(totals: dict) -> dict:
+    """Derived rates for one aggregate row."""
+    closed, invested = totals["closed_bets"], totals["invested"]
+    return {
+        **totals,
+        "win_rate": totals["wins"] / closed * 100 if closed else 0,
+        "roi": totals["realized_pnl"] / invested * 100 if invested > 0 else 0,
+    }
+
+
+def normalize_legacy_bet(bet: dict) -> dict:
+    """
+    Map a hand-written paper_bets.json entry (market, direction, amount_usd,
+    reason, created_at) onto ledger fields; current-format bets pass through.
+    """
+    if "amount_usd" not in bet and "direction" not in bet:
+        return bet
+    known = {"id", "market", "direction", "entry_price", "amount_usd", "reason",
+             "created_at", "strategy", "status", "market_id"}
+    amount = float(bet.get("amount_usd") or 0)
+    price = float(bet.get("entry_price") or 0)
+    return {
+        "id": bet["id"],
+        "market_id": bet.get("market_id"),
+        "question": bet.get("market", "Unknown"),
+        "outcome": str(bet.get("direction", "")).upper(),
+        "strategy": bet.get("strategy"),
+        "entry_price": price,
+        "amount": amount,
+        "shares": amount / price if price > 0 else 0,
+        "reasoning": bet.get("reason", ""),
+        "placed_at": bet.get("created_at"),
+        "status": bet.get("status", "open"),
+        "exit_price": None,
+        "exit_at": None,
+        "pnl": None,
+        **{k: v for k, v in bet.items() if k not in known},
+    }
+
+
+class BetLedger:
+    """Indexed, cross-process-safe paper-bet ledger over an embedded SQLite database."""
+
+    def __init__(self, path: Optional[Path] = None, import_json: bool = True):
+        self.path = Path(path or LEDGER_DB_FILE)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode: every write opens its own BEGIN IMMEDIATE transaction
+        self.conn = sqlite3.connect(str(self.path), timeout=LOCK_TIMEOUT,
+                                    isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+        # One-time migration from the old JSON file
+        if import_json and self.count() == 0 and PAPER_BETS_FILE.exists():
+            self.import_json(PAPER_BETS_FILE)
+        # Ledgers from before aggregates existed (or with a different layout)
+        if self._get_meta("aggregates_version") != AGGREGATES_VERSION:
+            self.rebuild_aggregates()
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Take SQLite's write lock up front, so read-then-write sequences (id
+        allocation, open -> resolved) can't interleave with another process.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+        else:
+            self.conn.execute("COMMIT")
+
+    # -- writes --------------------------------------------------------------
+
+    def place(self, bet: dict) -> dict:
+        """Insert a new bet, allocating its id if it has none. Returns the stored bet."""
+        with self.transaction() as conn:
+            if not bet.get("id"):
+                seq = conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM bets").fetchone()[0]
+                bet = {**bet, "id": f"bet_{seq}_{int(time.time())}"}
+            conn.execute(self._insert_sql(), self._row(bet))
+            self._bump(bet, placed_delta(bet))
+            if bet.get("status", "open") != "open":
+                self._bump(bet, closed_delta(bet))
+        return bet
+
+    def resolve(self, bet_id: str, outcome: str, exit_at: Optional[str] = None) -> dict:
+        """Mark an open bet won or lost. Returns the updated bet, or {} if not open."""
+        with self.transaction() as conn:
+            row = conn.execute("SELECT * FROM bets WHERE id = ? AND status = 'open'", (bet_id,)).fetchone()
+            if row is None:
+                return {}
+            bet = self._to_dict(row)
+            self._settle(bet, outcome, exit_at or utcnow())
+            self._close(bet)
+        return bet
+
+    def resolve_many(self, outcomes: dict, exit_at: Optional[str] = None) -> list:
+        """
+        Resolve many bets in one transaction from {bet_id: "won" | "lost"}.
+        Bets that are no longer open are skipped, so reruns are no-ops.
+        Returns the bets that changed.
+        """
+        exit_at = exit_at or utcnow()
+        resolved = []
+        with self.transaction() as conn:
+            ids = list(outcomes)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT * FROM bets WHERE status = 'open' AND id IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for row in rows:
+                    bet = self._to_dict(row)
+                    self._settle(bet, outcomes[bet["id"]], exit_at)
+                    self._close(bet)
+                    resolved.append(bet)
+        return resolved
+
+    def sell(self, bet_id: str, exit_price: float, exit_at: Optional[str] = None) -> dict:
+        """Close an open bet at `exit_price` per share. Returns the updated bet, or {} if not open."""
+        with self.transaction() as conn:
+            row = conn.execute("SELECT * FROM bets WHERE id = ? AND status = 'open'", (bet_id,)).fetchone()
+            if row is None:
+                return {}
+            bet = self._to_dict(row)
+            bet["status"] = "sold"
+            bet["exit_at"] = exit_at or utcnow()
+            bet["exit_price"] = exit_price
+            bet["pnl"] = bet["shares"] * exit_price - bet["amount"]
+            self._close(bet)
+        return bet
+
+    def _close(self, bet: dict):
+        """Write a bet's exit fields and fold it into the aggregates (inside a transaction)."""
+        self.conn.execute(
+            "UPDATE bets SET status = ?, exit_price = ?, exit_at = ?, pnl = ? WHERE id = ?",
+            (bet["status"], bet["exit_price"], bet["exit_at"], bet["pnl"], bet["id"])
+        )
+        self._bump(bet, closed_delta(bet))
+
+    def _bump(self, bet: dict, delta: dict):
+        """Add a delta to every aggregate row the bet counts towards."""
+        fields = list(delta)
+        cols = ", ".join(["scope", "key"] + fields)
+        marks = ", ".join("?" * (len(fields) + 2))
+        updates = ", ".join(f"{f} = {f} + excluded.{f}" for f in fields)
+        self.conn.executemany(
+            f"INSERT INTO aggregates ({cols}) VALUES ({marks}) "
+            f"ON CONFLICT(scope, key) DO UPDATE SET {updates}",
+            [[scope, key] + [delta[f] for f in fields] for scope, key in aggregate_keys(bet)]
+        )
+
+    def rebuild_aggregates(self) -> int:
+        """Recompute every aggregate in one streaming pass over the ledger. Returns bets seen."""
+        totals = {}
+        seen = 0
+        with self.transaction() as conn:
+            for bet in self.iter_bets():
+                deltas = [placed_delta(bet)]
+                if bet["status"] != "open":
+                    deltas.append(closed_delta(bet))
+                for key in aggregate_keys(bet):
+                    row = totals.setdefault(key, dict.fromkeys(AGGREGATE_FIELDS, 0))
+                    for delta in deltas:
+                        for field, value in delta.items():
+                            row[field] += value
+                seen += 1
+            conn.execute("DELETE FROM aggregates")
+            conn.executemany(
+                f"INSERT INTO aggregates (scope, key, {', '.join(AGGREGATE_FIELDS)}) "
+                f"VALUES ({', '.join('?' * (len(AGGREGATE_FIELDS) + 2))})",
+                [[scope, key] + [row[f] for f in AGGREGATE_FIELDS] for (scope, key), row in totals.items()]
+            )
+            self._set_meta("aggregates_version", AGGREGATES_VERSION)
+        return seen
+
+    @staticmethod
+    def _settle(bet: dict, outcome: str, exit_at: str):
+        bet["status"] = outcome.lower()  # "won" or "lost"
+        bet["exit_at"] = exit_at
+        if bet["status"] == "won":
+            bet["exit_price"] = 1.0
+            bet["pnl"] = bet["shares"] - bet["amount"]  # shares worth $1 each
+        else:
+            bet["exit_price"] = 0.0
+            bet["pnl"] = -bet["amount"]  # lost entire bet
+
+    def append_equity(self, point: dict):
+        """Record one portfolio valuation (keyed by its epoch ts)."""
+        with self.transaction() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO equity ({', '.join(EQUITY_FIELDS)}) "
+                f"VALUES ({', '.join('?' * len(EQUITY_FIELDS))})",
+                [point[f] for f in EQUITY_FIELDS]
+            )
+
+    def import_json(self, path: Path = PAPER_BETS_FILE) -> int:
+        """
+        Import paper_bets.json, either {"bets": [...]} or the older hand-written
+        list. Bets already in the ledger are left alone. Returns bets added.
+        """
+        data = json.loads(Path(path).read_text())
+        bets = data if isinstance(data, list) else data.get("bets", [])
+        rows = [self._row(normalize_legacy_bet(b)) for b in bets]
+        with self.transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(self._insert_sql(or_ignore=True), rows)
+            added = conn.total_changes - before
+        if added:
+            self.rebuild_aggregates()
+        return added
+
+    def _set_meta(self, key: str, value: str):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    @staticmethod
+    def _insert_sql(or_ignore: bool = False) -> str:
+        cols = ", ".join(BET_FIELDS + ["extra"])
+        marks = ", ".join("?" * (len(BET_FIELDS) + 1))
+        return f"INSERT {'OR IGNORE ' if or_ignore else ''}INTO bets ({cols}) VALUES ({marks})"
+
+    @staticmethod
+    def _row(bet: dict) -> list:
+        extra = {k: v for k, v in bet.items() if k not in BET_FIELDS}
+        return [bet.get(f) for f in BET_FIELDS] + [json.dumps(extra) if extra else None]
+
+    # -- reads ---------------------------------------------------------------
+
+    def get(self, bet_id: str) -> Optional[dict]:
+        """Lookup by bet id (unique index)."""
+        row = self.conn.execute("SELECT * FROM bets WHERE id = ?", (bet_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def by_market(self, market_id: str) -> list:
+        rows = self.conn.execute("SELECT * FROM bets WHERE market_id = ? ORDER BY seq", (str(market_id),))
+        return [self._to_dict(r) for r in rows]
+
+    def by_status(self, status: str) -> list:
+        rows = self.conn.execute("SELECT * FROM bets WHERE status = ? ORDER BY seq", (status,))
+        return [self._to_dict(r) for r in rows]
+
+    def open_bets(self) -> list:
+        return self.by_status("open")
+
+    def tail(self, n: int = 10) -> list:
+        """The newest n bets, oldest first, read backwards off the primary key."""
+        rows = self.conn.execute("SELECT * FROM bets ORDER BY seq DESC LIMIT ?", (int(n),)).fetchall()
+        return [self._to_dict(r) for r in reversed(rows)]
+
+    def iter_bets(self, batch_size: int = 1000) -> Iterator[dict]:
+        """Every bet in placement order, streamed from the cursor."""
+        cursor = self.conn.execute("SELECT * FROM bets ORDER BY seq")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield self._to_dict(row)
+
+    def count(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return self.conn.execute("SELECT COUNT(*) FROM bets").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM bets WHERE status = ?", (status,)).fetchone()[0]
+
+    def performance(self, scope: str = "all", key: Optional[str] = None) -> dict:
+        """
+        Aggregates for one scope as {key: totals with win_rate and roi}, or
+        just one key's totals. Reads maintained rows, so cost is independent
+        of the number of bets.
+        """
+        if key is not None or scope == "all":
+            row = self.conn.execute(
+                "SELECT * FROM aggregates WHERE scope = ? AND key = ?", (scope, key or "")
+            ).fetchone()
+            return summarize({f: row[f] for f in AGGREGATE_FIELDS}) if row else {}
+        rows = self.conn.execute("SELECT * FROM aggregates WHERE scope = ? ORDER BY key", (scope,))
+        return {r["key"]: summarize({f: r[f] for f in AGGREGATE_FIELDS}) for r in rows}
+
+    def equity_curve(self, start: Optional[float] = None, end: Optional[float] = None) -> list:
+        """Recorded valuations with start <= ts < end, oldest first."""
+        rows = self.conn.execute(
+            "SELECT * FROM equity WHERE ts >= ? AND ts < ? ORDER BY ts",
+            (start if start is not None else float("-inf"), end if end is not None else float("inf"))
+        )
+        return [{f: r[f] for f in EQUITY_FIELDS} for r in rows]
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def status_counts(self) -> dict:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM bets GROUP BY status").fetchall())
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        bet = {f: row[f] for f in BET_FIELDS}
+        if row["extra"]:
+            bet.update(json.loads(row["extra"]))
+        return bet
+
+
+_ledgers = {}
+
+
+def get_ledger(path: Optional[Path] = None) -> BetLedger:
+    """Shared ledger per database path."""
+    path = path or LEDGER_DB_FILE
+    key = str(Path(path).resolve())
+    if key not in _ledgers:
+        _ledgers[key] = BetLedger(path)
+    return _ledgers[key]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Polymarket paper-bet ledger")
+    parser.add_argument("--stats", action="store_true", help="Bet counts by status")
+    parser.add_argument("--get", help="Print one bet by ID")
+    parser.add_argument("--tail", type=int, help="Print the newest N bets")
+    parser.add_argument("--import-json", action="store_true", help="Import paper_bets.json")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute aggregates from the bets")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+    ledger = get_ledger()
+
+    if args.import_json:
+        print(f"Imported {ledger.import_json()} new bets from {PAPER_BETS_FILE}")
+    elif args.rebuild:
+        print(f"Rebuilt aggregates from {ledger.rebuild_aggregates()} bets")
+    elif args.get:
+        print(json.dumps(ledger.get(args.get), indent=2))
+    elif args.tail:
+        for bet in ledger.tail(args.tail):
+            print(f"  {bet['id']:<24} {bet['status']:<5} {bet['outcome']:<3} @ {bet['entry_price']:.1%}  "
+                  f"${bet['amount']:.2f}  {(bet['question'] or '')[:50]}")
+    elif args.stats:
+        print(f"Bets: {ledger.count()}")
+        print("Status: " + ", ".join(f"{s} {n}" for s, n in sorted(ledger.status_counts().items())))
+        print(f"Database: {ledger.path}")
+    else:
+        parser.print_help()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Polymarket Market Data
+Batched, concurrent CLOB price and orderbook fetching over the shared client.
+
+Usage:
+    python market_data.py TOKEN_ID [TOKEN_ID ...]   # Print prices + top of book
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Iterable, Optional
+
+from http_client import CLOB_API, get_client
+from orderbook import OrderBook
+
+DEFAULT_WORKERS = 8
+REQUEST_TIMEOUT = 10
+# Tokens per POST /midpoints request
+MIDPOINT_BATCH = 500
+
+
+def parse_token_ids(raw) -> list:
+    """Market caches store clobTokenIds as a JSON string; accept either form."""
+    if not raw:
+        return []
+    if isinstance(raw, str):
+        try:
+            raw = json.loads(raw)
+        except json.JSONDecodeError:
+            return []
+    return [str(t) for t in raw]
+
+
+def _get_price(token_id: str, side: str, timeout: float) -> float:
+    data = get_client().get_json(f"{CLOB_API}/price", params={"token_id": token_id, "side": side},
+                                 timeout=timeout)
+    return float(data.get("price", 0))
+
+
+def _get_book(token_id: str, timeout: float) -> dict:
+    return get_client().get_json(f"{CLOB_API}/book", params={"token_id": token_id}, timeout=timeout)
+
+
+def fetch_token_data(
+    token_ids: Iterable[str],
+    workers: int = DEFAULT_WORKERS,
+    timeout: float = REQUEST_TIMEOUT,
+    deadline: Optional[float] = None,
+    sides: tuple = ("buy", "sell"),
+    books=True
+) -> dict:
+    """
+    Fetch prices and orderbooks for many tokens in one parallel round.
+
+    `timeout` bounds each HTTP call; `deadline` bounds the whole batch, and any
+    request still outstanding when it passes is reported as an error. `books`
+    is True/False for every token, or a collection of the token ids whose
+    books are wanted.
+
+    Returns {token_id: {"buy": float|None, "sell": float|None,
+                        "book": dict|None, "errors": [str]}}.
+    """
+    token_ids = list(dict.fromkeys(str(t) for t in token_ids if t))
+    results = {
+        t: {**{side: None for side in sides}, "book": None, "errors": []}
+        for t in token_ids
+    }
+    if not token_ids:
+        return results
+    book_tokens = set(token_ids) if books is True else set(books or ())
+
+    pool = ThreadPoolExecutor(max_workers=workers)
+    jobs = {}
+    for token_id in token_ids:
+        for side in sides:
+            jobs[pool.submit(_get_price, token_id, side, timeout)] = (token_id, side)
+        if token_id in book_tokens:
+            jobs[pool.submit(_get_book, token_id, timeout)] = (token_id, "book")
+
+    done, not_done = wait(jobs, timeout=deadline)
+    for future in done:
+        token_id, field = jobs[future]
+        try:
+            results[token_id][field] = future.result()
+        except Exception as e:
+            results[token_id]["errors"].append(f"{field}: {e}")
+    for future in not_done:
+        token_id, field = jobs[future]
+        future.cancel()
+        results[token_id]["errors"].append(f"{field}: deadline exceeded")
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    return results
+
+
+def token_price(data: dict) -> Optional[float]:
+    """Best single price for a token: the buy/sell midpoint, else whichever side we have."""
+    if not data:
+        return None
+    buy, sell = data.get("buy"), data.get("sell")
+    if buy is not None and sell is not None:
+        return (buy + sell) / 2
+    return buy if buy is not None else sell
+
+
+def fetch_midpoints(
+    token_ids: Iterable[str],
+    workers: int = DEFAULT_WORKERS,
+    timeout: float = REQUEST_TIMEOUT
+) -> dict:
+    """
+    Midpoints for many tokens through the CLOB's batch endpoint, a few
+    hundred tokens per request with the batches sent concurrently. A batch
+    that fails falls back to per-token buy/sell prices.
+
+    Returns {token_id: float}; tokens that could not be priced are left out.
+    """
+    token_ids = list(dict.fromkeys(str(t) for t in token_ids if t))
+    batches = [token_ids[i:i + MIDPOINT_BATCH] for i in range(0, len(token_ids), MIDPOINT_BATCH)]
+    if not batches:
+        return {}
+
+    def post(batch):
+        return get_client().post_json(f"{CLOB_API}/midpoints", [{"token_id": t} for t in batch],
+                                      timeout=timeout)
+
+    mids, failed = {}, []
+    with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+        for batch, future in [(b, pool.submit(post, b)) for b in batches]:
+            try:
+                body = future.result()
+            except Exception:
+                failed.extend(batch)
+                continue
+            for token_id, mid in body.items():
+                if mid is not None:
+                    mids[token_id] = float(mid)
+
+    if failed:
+        for token_id, data in fetch_token_data(failed, workers=workers, timeout=timeout, books=False).items():
+            price = token_price(data)
+            if price is not None:
+                mids[token_id] = price
+    return mids
+
+
+def fetch_market_quotes(
+    markets: dict,
+    workers: int = DEFAULT_WORKERS,
+    timeout: float = REQUEST_TIMEOUT,
+    deadline: Optional[float] = None,
+    books: bool = False
+) -> dict:
+    """
+    Refresh YES/NO prices for cached markets in one parallel round.
+
+    `markets` maps market_id -> cached market (with "token_ids").
+    Returns {market_id: {"yes_price", "no_price", "yes_token", "no_token",
+                         "tokens": {token_id: raw token data}}}.
+    Markets whose tokens all failed are left out. With books=True only YES
+    books are fetched; both tokens' "book" become OrderBooks, the NO one
+    derived from the YES book.
+    """
+    tokens_by_market = {}
+    for market_id, market in markets.items():
+        token_ids = parse_token_ids(market.get("token_ids"))
+        if len(token_ids) >= 2:
+            tokens_by_market[market_id] = token_ids[:2]
+
+    token_data = fetch_token_data(
+        [t for pair in tokens_by_market.values() for t in pair],
+        workers=workers, timeout=timeout, deadline=deadline,
+        books=[pair[0] for pair in tokens_by_market.values()] if books else False
+    )
+
+    quotes = {}
+    for market_id, (yes_token, no_token) in tokens_by_market.items():
+        yes_price = token_price(token_data.get(yes_token))
+        no_price = token_price(token_data.get(no_token))
+        if yes_price is None and no_price is None:
+            continue
+        if token_data[yes_token]["book"] is not None:
+            yes_book = OrderBook.from_json(token_data[yes_token]["book"], token_id=yes_token)
+            token_data[yes_token]["book"] = yes_book
+            token_data[no_token]["book"] = yes_book.complement(token_id=no_token)
+        # One missing side can be inferred from the other on a binary market
+        if yes_price is None:
+            yes_price = 1 - no_price
+        if no_price is None:
+            no_price = 1 - yes_price
+        quotes[market_id] = {
+            "yes_price": yes_price,
+            "no_price": no_price,
+            "yes_token": yes_token,
+            "no_token": no_token,
+            "tokens": {yes_token: token_data[yes_token], no_token: token_data[no_token]},
+        }
+
+    return quotes
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Batch CLOB price/book fetcher")
+    parser.add_argument("token_ids", nargs="+", help="CLOB token ids")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent requests")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Per-request timeout (s)")
+    parser.add_argument("--deadline", type=float, help="Deadline for the whole batch (s)")
+    parser.add_argument("--no-books", action="store_true", help="Skip orderbooks")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+
+    data = fetch_token_data(args.token_ids, workers=args.workers, timeout=args.timeout,
+                            deadline=args.deadline, books=not args.no_books)
+    for token_id, d in data.items():
+        book = d["book"] or {}
+        print(f"{token_id[:20]}...  buy: {d['buy']}  sell: {d['sell']}  "
+              f"bids: {len(book.get('bids', []))}  asks: {len(book.get('asks', []))}")
+        for err in d["errors"]:
+            print(f"   error: {err}")
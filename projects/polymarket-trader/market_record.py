@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Polymarket Market Record
+The compact market record every module shares.
+
+A Market keeps its fields in __slots__ instead of a per-market dict. Fields
+are normalized once at ingest: ids, event titles, dates and category tags are
+interned (so a 100k-market universe holds one copy of each repeated string),
+token ids are a parsed tuple, the end date is also kept as an epoch, and
+missing prices/sizes get their defaults here rather than at every read.
+
+Hot loops use attributes (market.yes_price); a Market is also a read-only
+Mapping over the stored fields, so market["question"], market.get(...) and
+{**market} keep working for code that treats markets as dicts.
+"""
+
+import math
+import sys
+from collections.abc import Mapping
+from typing import Iterable, Optional
+
+from expiry_index import parse_end_epoch
+from market_data import parse_token_ids
+
+# Stored fields, in market_store.MARKET_FIELDS order
+FIELDS = (
+    "market_id", "event_id", "event_title", "question", "slug",
+    "yes_price", "no_price", "volume_24h", "liquidity",
+    "token_ids", "end_date", "end_epoch", "fetched_at",
+)
+
+
+def _intern(value) -> Optional[str]:
+    return None if value is None else sys.intern(str(value))
+
+
+def _float(value, default: float) -> float:
+    return default if value is None else float(value)
+
+
+class Market(Mapping):
+    """One market; see the module docstring."""
+
+    __slots__ = FIELDS + ("categories",)
+
+    def __init__(
+        self,
+        market_id,
+        event_id=None,
+        event_title: Optional[str] = None,
+        question: Optional[str] = None,
+        slug: Optional[str] = None,
+        yes_price: Optional[float] = None,
+        no_price: Optional[float] = None,
+        volume_24h: Optional[float] = None,
+        liquidity: Optional[float] = None,
+        token_ids=None,
+        end_date: Optional[str] = None,
+        end_epoch: Optional[float] = None,
+        fetched_at: Optional[str] = None,
+        categories: Iterable[str] = ()
+    ):
+        self.market_id = _intern(market_id)
+        self.event_id = _intern(event_id)
+        self.event_title = _intern(event_title)
+        self.question = question
+        self.slug = slug
+        self.yes_price = _float(yes_price, 0.5)
+        self.no_price = _float(no_price, 0.5)
+        self.volume_24h = _float(volume_24h, 0.0)
+        self.liquidity = _float(liquidity, 0.0)
+        self.token_ids = token_ids if isinstance(token_ids, tuple) else tuple(parse_token_ids(token_ids))
+        self.end_date = _intern(end_date)
+        # NaN when there is no parseable end date
+        self.end_epoch = parse_end_epoch(end_date) if end_epoch is None else float(end_epoch)
+        self.fetched_at = _intern(fetched_at)
+        self.categories = tuple(sys.intern(c) for c in categories)
+
+    @classmethod
+    def from_dict(cls, market, categories: Iterable[str] = ()) -> "Market":
+        """From a scan dict, store row or anything else keyed by field name."""
+        if isinstance(market, Market):
+            return market
+        keys = market.keys()
+        return cls(**{f: market[f] for f in FIELDS if f in keys}, categories=categories)
+
+    # -- Mapping view --------------------------------------------------------
+
+    def __getitem__(self, key: str):
+        if key not in FIELDS:
+            raise KeyError(key)
+        if key == "end_epoch":
+            return None if math.isnan(self.end_epoch) else self.end_epoch
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self) -> int:
+        return len(FIELDS)
+
+    def to_dict(self) -> dict:
+        """Plain dict (token ids as a list) for JSON output."""
+        market = dict(self)
+        market["token_ids"] = list(self.token_ids)
+        return market
+
+    # -- convenience ---------------------------------------------------------
+
+    @property
+    def yes_token(self) -> Optional[str]:
+        return self.token_ids[0] if self.token_ids else None
+
+    @property
+    def no_token(self) -> Optional[str]:
+        return self.token_ids[1] if len(self.token_ids) > 1 else None
+
+    def token_for(self, outcome: str) -> Optional[str]:
+        """Token id held by a YES or NO position."""
+        return self.yes_token if outcome.upper() == "YES" else self.no_token
+
+    def price_for(self, outcome: str) -> float:
+        return self.yes_price if outcome.upper() == "YES" else self.no_price
+
+    def __repr__(self) -> str:
+        return f"Market({self.market_id!r}, {self.question!r}, yes={self.yes_price:.4f})"
+
+
+def as_markets(markets: dict) -> dict:
+    """{market_id: Market}, converting any plain dicts."""
+    return {
+        market_id: m if isinstance(m, Market) else Market.from_dict(m)
+        for market_id, m in markets.items()
+    }
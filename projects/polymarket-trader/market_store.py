@@ -0,0 +1,466 @@
+#!/usr/bin/env python3
+"""
+Polymarket Market Store
+Indexed SQLite (WAL) store for scanned markets, shared by every module.
+
+Replaces the monolithic market_cache.json: scans upsert only the markets whose
+contents changed, and lookups by market id, event id, end date or liquidity go
+through indexes instead of re-parsing the whole cache. Reads return
+market_record.Market records carrying their category tags. Scans also record
+which events Gamma flags negRisk (mutually exclusive outcomes), for the
+in-memory event index.
+
+Usage:
+    python market_store.py --stats              # Row counts and last update
+    python market_store.py --get MARKET_ID      # Print one market
+    python market_store.py --import-cache       # (Re)import market_cache.json
+"""
+
+import hashlib
+import json
+import sqlite3
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+from event_index import EventIndex
+from expiry_index import ExpiryIndex, parse_end_epoch
+from market_record import FIELDS, Market
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+MARKET_DB_FILE = DATA_DIR / "markets.db"
+MARKET_CACHE_FILE = DATA_DIR / "market_cache.json"
+
+# Columns stored per market: the Market record's fields
+MARKET_FIELDS = list(FIELDS)
+
+# fetched_at changes on every scan, so it doesn't count as a content change
+HASHED_FIELDS = [f for f in MARKET_FIELDS if f != "fetched_at"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS markets (
+    market_id    TEXT PRIMARY KEY,
+    event_id     TEXT,
+    event_title  TEXT,
+    question     TEXT,
+    slug         TEXT,
+    yes_price    REAL,
+    no_price     REAL,
+    volume_24h   REAL,
+    liquidity    REAL,
+    token_ids    TEXT,
+    end_date     TEXT,
+    end_epoch    REAL,
+    fetched_at   TEXT,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_markets_event ON markets(event_id);
+CREATE INDEX IF NOT EXISTS idx_markets_end_date ON markets(end_date);
+CREATE INDEX IF NOT EXISTS idx_markets_end_epoch ON markets(end_epoch);
+CREATE INDEX IF NOT EXISTS idx_markets_liquidity ON markets(liquidity);
+CREATE TABLE IF NOT EXISTS market_tags (
+    market_id TEXT NOT NULL,
+    tag       TEXT NOT NULL,
+    PRIMARY KEY (market_id, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_market_tags_tag ON market_tags(tag);
+CREATE TABLE IF NOT EXISTS events (
+    event_id TEXT PRIMARY KEY,
+    neg_risk INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _epoch_or_none(end_date: Optional[str]) -> Optional[float]:
+    epoch = parse_end_epoch(end_date)
+    return None if epoch != epoch else epoch
+
+
+def content_hash(market: dict) -> str:
+    """Stable hash of a market's contents, ignoring when it was fetched."""
+    payload = json.dumps([market.get(f) for f in HASHED_FIELDS], default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+class MarketStore:
+    """Per-market upserts and indexed lookups over an embedded SQLite database."""
+
+    def __init__(self, path: Optional[Path] = None, import_cache: bool = True):
+        self.path = Path(path or MARKET_DB_FILE)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self.conn.executescript(SCHEMA)
+        self._expiry_index = None
+        self._event_index = None
+
+        # One-time migration from the old JSON cache
+        if import_cache and self.count() == 0 and MARKET_CACHE_FILE.exists():
+            self.import_json_cache(MARKET_CACHE_FILE)
+
+        # Stored tags follow the current taxonomy config
+        tagger = self._tagger()
+        if self.count() and self._get_meta("taxonomy_version") != tagger.version:
+            self.retag(tagger)
+
+    def close(self):
+        self.conn.close()
+
+    def _migrate(self):
+        """Bring databases created by older versions up to the current schema."""
+        columns = {r[1] for r in self.conn.execute("PRAGMA table_info(markets)")}
+        if columns and "end_epoch" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE markets ADD COLUMN end_epoch REAL")
+                rows = self.conn.execute("SELECT market_id, end_date FROM markets").fetchall()
+                self.conn.executemany(
+                    "UPDATE markets SET end_epoch = ? WHERE market_id = ?",
+                    [(_epoch_or_none(end_date), market_id) for market_id, end_date in rows]
+                )
+
+    # -- writes --------------------------------------------------------------
+
+    def upsert_markets(self, markets: Iterable[dict]) -> int:
+        """
+        Insert new markets and rewrite changed ones, tagging them as they land.
+        Returns rows written.
+        """
+        incoming = {}
+        for m in markets:
+            # Keep token ids as the JSON string the API returns
+            if isinstance(m.get("token_ids"), (list, tuple)):
+                m = {**m, "token_ids": json.dumps(list(m["token_ids"]))}
+            # End dates are parsed once here, never again on read
+            m = {**m, "end_epoch": _epoch_or_none(m.get("end_date"))}
+            incoming[str(m["market_id"])] = (m, content_hash(m))
+
+        if not incoming:
+            return 0
+
+        stored = self._hashes(incoming)
+        changed = [(m, h) for market_id, (m, h) in incoming.items() if stored.get(market_id) != h]
+
+        cols = ", ".join(MARKET_FIELDS + ["content_hash"])
+        marks = ", ".join("?" * (len(MARKET_FIELDS) + 1))
+        updates = ", ".join(f"{f} = excluded.{f}" for f in MARKET_FIELDS[1:] + ["content_hash"])
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO markets ({cols}) VALUES ({marks}) "
+                f"ON CONFLICT(market_id) DO UPDATE SET {updates}",
+                [[m.get(f) for f in MARKET_FIELDS] + [h] for m, h in changed]
+            )
+            self._write_tags([m for m, _ in changed], self._tagger())
+            self._set_meta("updated", utcnow())
+        if self._expiry_index is not None:
+            for m, _ in changed:
+                self._expiry_index.add(m["market_id"], m["end_epoch"])
+        if self._event_index is not None:
+            for m, _ in changed:
+                self._event_index.add(m["market_id"], m.get("event_id"))
+        return len(changed)
+
+    def upsert_events(self, neg_risk: dict) -> int:
+        """Record {event_id: negRisk flag} for scanned events. Returns rows written."""
+        rows = [(str(e), int(bool(flag))) for e, flag in neg_risk.items() if e is not None]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO events (event_id, neg_risk) VALUES (?, ?) "
+                "ON CONFLICT(event_id) DO UPDATE SET neg_risk = excluded.neg_risk",
+                rows
+            )
+        if self._event_index is not None:
+            for event_id, flag in rows:
+                self._event_index.set_exclusive(event_id, flag)
+        return len(rows)
+    
+    def retag(self, tagger=None) -> int:
+        """Recompute every market's tags, e.g. after a taxonomy change."""
+        tagger = tagger or self._tagger()
+        rows = self.conn.execute("SELECT market_id, question FROM markets").fetchall()
+        with self.conn:
+            self.conn.execute("DELETE FROM market_tags")
+            self._write_tags([dict(r) for r in rows], tagger, replace=False)
+        return len(rows)
+
+    def _write_tags(self, markets: list, tagger, replace: bool = True):
+        if replace:
+            self.conn.executemany("DELETE FROM market_tags WHERE market_id = ?",
+                                  [(m["market_id"],) for m in markets])
+        self.conn.executemany(
+            "INSERT INTO market_tags (market_id, tag) VALUES (?, ?)",
+            [(market_id, tag) for market_id, tags in tagger.tag_markets(markets).items() for tag in tags]
+        )
+        self._set_meta("taxonomy_version", tagger.version)
+
+    @staticmethod
+    def _tagger():
+        from tagging import get_tagger
+        return get_tagger()
+
+    def _hashes(self, market_ids: Iterable[str]) -> dict:
+        ids = list(market_ids)
+        hashes = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT market_id, content_hash FROM markets WHERE market_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            )
+            hashes.update(rows)
+        return hashes
+
+    def delete_markets(self, market_ids: Iterable[str]) -> int:
+        """Remove markets (e.g. closed ones) along with their tags and expiry and event index entries."""
+        ids = [(str(m),) for m in market_ids]
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("DELETE FROM markets WHERE market_id = ?", ids)
+            deleted = self.conn.total_changes - before
+            self.conn.executemany("DELETE FROM market_tags WHERE market_id = ?", ids)
+        if self._expiry_index is not None:
+            for (market_id,) in ids:
+                self._expiry_index.remove(market_id)
+        if self._event_index is not None:
+            for (market_id,) in ids:
+                self._event_index.remove(market_id)
+        return deleted
+
+    def detach_events(self, market_ids: Iterable[str]) -> int:
+        """Take markets out of their events (e.g. closed ones an open bet still holds). Returns rows updated."""
+        ids = [(str(m),) for m in market_ids]
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("UPDATE markets SET event_id = NULL WHERE market_id = ?", ids)
+            updated = self.conn.total_changes - before
+        if self._event_index is not None:
+            for (market_id,) in ids:
+                self._event_index.remove(market_id)
+        return updated
+
+    def import_json_cache(self, path: Path = MARKET_CACHE_FILE) -> int:
+        cache = json.loads(Path(path).read_text())
+        return self.upsert_markets(cache.get("markets", {}).values())
+
+    def _set_meta(self, key: str, value: str):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, value)
+        )
+
+    # -- reads ---------------------------------------------------------------
+
+    def get(self, market_id: str) -> Optional[Market]:
+        """Primary-key lookup for one market."""
+        row = self.conn.execute(
+            "SELECT * FROM markets WHERE market_id = ?", (str(market_id),)
+        ).fetchone()
+        return self._to_record(row, self.tags_for(market_id)) if row else None
+
+    def get_many(self, market_ids: Iterable[str]) -> dict:
+        """Primary-key lookups for several markets -> {market_id: Market}."""
+        ids = list(dict.fromkeys(str(m) for m in market_ids))
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            rows = self.conn.execute(
+                f"SELECT * FROM markets WHERE market_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ).fetchall()
+            found.update((m.market_id, m) for m in self._records(rows))
+        return found
+
+    def by_event(self, event_id: str) -> list:
+        rows = self.conn.execute("SELECT * FROM markets WHERE event_id = ?", (str(event_id),)).fetchall()
+        return self._records(rows)
+
+    def ids_with_tag(self, tag: str) -> set:
+        """Market ids carrying a category tag (uses the tag index)."""
+        return {r[0] for r in self.conn.execute("SELECT market_id FROM market_tags WHERE tag = ?", (tag,))}
+
+    def by_tag(self, tag: str) -> dict:
+        """{market_id: Market} for one category."""
+        rows = self.conn.execute(
+            "SELECT m.* FROM market_tags t JOIN markets m ON m.market_id = t.market_id WHERE t.tag = ?",
+            (tag,)
+        ).fetchall()
+        return {m.market_id: m for m in self._records(rows)}
+
+    def tag_index(self) -> dict:
+        """{tag: set(market_ids)} for every category."""
+        index = {}
+        for market_id, tag in self.conn.execute("SELECT market_id, tag FROM market_tags"):
+            index.setdefault(tag, set()).add(market_id)
+        return index
+
+    def tags_for(self, market_id: str) -> list:
+        return [r[0] for r in self.conn.execute(
+            "SELECT tag FROM market_tags WHERE market_id = ?", (str(market_id),)
+        )]
+
+    @property
+    def expiry_index(self) -> ExpiryIndex:
+        """Sorted end-epoch index, loaded once and then kept current by writes."""
+        if self._expiry_index is None:
+            rows = self.conn.execute(
+                "SELECT market_id, end_epoch FROM markets WHERE end_epoch IS NOT NULL"
+            )
+            self._expiry_index = ExpiryIndex(rows)
+        return self._expiry_index
+
+    @property
+    def event_index(self) -> EventIndex:
+        """Markets grouped by event, loaded once and then kept current by writes."""
+        if self._event_index is None:
+            self._event_index = EventIndex(
+                self.conn.execute("SELECT market_id, event_id FROM markets WHERE event_id IS NOT NULL"),
+                exclusive=(r[0] for r in self.conn.execute("SELECT event_id FROM events WHERE neg_risk = 1"))
+            )
+        return self._event_index
+
+    def reload_indexes(self):
+        """Drop the in-memory indexes so the next use reloads them, e.g. after another process's scan."""
+        self._expiry_index = None
+        self._event_index = None
+
+    def expiring(self, max_hours: float, min_hours: float = 0, now: Optional[float] = None) -> list:
+        """Markets resolving between min_hours and max_hours from now, soonest first."""
+        ids = self.expiry_index.within_hours(max_hours, min_hours=min_hours, now=now)
+        markets = self.get_many(ids)
+        return [markets[m] for m in ids if m in markets]
+
+    def find(
+        self,
+        min_liquidity: Optional[float] = None,
+        min_volume: Optional[float] = None,
+        min_yes: Optional[float] = None,
+        max_yes: Optional[float] = None,
+        end_after: Optional[str] = None,
+        end_before: Optional[str] = None,
+        order_by: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> list:
+        """Filtered scan; liquidity and end-date bounds use their indexes."""
+        clauses, params = [], []
+        for clause, value in (
+            ("liquidity >= ?", min_liquidity),
+            ("volume_24h >= ?", min_volume),
+            ("yes_price >= ?", min_yes),
+            ("yes_price <= ?", max_yes),
+            ("end_date > ?", end_after),
+            ("end_date <= ?", end_before),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+
+        sql = "SELECT * FROM markets"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if order_by:
+            column, _, direction = order_by.partition(" ")
+            if column not in MARKET_FIELDS or direction.upper() not in ("", "ASC", "DESC"):
+                raise ValueError(f"Bad order_by: {order_by}")
+            sql += f" ORDER BY {order_by}"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return self._records(self.conn.execute(sql, params).fetchall())
+
+    def all_markets(self) -> dict:
+        """Every market -> {market_id: Market}."""
+        tags = {}
+        for market_id, tag in self.conn.execute("SELECT market_id, tag FROM market_tags"):
+            tags.setdefault(market_id, []).append(tag)
+        return {
+            r["market_id"]: self._to_record(r, tags.get(r["market_id"], ()))
+            for r in self.conn.execute("SELECT * FROM markets")
+        }
+
+    def market_ids(self) -> set:
+        return {r[0] for r in self.conn.execute("SELECT market_id FROM markets")}
+
+    def count(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM markets").fetchone()[0]
+
+    def updated(self) -> Optional[str]:
+        return self._get_meta("updated")
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _records(self, rows: list) -> list:
+        """Rows -> Markets, with their tags fetched in one query per 500 rows."""
+        tags = {}
+        ids = [r["market_id"] for r in rows]
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            for market_id, tag in self.conn.execute(
+                f"SELECT market_id, tag FROM market_tags WHERE market_id IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ):
+                tags.setdefault(market_id, []).append(tag)
+        return [self._to_record(r, tags.get(r["market_id"], ())) for r in rows]
+
+    @staticmethod
+    def _to_record(row: sqlite3.Row, categories: Iterable[str] = ()) -> Market:
+        return Market(**{f: row[f] for f in MARKET_FIELDS}, categories=categories)
+
+
+_stores = {}
+
+
+def get_store(path: Optional[Path] = None) -> MarketStore:
+    """Shared store per database path, so every module reads through one connection."""
+    path = path or MARKET_DB_FILE
+    key = str(Path(path).resolve())
+    if key not in _stores:
+        _stores[key] = MarketStore(path)
+    return _stores[key]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Polymarket market store")
+    parser.add_argument("--stats", action="store_true", help="Show row counts")
+    parser.add_argument("--get", help="Print one market by ID")
+    parser.add_argument("--event", help="Print markets for an event ID")
+    parser.add_argument("--import-cache", action="store_true", help="Import market_cache.json")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+    store = get_store()
+
+    if args.import_cache:
+        written = store.import_json_cache()
+        print(f"Imported {written} changed markets from {MARKET_CACHE_FILE}")
+    elif args.get:
+        market = store.get(args.get)
+        print(json.dumps(market.to_dict() if market else None, indent=2))
+    elif args.event:
+        for m in store.by_event(args.event):
+            print(f"  {m['market_id']}: {m['question']}  (YES {m['yes_price']:.1%})")
+    elif args.stats:
+        print(f"Markets: {store.count()}")
+        print("Tags: " + ", ".join(f"{t} {len(ids)}" for t, ids in sorted(store.tag_index().items())))
+        print(f"Updated: {store.updated()}")
+        print(f"Database: {store.path}")
+    else:
+        parser.print_help()
@@ -0,0 +1,454 @@
+#!/usr/bin/env python3
+"""
+Polymarket Market Stream
+Long-running daemon that keeps live orderbooks in memory from a push feed and
+publishes a consistent snapshot for the trader and strategies to read.
+
+Usage:
+    python market_stream.py                          # Stream every cached market
+    python market_stream.py --markets 572473 654412  # Stream specific markets
+    python market_stream.py --record feed.jsonl      # Also record raw messages
+    python market_stream.py --serve feed.jsonl       # Local replay server
+    python market_stream.py --connect 127.0.0.1:9100 # Stream from a replay server
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, Optional
+
+from market_record import as_markets
+from market_store import get_store
+from orderbook import OrderBook
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+LIVE_SNAPSHOT_FILE = DATA_DIR / "live_snapshot.json"
+
+MARKET_WS_URL = "wss://ws-subscriptions-clob.polymarket.com/ws/market"
+REPLAY_PORT = 9100
+PUBLISH_INTERVAL = 0.5
+SNAPSHOT_MAX_AGE = 5.0
+SNAPSHOT_DEPTH = 10
+
+
+def utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Feed sources
+# ---------------------------------------------------------------------------
+
+class FeedSource:
+    """A push feed of CLOB market messages. Subclasses yield decoded dicts."""
+
+    def messages(self) -> Iterator[dict]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class WebSocketFeed(FeedSource):
+    """Polymarket's market channel. Needs the optional websocket-client package."""
+
+    def __init__(self, token_ids: list, url: str = MARKET_WS_URL, reconnect_delay: float = 1.0):
+        self.token_ids = list(token_ids)
+        self.url = url
+        self.reconnect_delay = reconnect_delay
+        self._ws = None
+        self._closed = False
+
+    def messages(self) -> Iterator[dict]:
+        try:
+            import websocket
+        except ImportError:
+            raise RuntimeError("WebSocketFeed needs websocket-client: pip install websocket-client")
+
+        delay = self.reconnect_delay
+        while not self._closed:
+            try:
+                self._ws = websocket.create_connection(self.url, timeout=30)
+                self._ws.send(json.dumps({"assets_ids": self.token_ids, "type": "market"}))
+                delay = self.reconnect_delay
+                while not self._closed:
+                    raw = self._ws.recv()
+                    if not raw or raw == "PONG":
+                        continue
+                    payload = json.loads(raw)
+                    # The channel batches messages into lists
+                    for msg in payload if isinstance(payload, list) else [payload]:
+                        yield msg
+            except Exception as e:
+                if self._closed:
+                    break
+                print(f"Feed error: {e}; reconnecting in {delay:.0f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    def close(self):
+        self._closed = True
+        if self._ws is not None:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+
+
+class ReplayFeed(FeedSource):
+    """Replays a recorded JSONL feed from disk, optionally at recorded pace."""
+
+    def __init__(self, path: Path, speed: Optional[float] = None):
+        self.path = Path(path)
+        self.speed = speed
+
+    def messages(self) -> Iterator[dict]:
+        last_ts = None
+        with self.path.open() as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                msg = json.loads(line)
+                if self.speed:
+                    ts = _message_ts(msg)
+                    if last_ts is not None and ts is not None and ts > last_ts:
+                        time.sleep((ts - last_ts) / self.speed)
+                    last_ts = ts if ts is not None else last_ts
+                yield msg
+
+
+class SocketFeed(FeedSource):
+    """Line-delimited JSON over TCP, as served by ReplayServer."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = REPLAY_PORT):
+        self.host = host
+        self.port = port
+        self._sock = None
+
+    def messages(self) -> Iterator[dict]:
+        self._sock = socket.create_connection((self.host, self.port))
+        with self._sock.makefile("r") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)
+                self._sock.close()
+            except OSError:
+                pass
+
+
+class ReplayServer(socketserver.ThreadingTCPServer):
+    """Local stand-in for the live feed: streams a recording to every client."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, path: Path, host: str = "127.0.0.1", port: int = REPLAY_PORT,
+                 speed: Optional[float] = None, loop: bool = False):
+        self.path = Path(path)
+        self.speed = speed
+        self.loop = loop
+        super().__init__((host, port), _ReplayHandler)
+
+
+class _ReplayHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        server = self.server
+        try:
+            while True:
+                for msg in ReplayFeed(server.path, speed=server.speed).messages():
+                    self.wfile.write((json.dumps(msg) + "\n").encode())
+                if not server.loop:
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def _message_ts(msg: dict) -> Optional[float]:
+    """Feed timestamps are epoch milliseconds (as strings)."""
+    try:
+        return float(msg.get("timestamp")) / 1000
+    except (TypeError, ValueError):
+        return None
+
+
+# ---------------------------------------------------------------------------
+# In-memory books
+# ---------------------------------------------------------------------------
+
+class LiveBooks:
+    """Per-token OrderBooks kept current from book snapshots and price changes."""
+
+    def __init__(self):
+        self.books = {}
+
+    def apply(self, msg: dict) -> bool:
+        """Apply one feed message. Returns True if any book changed."""
+        event_type = msg.get("event_type")
+
+        if event_type == "book":
+            book = OrderBook.from_json(msg)
+            book.timestamp = book.timestamp or time.time()
+            self.books[book.token_id] = book
+            return True
+
+        if event_type == "price_change":
+            changed = False
+            # Older messages carry one asset_id and "changes"; newer ones embed asset_id per change
+            for change in msg.get("price_changes") or msg.get("changes") or []:
+                token_id = change.get("asset_id") or msg.get("asset_id")
+                book = self.books.get(token_id)
+                if book is None:
+                    book = self.books[token_id] = OrderBook(token_id=token_id)
+                book.update(change.get("side", ""), change["price"], change["size"])
+                book.timestamp = _message_ts(msg) or time.time()
+                changed = True
+            return changed
+
+        return False
+
+    def top(self, token_id: str, depth: int = SNAPSHOT_DEPTH) -> dict:
+        return self.books.get(token_id, OrderBook(token_id=token_id)).summary(depth)
+
+
+# ---------------------------------------------------------------------------
+# Daemon
+# ---------------------------------------------------------------------------
+
+class MarketStreamDaemon:
+    """Consumes a feed, maintains LiveBooks and periodically publishes a snapshot."""
+
+    def __init__(
+        self,
+        feed: FeedSource,
+        token_markets: Optional[dict] = None,
+        snapshot_path: Path = LIVE_SNAPSHOT_FILE,
+        publish_interval: float = PUBLISH_INTERVAL,
+        record_path: Optional[Path] = None
+    ):
+        self.feed = feed
+        # token_id -> (market_id, "YES" | "NO")
+        self.token_markets = token_markets or {}
+        self.pairs = token_pairs(self.token_markets)
+        self.snapshot_path = Path(snapshot_path)
+        self.publish_interval = publish_interval
+        self.record_path = Path(record_path) if record_path else None
+        self.books = LiveBooks()
+        self.messages = 0
+        self.sequence = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def run(self):
+        """Block consuming the feed until it ends or stop() is called."""
+        # Heartbeats vouch for the published snapshot, so never for a previous daemon's
+        self.publish()
+        publisher = threading.Thread(target=self._publish_loop, daemon=True)
+        publisher.start()
+        record = self.record_path.open("a") if self.record_path else None
+        try:
+            for msg in self.feed.messages():
+                if self._stop.is_set():
+                    break
+                if record:
+                    record.write(json.dumps(msg) + "\n")
+                with self._lock:
+                    self.messages += 1
+                    if self.books.apply(msg):
+                        self._dirty = True
+        finally:
+            if record:
+                record.close()
+            self._stop.set()
+            publisher.join()
+            self.publish()
+
+    def stop(self):
+        self._stop.set()
+        self.feed.close()
+
+    def _publish_loop(self):
+        while not self._stop.wait(self.publish_interval):
+            if self._dirty:
+                self.publish()
+            else:
+                # A quiet feed leaves the snapshot current; say so without rewriting it
+                self.beat()
+
+    def beat(self):
+        """Touch the heartbeat file: the daemon is alive and its snapshot is current."""
+        heartbeat_path(self.snapshot_path).touch()
+
+    def snapshot(self) -> dict:
+        """Consistent view of every book, taken under the update lock."""
+        with self._lock:
+            self._dirty = False
+            tokens = {t: self.books.top(t) for t in self.books.books}
+            # A token we only see through its pair gets the mirrored book
+            for token_id, pair_id in self.pairs.items():
+                if token_id not in tokens and pair_id in self.books.books:
+                    tokens[token_id] = self.books.books[pair_id].complement(token_id).summary(SNAPSHOT_DEPTH)
+            messages = self.messages
+
+        markets = {}
+        for token_id, (market_id, side) in self.token_markets.items():
+            top = tokens.get(token_id)
+            if not top or top["mid"] is None:
+                continue
+            quote = markets.setdefault(market_id, {})
+            quote["yes_token" if side == "YES" else "no_token"] = token_id
+            quote["yes_price" if side == "YES" else "no_price"] = top["mid"]
+        for quote in markets.values():
+            # Infer the missing side of a binary market from the side we have
+            quote.setdefault("yes_price", 1 - quote.get("no_price", 0.5))
+            quote.setdefault("no_price", 1 - quote["yes_price"])
+
+        self.sequence += 1
+        return {
+            "generated_at": utcnow(),
+            "generated_ts": time.time(),
+            "sequence": self.sequence,
+            "messages": messages,
+            "markets": markets,
+            "tokens": tokens,
+        }
+
+    def publish(self):
+        """Write the snapshot atomically so readers never see a partial file."""
+        snap = self.snapshot()
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.snapshot_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(snap))
+        os.replace(tmp, self.snapshot_path)
+        self.beat()
+
+
+def token_market_map(markets: dict) -> dict:
+    """Map each cached market's YES/NO token to (market_id, side)."""
+    mapping = {}
+    for market_id, market in as_markets(markets).items():
+        token_ids = market.token_ids
+        if len(token_ids) >= 2:
+            mapping[token_ids[0]] = (market_id, "YES")
+            mapping[token_ids[1]] = (market_id, "NO")
+    return mapping
+
+
+def token_pairs(token_markets: dict) -> dict:
+    """Map each token to the other outcome token of its market."""
+    by_market = {}
+    for token_id, (market_id, side) in token_markets.items():
+        by_market.setdefault(market_id, {})[side] = token_id
+    pairs = {}
+    for sides in by_market.values():
+        if "YES" in sides and "NO" in sides:
+            pairs[sides["YES"]] = sides["NO"]
+            pairs[sides["NO"]] = sides["YES"]
+    return pairs
+
+
+# Last parsed snapshot per path, with the (inode, mtime, size) it was read at
+_snapshots = {}
+
+
+def heartbeat_path(snapshot_path: Path) -> Path:
+    """File the daemon touches every publish interval, next to its snapshot."""
+    return Path(snapshot_path).with_suffix(".heartbeat")
+
+
+def load_live_snapshot(max_age: float = SNAPSHOT_MAX_AGE, path: Path = LIVE_SNAPSHOT_FILE) -> dict:
+    """
+    Read the daemon's latest snapshot, or {} if there is none or it is stale.
+    A snapshot is fresh while the daemon keeps beating, however quiet the feed.
+
+    The file is only parsed again once the daemon has replaced it, so callers
+    polling faster than it publishes share one parsed copy; treat it as
+    read-only.
+    """
+    path = Path(path)
+    try:
+        st = path.stat()
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        cached = _snapshots.get(path)
+        if cached is not None and cached[0] == stamp:
+            snap = cached[1]
+        else:
+            snap = json.loads(path.read_text())
+            _snapshots[path] = (stamp, snap)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if max_age is not None:
+        try:
+            alive = heartbeat_path(path).stat().st_mtime
+        except OSError:
+            alive = 0
+        if time.time() - max(snap.get("generated_ts", 0), alive) > max_age:
+            return {}
+    return snap
+
+
+def live_quotes(max_age: float = SNAPSHOT_MAX_AGE) -> dict:
+    """Market quotes from a fresh daemon snapshot, shaped like fetch_market_quotes()."""
+    return load_live_snapshot(max_age=max_age).get("markets", {})
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Polymarket market-data stream daemon")
+    parser.add_argument("--markets", nargs="+", help="Market IDs to stream (default: all cached)")
+    parser.add_argument("--replay", help="Replay a recorded JSONL feed instead of the live one")
+    parser.add_argument("--connect", help="Stream from a replay server at HOST:PORT")
+    parser.add_argument("--serve", help="Serve a recorded JSONL feed to local clients")
+    parser.add_argument("--port", type=int, default=REPLAY_PORT, help="Port for --serve")
+    parser.add_argument("--speed", type=float, help="Replay at recorded pace times this factor")
+    parser.add_argument("--loop", action="store_true", help="With --serve, loop the recording")
+    parser.add_argument("--record", help="Append raw feed messages to this JSONL file")
+    parser.add_argument("--interval", type=float, default=PUBLISH_INTERVAL, help="Snapshot interval (s)")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+
+    if args.serve:
+        server = ReplayServer(args.serve, port=args.port, speed=args.speed, loop=args.loop)
+        print(f"Replaying {args.serve} on 127.0.0.1:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        store = get_store()
+        markets = store.get_many(args.markets) if args.markets else store.all_markets()
+        token_markets = token_market_map(markets)
+
+        if args.replay:
+            feed = ReplayFeed(args.replay, speed=args.speed)
+        elif args.connect:
+            host, _, port = args.connect.rpartition(":")
+            feed = SocketFeed(host or "127.0.0.1", int(port))
+        else:
+            # The NO book is the mirrored YES book, so subscribe to YES tokens only
+            feed = WebSocketFeed([t for t, (_, side) in token_markets.items() if side == "YES"])
+
+        daemon = MarketStreamDaemon(feed, token_markets, publish_interval=args.interval,
+                                    record_path=args.record)
+        print(f"Streaming {len(token_markets)} tokens -> {daemon.snapshot_path}")
+        try:
+            daemon.run()
+        except KeyboardInterrupt:
+            daemon.stop()
+        print(f"Processed {daemon.messages} messages, published {daemon.sequence} snapshots")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Polymarket Market Universe
+Columnar (struct-of-arrays) view of a set of markets for vectorized signals.
+
+Build it once from {market_id: Market} and every signal becomes a NumPy mask
+and score over the whole universe instead of a Python loop over dicts.
+"""
+
+from operator import attrgetter
+from typing import Optional
+
+import numpy as np
+
+from market_record import as_markets
+
+
+def _floats(markets: list, field: str) -> np.ndarray:
+    # Records carry their defaults already, so this is a straight attribute read
+    return np.fromiter(map(attrgetter(field), markets), dtype=np.float64, count=len(markets))
+
+
+class MarketUniverse:
+    """Arrays for price, liquidity, volume and expiry plus a market-id index."""
+
+    def __init__(self, markets: dict, tags: Optional[dict] = None):
+        markets = as_markets(markets)
+        rows = list(markets.values())
+        self.ids = np.array([str(m) for m in markets], dtype=object)
+        self.index = {market_id: i for i, market_id in enumerate(self.ids)}
+        self.yes = _floats(rows, "yes_price")
+        self.no = _floats(rows, "no_price")
+        self.liquidity = _floats(rows, "liquidity")
+        self.volume = _floats(rows, "volume_24h")
+        # Parsed at ingest; NaN for markets without an end date
+        self.end_epoch = _floats(rows, "end_epoch")
+        self._expiry_order = None
+        self.questions = np.array([m.question or "" for m in rows], dtype=object)
+        self.end_dates = np.array([m.end_date for m in rows], dtype=object)
+        # {tag: set(market_ids)}, usually the store's tag index; tagged lazily if absent
+        self._tags = tags
+        self._tag_masks = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def expiring_rows(self, start: float, end: float) -> np.ndarray:
+        """Rows with start < end_epoch <= end, soonest first, found by bisection."""
+        if self._expiry_order is None:
+            # NaN sorts last, so the searchsorted bounds never reach it
+            self._expiry_order = np.argsort(self.end_epoch, kind="stable")
+            self._sorted_end = self.end_epoch[self._expiry_order]
+        lo = np.searchsorted(self._sorted_end, start, side="right")
+        hi = np.searchsorted(self._sorted_end, end, side="right")
+        return self._expiry_order[lo:hi]
+
+    def category_mask(self, tag: str) -> np.ndarray:
+        """Boolean mask of markets carrying a category tag."""
+        if tag not in self._tag_masks:
+            if self._tags is None:
+                from tagging import get_tagger
+                tagged = get_tagger().tag_markets(
+                    {"market_id": m, "question": q} for m, q in zip(self.ids, self.questions)
+                )
+                self._tags = {}
+                for market_id, market_tags in tagged.items():
+                    for t in market_tags:
+                        self._tags.setdefault(t, set()).add(market_id)
+            mask = np.zeros(len(self), dtype=bool)
+            rows = [self.index[m] for m in self._tags.get(tag, ()) if m in self.index]
+            mask[rows] = True
+            self._tag_masks[tag] = mask
+        return self._tag_masks[tag]
+
+    def update_prices(self, quotes: dict):
+        """Overwrite YES/NO prices in place from {market_id: {"yes_price", "no_price"}}."""
+        for market_id, quote in quotes.items():
+            i = self.index.get(market_id)
+            if i is not None:
+                self.yes[i] = quote["yes_price"]
+                self.no[i] = quote["no_price"]
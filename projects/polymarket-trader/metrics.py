@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Polymarket Metrics
+Process-wide counters, stage timers and latency histograms for the trading
+pipeline, exportable as Prometheus text or JSON.
+
+Modules record into one registry:
+    metrics.inc("markets_parsed", len(markets))
+    metrics.observe("http_request_seconds", elapsed, endpoint=endpoint)
+    with metrics.stage("scan.fetch"):
+        ...
+
+Every CLI gets --metrics [PATH] (write the registry when the command exits;
+.prom for Prometheus text, anything else JSON, default data/metrics/<cli>.json)
+and --profile (cProfile + tracemalloc report on stderr, raw profile saved
+under data/profiles) through add_cli_args() and start_cli().
+
+Usage:
+    python metrics.py data/metrics/polymarket_trader.json           # Summarize a JSON export
+    python metrics.py data/metrics/polymarket_trader.json --prom    # ... as Prometheus text
+"""
+
+import atexit
+import bisect
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+METRICS_DIR = DATA_DIR / "metrics"
+PROFILES_DIR = DATA_DIR / "profiles"
+
+PREFIX = "polymarket_"
+# Upper bounds (seconds) of the latency buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROFILE_TOP = 25
+TRACEMALLOC_TOP = 15
+
+
+def utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    """Fixed-bucket histogram: per-bucket counts plus sum, count, min and max."""
+
+    __slots__ = ("bounds", "counts", "sum", "count", "min", "max")
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate from the buckets, interpolating linearly inside the one
+        holding q; the observed min and max narrow the outer buckets.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = max(self.bounds[i - 1] if i else 0.0, self.min)
+                upper = min(self.bounds[i] if i < len(self.bounds) else self.max, self.max)
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+        return self.max
+
+    def to_dict(self) -> dict:
+        cumulative, total = {}, 0
+        for bound, n in zip(list(self.bounds) + ["+Inf"], self.counts):
+            total += n
+            cumulative[str(bound)] = total
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": cumulative,
+        }
+
+
+class Registry:
+    """Thread-safe counters and histograms keyed by name and labels."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.started = time.time()
+
+    def snapshot(self, process: Optional[str] = None) -> dict:
+        """The registry as JSON-friendly dicts."""
+        with self._lock:
+            counters = [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(self.counters.items())]
+            histograms = [{"name": n, "labels": dict(l), **h.to_dict()}
+                          for (n, l), h in sorted(self.histograms.items())]
+        return {
+            "process": process,
+            "generated_at": utcnow(),
+            "uptime_s": time.time() - self.started,
+            "counters": counters,
+            "histograms": histograms,
+        }
+
+
+def _labels(labels: dict, **extra) -> str:
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+def prometheus_text(snapshot: dict) -> str:
+    """Prometheus text exposition format for a snapshot()."""
+    lines, typed = [], set()
+    process = {"process": snapshot["process"]} if snapshot.get("process") else {}
+    for c in snapshot["counters"]:
+        name = f"{PREFIX}{c['name']}_total"
+        if name not in typed:
+            lines.append(f"# TYPE {name} counter")
+            typed.add(name)
+        lines.append(f"{name}{_labels({**process, **c['labels']})} {c['value']}")
+    for h in snapshot["histograms"]:
+        name = PREFIX + h["name"]
+        if name not in typed:
+            lines.append(f"# TYPE {name} histogram")
+            typed.add(name)
+        labels = {**process, **h["labels"]}
+        for bound, count in h["buckets"].items():
+            lines.append(f"{name}_bucket{_labels(labels, le=bound)} {count}")
+        lines.append(f"{name}_sum{_labels(labels)} {h['sum']}")
+        lines.append(f"{name}_count{_labels(labels)} {h['count']}")
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def inc(name: str, value: float = 1, **labels):
+    """Add to a counter in the process registry."""
+    REGISTRY.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels):
+    """Record one value (seconds, for latencies) in a histogram."""
+    REGISTRY.observe(name, value, **labels)
+
+
+@contextmanager
+def stage(name: str, **labels):
+    """Time a pipeline stage into the stage_seconds histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        REGISTRY.observe("stage_seconds", time.perf_counter() - started, stage=name, **labels)
+
+
+def write_metrics(path: Path, process: Optional[str] = None) -> Path:
+    """Write the registry to `path`: Prometheus text for .prom, JSON otherwise."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    snapshot = REGISTRY.snapshot(process)
+    body = prometheus_text(snapshot) if path.suffix == ".prom" else json.dumps(snapshot, indent=2)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(body)
+    os.replace(tmp, path)
+    return path
+
+
+def print_metrics(snapshot: Optional[dict] = None):
+    """Print stage timings, latency histograms and counters."""
+    snapshot = snapshot or REGISTRY.snapshot()
+    if snapshot["histograms"]:
+        print(f"\n{'histogram':<52} {'count':>7} {'total s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for h in snapshot["histograms"]:
+            label = h["name"] + "".join(f" {v}" for v in h["labels"].values())
+            p50, p95, p99 = (f"{h[q] * 1000:>8.1f}" if h[q] is not None else f"{'-':>8}" for q in ("p50", "p95", "p99"))
+            print(f"{label[:52]:<52} {h['count']:>7} {h['sum']:>9.3f} {p50} {p95} {p99}")
+    if snapshot["counters"]:
+        print(f"\n{'counter':<62} {'value':>14}")
+        for c in snapshot["counters"]:
+            label = c["name"] + "".join(f" {v}" for v in c["labels"].values())
+            print(f"{label[:62]:<62} {c['value']:>14,.0f}")
+
+
+# ---------------------------------------------------------------------------
+# CLI wiring
+# ---------------------------------------------------------------------------
+
+def add_cli_args(parser):
+    """Add --metrics and --profile to a CLI's argparse parser."""
+    parser.add_argument("--metrics", nargs="?", const="", metavar="PATH",
+                        help="Write metrics on exit (.prom for Prometheus text; default data/metrics/<cli>.json)")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print a cProfile + tracemalloc report on exit")
+
+
+def start_cli(args, name: Optional[str] = None):
+    """
+    Act on --metrics/--profile for a CLI run. Call right after parse_args();
+    the exports happen when the process exits.
+    """
+    name = name or Path(sys.argv[0]).stem
+    if args.profile:
+        profiler = cProfile.Profile()
+        tracemalloc.start()
+        profiler.enable()
+        atexit.register(_report_profile, profiler, name)
+    if args.metrics is not None:
+        path = Path(args.metrics) if args.metrics else METRICS_DIR / f"{name}.json"
+        atexit.register(_export_metrics, path, name)
+
+
+def _export_metrics(path: Path, name: str):
+    print(f"Metrics written to {write_metrics(path, process=name)}", file=sys.stderr)
+
+
+def _report_profile(profiler: cProfile.Profile, name: str):
+    profiler.disable()
+    current, peak = tracemalloc.get_traced_memory()
+    top = tracemalloc.take_snapshot().statistics("lineno")[:TRACEMALLOC_TOP]
+    tracemalloc.stop()
+
+    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+    path = PROFILES_DIR / f"{name}-{datetime.now():%Y%m%d-%H%M%S}.prof"
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+
+    err = sys.stderr
+    print(f"\n{'=' * 60}\nPROFILE: {name} (main thread; raw stats in {path})\n{'=' * 60}", file=err)
+    print(out.getvalue(), file=err)
+    print(f"Memory: {current / 2 ** 20:.1f} MB live, {peak / 2 ** 20:.1f} MB peak (tracemalloc)", file=err)
+    for stat in top:
+        print(f"  {stat.size / 1024:>10.1f} KB {stat.count:>8} blocks  {stat.traceback[0]}", file=err)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Summarize an exported metrics file")
+    parser.add_argument("path", help="JSON metrics file written by --metrics")
+    parser.add_argument("--prom", action="store_true", help="Print it as Prometheus text")
+
+    args = parser.parse_args()
+
+    snapshot = json.loads(Path(args.path).read_text())
+    if args.prom:
+        print(prometheus_text(snapshot), end="")
+    else:
+        print(f"{snapshot.get('process')} at {snapshot['generated_at']} ({snapshot['uptime_s']:.1f}s)")
+        print_metrics(snapshot)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Polymarket Order Book
+L2 book with price levels held as sorted NumPy arrays.
+
+Level updates are applied incrementally; cumulative size and notional are
+rebuilt lazily after a change, so depth, VWAP, microprice and imbalance
+queries are bisections over prefix sums.
+
+On a binary market the NO book is the YES book mirrored around $1 (a NO bid at
+p is a YES ask at 1 - p), so complement() derives one from the other and we
+only need to fetch half the books.
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+BID = "bid"
+ASK = "ask"
+
+
+class _Side:
+    """One side of the book: prices sorted best-first, with lazy prefix sums."""
+
+    def __init__(self, descending: bool, prices=(), sizes=()):
+        self.descending = descending
+        prices = np.asarray(prices, dtype=np.float64)
+        sizes = np.asarray(sizes, dtype=np.float64)
+        keep = sizes > 0
+        prices, sizes = prices[keep], sizes[keep]
+        order = np.argsort(-prices if descending else prices, kind="stable")
+        self.prices = prices[order]
+        self.sizes = sizes[order]
+        self._cum_size = None
+        self._cum_notional = None
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def _key(self, price: float) -> np.ndarray:
+        """Sort key that is ascending in book order, for searchsorted."""
+        return -price if self.descending else price
+
+    def _keys(self) -> np.ndarray:
+        return -self.prices if self.descending else self.prices
+
+    def _invalidate(self):
+        self._cum_size = None
+        self._cum_notional = None
+
+    def cum_size(self) -> np.ndarray:
+        if self._cum_size is None:
+            self._cum_size = np.cumsum(self.sizes)
+            self._cum_notional = np.cumsum(self.sizes * self.prices)
+        return self._cum_size
+
+    def cum_notional(self) -> np.ndarray:
+        self.cum_size()
+        return self._cum_notional
+
+    def set(self, price: float, size: float):
+        """Set one level's size; zero removes it."""
+        keys = self._keys()
+        i = int(np.searchsorted(keys, self._key(price)))
+        exists = i < len(keys) and self.prices[i] == price
+        if size > 0:
+            if exists:
+                self.sizes[i] = size
+            else:
+                self.prices = np.insert(self.prices, i, price)
+                self.sizes = np.insert(self.sizes, i, size)
+        elif exists:
+            self.prices = np.delete(self.prices, i)
+            self.sizes = np.delete(self.sizes, i)
+        self._invalidate()
+
+    def levels_through(self, price: float) -> int:
+        """Number of levels at or better than `price`."""
+        return int(np.searchsorted(self._keys(), self._key(price), side="right"))
+
+
+class OrderBook:
+    """L2 order book for one outcome token."""
+
+    def __init__(self, bids: Iterable = (), asks: Iterable = (), token_id: Optional[str] = None,
+                 timestamp: Optional[float] = None):
+        bids, asks = list(bids), list(asks)
+        self.token_id = token_id
+        self.timestamp = timestamp
+        self.bids = _Side(True, [p for p, _ in bids], [s for _, s in bids])
+        self.asks = _Side(False, [p for p, _ in asks], [s for _, s in asks])
+
+    @classmethod
+    def from_json(cls, book: dict, token_id: Optional[str] = None) -> "OrderBook":
+        """Build from a CLOB /book payload or feed "book" message (string prices and sizes)."""
+        def levels(raw):
+            return [(float(l["price"]), float(l["size"])) for l in raw or []]
+        timestamp = book.get("timestamp")
+        try:
+            timestamp = float(timestamp) / 1000 if timestamp is not None else None
+        except (TypeError, ValueError):
+            timestamp = None
+        return cls(
+            levels(book.get("bids") or book.get("buys")),
+            levels(book.get("asks") or book.get("sells")),
+            token_id=token_id or book.get("asset_id"),
+            timestamp=timestamp,
+        )
+
+    def _side(self, side: str) -> _Side:
+        return self.bids if side == BID else self.asks
+
+    # -- updates -------------------------------------------------------------
+
+    def update(self, side: str, price: float, size: float):
+        """Apply one level change. side is "bid"/"ask" (or the feed's "BUY"/"SELL")."""
+        side = {"BUY": BID, "SELL": ASK}.get(str(side).upper(), side)
+        self._side(side).set(float(price), float(size))
+
+    # -- queries -------------------------------------------------------------
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return float(self.bids.prices[0]) if len(self.bids) else None
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return float(self.asks.prices[0]) if len(self.asks) else None
+
+    @property
+    def mid(self) -> Optional[float]:
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return (self.best_bid + self.best_ask) / 2
+
+    @property
+    def spread(self) -> Optional[float]:
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        return self.best_ask - self.best_bid
+
+    def depth(self, side: str, levels: Optional[int] = None) -> float:
+        """Total size on the best `levels` levels of a side (all if None)."""
+        s = self._side(side)
+        if not len(s):
+            return 0.0
+        n = len(s) if levels is None else min(levels, len(s))
+        return float(s.cum_size()[n - 1]) if n > 0 else 0.0
+
+    def depth_at(self, side: str, price: float) -> float:
+        """Cumulative size at prices at least as good as `price`."""
+        s = self._side(side)
+        n = s.levels_through(price)
+        return float(s.cum_size()[n - 1]) if n > 0 else 0.0
+
+    def vwap(self, size: float, side: str = ASK) -> tuple:
+        """
+        Average price to take `size` shares from a side (buys take asks).
+        Returns (vwap, filled); filled < size when the side runs out.
+        """
+        s = self._side(side)
+        if size <= 0 or not len(s):
+            return None, 0.0
+        cum = s.cum_size()
+        i = int(np.searchsorted(cum, size, side="left"))
+        if i >= len(cum):
+            filled = float(cum[-1])
+            return float(s.cum_notional()[-1]) / filled, filled
+        before_size = float(cum[i - 1]) if i > 0 else 0.0
+        before_notional = float(s.cum_notional()[i - 1]) if i > 0 else 0.0
+        notional = before_notional + (size - before_size) * float(s.prices[i])
+        return notional / size, float(size)
+
+    def microprice(self, levels: int = 1) -> Optional[float]:
+        """Size-weighted mid over the best `levels` levels of each side."""
+        if self.best_bid is None or self.best_ask is None:
+            return None
+        bid_size, ask_size = self.depth(BID, levels), self.depth(ASK, levels)
+        if bid_size + ask_size == 0:
+            return self.mid
+        # Heavier bids pull the fair price toward the ask
+        return (self.best_bid * ask_size + self.best_ask * bid_size) / (bid_size + ask_size)
+
+    def imbalance(self, levels: Optional[int] = 5) -> float:
+        """(bid depth - ask depth) / total over the best `levels` levels."""
+        bid_size, ask_size = self.depth(BID, levels), self.depth(ASK, levels)
+        total = bid_size + ask_size
+        return (bid_size - ask_size) / total if total > 0 else 0.0
+
+    def levels(self, side: str, n: Optional[int] = None) -> list:
+        s = self._side(side)
+        n = len(s) if n is None else n
+        return [[float(p), float(q)] for p, q in zip(s.prices[:n], s.sizes[:n])]
+
+    # -- derived books -------------------------------------------------------
+
+    def complement(self, token_id: Optional[str] = None) -> "OrderBook":
+        """The opposite outcome's book: bids at 1 - ask, asks at 1 - bid."""
+        book = OrderBook(token_id=token_id, timestamp=self.timestamp)
+        # Round off float noise so 1 - 0.44 lands back on the 0.56 tick
+        book.bids = _Side(True, np.round(1 - self.asks.prices, 6), self.asks.sizes.copy())
+        book.asks = _Side(False, np.round(1 - self.bids.prices, 6), self.bids.sizes.copy())
+        return book
+
+    def summary(self, depth: int = 10) -> dict:
+        """JSON-friendly top of book, as published in live snapshots."""
+        return {
+            "best_bid": self.best_bid,
+            "best_ask": self.best_ask,
+            "mid": self.mid,
+            "microprice": self.microprice(),
+            "bids": self.levels(BID, depth),
+            "asks": self.levels(ASK, depth),
+            "updated_ts": self.timestamp,
+        }
@@ -5,29 +5,57 @@ Simulates trades, tracks outcomes, tests strategies.
 
 Usage:
     python polymarket_trader.py --scan          # Scan for opportunities
-    python polymarket_trader.py --bet MARKET_ID YES 0.50 100  # Paper bet
-    python polymarket_trader.py --check         # Check open paper bets
+    python polymarket_trader.py --scan --full   # Page through every active event
+    python polymarket_trader.py --expiring 24 168  # Markets resolving in 1-7 days
+    python polymarket_trader.py --bet MARKET_ID YES 0.50 100  # Paper bet (limit 0.50, walks the book)
+    python polymarket_trader.py --check         # Check open paper bets (records an equity point)
+    python polymarket_trader.py --equity        # Equity curve and drawdown
     python polymarket_trader.py --history       # View bet history
     python polymarket_trader.py --performance   # Calculate P&L
+    python polymarket_trader.py --performance --by strategy  # P&L per strategy
+    python polymarket_trader.py --sell BET_ID 0.70  # Close a bet early
+    python polymarket_trader.py --auto-resolve  # Resolve bets on closed markets
 """
 
 import argparse
 import json
-import requests
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timezone
+from operator import attrgetter
 from pathlib import Path
 from typing import Optional
 
-# API endpoints
-GAMMA_API = "https://gamma-api.polymarket.com"
-CLOB_API = "https://clob.polymarket.com"
+import numpy as np
+
+import metrics
+from arbitrage import scan_arbitrage
+from fill_simulator import FEE_RATE_BPS, simulate_fill
+from http_client import CLOB_API, GAMMA_API, get_client, print_stats
+from ledger import get_ledger
+from market_data import fetch_midpoints
+from market_record import Market
+from market_store import get_store
+from orderbook import OrderBook
+from price_history import get_history_store
+from rolling_analytics import get_analytics
+from market_stream import load_live_snapshot
 
 # Local storage
 WORKSPACE = Path(__file__).parent.parent.parent
 DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
-PAPER_BETS_FILE = DATA_DIR / "paper_bets.json"
-MARKET_CACHE_FILE = DATA_DIR / "market_cache.json"
 PERFORMANCE_FILE = DATA_DIR / "performance.json"
+STRATEGY_PERFORMANCE_FILE = DATA_DIR / "strategy_performance.json"
+
+# Full-universe scanner
+EVENTS_PAGE_SIZE = 100
+SCAN_WORKERS = 8
+# Event pages younger than this are served from disk; older ones are revalidated
+EVENTS_CACHE_TTL = 60
+# Market ids per Gamma /markets lookup when resolving bets
+RESOLVE_BATCH = 50
+# A closed market's winning outcome settles at (about) $1
+SETTLED_PRICE = 0.99
 
 
 def utcnow() -> str:
@@ -38,47 +66,135 @@ def utcnow() -> str:
 def load_json(path: Path) -> dict:
     """Load JSON file or return empty structure."""
     if path.exists():
-        return json.loads(path.read_text())
+        with metrics.stage("file.load", file=path.name):
+            return json.loads(path.read_text())
     return {}
 
 
 def save_json(path: Path, data: dict):
     """Save data to JSON file."""
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, indent=2))
+    with metrics.stage("file.write", file=path.name):
+        path.write_text(json.dumps(data, indent=2))
 
 
-def fetch_active_events(limit: int = 50, tag_id: Optional[int] = None) -> list:
-    """Fetch active events from Polymarket."""
+def events_query(
+    offset: int = 0,
+    limit: int = 50,
+    tag_id: Optional[int] = None,
+    order: str = "volume24hr",
+    ascending: bool = False
+) -> dict:
+    """Query params for one page of active events."""
     params = {
         "active": "true",
         "closed": "false",
         "limit": limit,
-        "order": "volume24hr",
-        "ascending": "false"
+        "offset": offset,
+        "order": order,
+        "ascending": "true" if ascending else "false"
     }
     if tag_id:
         params["tag_id"] = tag_id
-    
+    return params
+
+
+def fetch_events_page(
+    offset: int = 0,
+    limit: int = 50,
+    tag_id: Optional[int] = None,
+    order: str = "volume24hr",
+    ascending: bool = False
+) -> list:
+    """Fetch one page of active events. Raises on HTTP errors."""
+    params = events_query(offset, limit, tag_id, order, ascending)
+    return get_client().get_json(f"{GAMMA_API}/events", params=params, timeout=30,
+                                 cache_ttl=EVENTS_CACHE_TTL)
+
+
+def fetch_active_events(limit: int = 50, tag_id: Optional[int] = None) -> list:
+    """Fetch active events from Polymarket."""
     try:
-        resp = requests.get(f"{GAMMA_API}/events", params=params, timeout=30)
-        resp.raise_for_status()
-        return resp.json()
+        return fetch_events_page(limit=limit, tag_id=tag_id)
     except Exception as e:
         print(f"Error fetching events: {e}")
         return []
 
 
+def fetch_all_active_events(
+    page_size: int = EVENTS_PAGE_SIZE,
+    workers: int = SCAN_WORKERS,
+    tag_id: Optional[int] = None,
+    max_pages: Optional[int] = None
+) -> tuple:
+    """
+    Page through every active event with up to `workers` requests in flight.
+    
+    Pages are ordered by id so offsets stay stable while we fetch them out of
+    order. New offsets stop being scheduled once a short page shows we've hit
+    the end, or once a full window of consecutive pages has failed.
+    
+    Returns (events, stats).
+    """
+    started = time.perf_counter()
+    pages = {}
+    failed = []
+    next_offset = 0
+    exhausted = False
+    consecutive_errors = 0
+    
+    def more_pages() -> bool:
+        if exhausted or consecutive_errors >= workers:
+            return False
+        return max_pages is None or next_offset // page_size < max_pages
+    
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight = {}
+        while in_flight or more_pages():
+            while more_pages() and len(in_flight) < workers:
+                future = pool.submit(fetch_events_page, offset=next_offset, limit=page_size,
+                                     tag_id=tag_id, order="id", ascending=True)
+                in_flight[future] = next_offset
+                next_offset += page_size
+            
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                offset = in_flight.pop(future)
+                try:
+                    page = future.result()
+                except Exception as e:
+                    print(f"Error fetching events page at offset {offset}: {e}")
+                    failed.append(offset)
+                    consecutive_errors += 1
+                    continue
+                consecutive_errors = 0
+                pages[offset] = page
+                if len(page) < page_size:
+                    exhausted = True
+    
+    events = []
+    for offset in sorted(pages):
+        events.extend(pages[offset])
+    
+    elapsed = time.perf_counter() - started
+    stats = {
+        "pages": len(pages),
+        "failed_pages": len(failed),
+        "events": len(events),
+        "elapsed_s": elapsed,
+        "pages_per_s": len(pages) / elapsed if elapsed > 0 else 0,
+    }
+    return events, stats
+
+
 def fetch_market_price(token_id: str, side: str = "buy") -> Optional[float]:
     """Get current price for a token."""
     try:
-        resp = requests.get(
+        data = get_client().get_json(
             f"{CLOB_API}/price",
             params={"token_id": token_id, "side": side},
             timeout=10
         )
-        resp.raise_for_status()
-        data = resp.json()
         return float(data.get("price", 0))
     except Exception as e:
         print(f"Error fetching price for {token_id[:20]}...: {e}")
@@ -88,62 +204,256 @@ def fetch_market_price(token_id: str, side: str = "buy") -> Optional[float]:
 def fetch_orderbook(token_id: str) -> dict:
     """Get orderbook depth for a token."""
     try:
-        resp = requests.get(
+        return get_client().get_json(
             f"{CLOB_API}/book",
             params={"token_id": token_id},
             timeout=10
         )
-        resp.raise_for_status()
-        return resp.json()
     except Exception as e:
         print(f"Error fetching orderbook: {e}")
         return {}
 
 
-def scan_markets(limit: int = 20) -> list:
-    """Scan for interesting market opportunities."""
-    events = fetch_active_events(limit=limit)
-    opportunities = []
+def current_book(market: Market, outcome: str) -> Optional[OrderBook]:
+    """
+    Book for one outcome of a stored market: the stream daemon's snapshot if
+    it is fresh, else the YES book from the CLOB (mirrored for NO).
+    """
+    token_ids = market.token_ids
+    if len(token_ids) < 2:
+        return None
+    token_id = token_ids[0] if outcome.upper() == "YES" else token_ids[1]
+
+    top = load_live_snapshot().get("tokens", {}).get(token_id)
+    if top and (top["bids"] or top["asks"]):
+        return OrderBook(top["bids"], top["asks"], token_id=token_id, timestamp=top.get("updated_ts"))
+
+    raw = fetch_orderbook(token_ids[0])
+    if not raw:
+        return None
+    book = OrderBook.from_json(raw, token_id=token_ids[0])
+    return book if token_id == token_ids[0] else book.complement(token_id=token_id)
+
+
+def fetch_market_statuses(
+    market_ids: list,
+    workers: int = SCAN_WORKERS,
+    batch_size: int = RESOLVE_BATCH
+) -> tuple:
+    """
+    Look up many markets on Gamma, batch_size ids per request, batches in parallel.
     
-    for event in events:
-        for market in event.get("markets", []):
+    Returns ({market_id: {"closed": bool, "winner": "YES" | "NO" | None}},
+    number of failed batches). winner is set only once a closed market's
+    outcome prices have settled.
+    """
+    def fetch(batch):
+        return get_client().get_json(f"{GAMMA_API}/markets",
+                                     params={"id": batch, "limit": len(batch)}, timeout=30)
+    
+    batches = [market_ids[i:i + batch_size] for i in range(0, len(market_ids), batch_size)]
+    statuses, failed = {}, 0
+    if not batches:
+        return statuses, failed
+    with ThreadPoolExecutor(max_workers=min(workers, len(batches))) as pool:
+        for future in [pool.submit(fetch, b) for b in batches]:
             try:
-                outcomes = json.loads(market.get("outcomes", "[]"))
-                prices = json.loads(market.get("outcomePrices", "[]"))
-                
-                if len(outcomes) >= 2 and len(prices) >= 2:
-                    yes_price = float(prices[0])
-                    no_price = float(prices[1])
-                    
-                    # Get additional market info
-                    volume = float(market.get("volumeNum", 0))
-                    liquidity = float(market.get("liquidityNum", 0))
-                    
-                    opportunities.append({
-                        "event_id": event.get("id"),
-                        "event_title": event.get("title"),
-                        "market_id": market.get("id"),
-                        "question": market.get("question"),
-                        "slug": market.get("slug"),
-                        "yes_price": yes_price,
-                        "no_price": no_price,
-                        "volume_24h": volume,
-                        "liquidity": liquidity,
-                        "token_ids": market.get("clobTokenIds", []),
-                        "end_date": market.get("endDate"),
-                        "fetched_at": utcnow()
-                    })
-            except (json.JSONDecodeError, ValueError, TypeError) as e:
+                markets = future.result()
+            except Exception as e:
+                print(f"Error fetching market statuses: {e}")
+                failed += 1
                 continue
+            for market in markets:
+                winner = None
+                try:
+                    prices = [float(p) for p in json.loads(market.get("outcomePrices") or "[]")]
+                except (json.JSONDecodeError, ValueError, TypeError):
+                    prices = []
+                if market.get("closed") and len(prices) >= 2:
+                    if prices[0] >= SETTLED_PRICE:
+                        winner = "YES"
+                    elif prices[1] >= SETTLED_PRICE:
+                        winner = "NO"
+                statuses[str(market.get("id"))] = {"closed": bool(market.get("closed")), "winner": winner}
+    return statuses, failed
+
+
+def resolve_closed_bets(workers: int = SCAN_WORKERS) -> dict:
+    """
+    Resolve every open bet whose market has closed with a settled outcome.
+    
+    Distinct markets are looked up in concurrent batches and all affected bets
+    are resolved in one ledger transaction. Bets already resolved are skipped,
+    so running it every heartbeat is safe.
+    
+    Stored markets past their end date (the store's expiry index) are checked
+    along with the bets' markets, and every market Gamma reports closed is
+    deleted from the store (and its indexes) once no open bet still holds it.
+    """
+    ledger = get_ledger()
+    store = get_store()
+    open_bets = [b for b in ledger.open_bets() if b.get("market_id")]
+    market_ids = list(dict.fromkeys([*(str(b["market_id"]) for b in open_bets), *store.expiry_index.expired()]))
+    with metrics.stage("resolve.fetch"):
+        statuses, failed = fetch_market_statuses(market_ids, workers=workers)
+    
+    winners = {m: s["winner"] for m, s in statuses.items() if s["winner"]}
+    outcomes = {
+        bet["id"]: "won" if bet["outcome"] == winners[str(bet["market_id"])] else "lost"
+        for bet in open_bets if str(bet["market_id"]) in winners
+    }
+    with metrics.stage("resolve.ledger"):
+        resolved = ledger.resolve_many(outcomes)
+    metrics.inc("bets_resolved", len(resolved))
+    
+    # Closed but unsettled markets stay until their bets resolve, so they can still be marked
+    held = {str(b["market_id"]) for b in open_bets if b["id"] not in outcomes}
+    with metrics.stage("resolve.prune"):
+        pruned = store.delete_markets(m for m, s in statuses.items() if s["closed"] and m not in held)
+    metrics.inc("markets_pruned", pruned)
+    
+    return {
+        "markets_checked": len(market_ids),
+        "markets_closed": sum(1 for s in statuses.values() if s["closed"]),
+        "markets_settled": len(winners),
+        "markets_pruned": pruned,
+        "failed_batches": failed,
+        "resolved": resolved,
+    }
+
+
+def extract_markets(event: dict, fetched_at: str) -> list:
+    """Flatten an event into Market records, skipping closed and unparseable markets."""
+    markets = []
+    
+    for market in event.get("markets", []):
+        # Open events still list the markets that have closed under them
+        if market.get("closed"):
+            continue
+        try:
+            outcomes = json.loads(market.get("outcomes", "[]"))
+            prices = json.loads(market.get("outcomePrices", "[]"))
+            
+            if len(outcomes) >= 2 and len(prices) >= 2:
+                yes_price = float(prices[0])
+                no_price = float(prices[1])
+                
+                # Get additional market info
+                volume = float(market.get("volumeNum", 0))
+                liquidity = float(market.get("liquidityNum", 0))
+                
+                markets.append(Market(
+                    event_id=event.get("id"),
+                    event_title=event.get("title"),
+                    market_id=market.get("id"),
+                    question=market.get("question"),
+                    slug=market.get("slug"),
+                    yes_price=yes_price,
+                    no_price=no_price,
+                    volume_24h=volume,
+                    liquidity=liquidity,
+                    token_ids=market.get("clobTokenIds"),
+                    end_date=market.get("endDate"),
+                    fetched_at=fetched_at
+                ))
+        except (json.JSONDecodeError, ValueError, TypeError):
+            continue
     
-    # Sort by volume
-    opportunities.sort(key=lambda x: x["volume_24h"], reverse=True)
+    return markets
+
+
+def scan_markets(
+    limit: int = 20,
+    full: bool = False,
+    workers: int = SCAN_WORKERS,
+    stats: Optional[dict] = None,
+    record_history: bool = True
+) -> list:
+    """
+    Scan for interesting market opportunities.
     
-    # Cache for later reference
-    cache = load_json(MARKET_CACHE_FILE)
-    cache["markets"] = {m["market_id"]: m for m in opportunities}
-    cache["updated"] = utcnow()
-    save_json(MARKET_CACHE_FILE, cache)
+    With full=True every active event is paged in concurrently instead of just
+    the top `limit` by volume, and once every page has arrived, stored markets
+    the scan no longer lists (closed or delisted) are deleted unless an open
+    bet holds them. Markets a scanned event no longer lists are pruned the
+    same way on every scan. Pass a dict as `stats` to get throughput numbers.
+    Every scanned price is also appended to the price history store and
+    folded into the rolling analytics, and every multi-market event in the
+    store is checked for sum-of-prices arbitrage (see arbitrage.py).
+    """
+    started = time.perf_counter()
+    with metrics.stage("scan.fetch"):
+        if full:
+            events, fetch_stats = fetch_all_active_events(workers=workers)
+        else:
+            events = fetch_active_events(limit=limit)
+            fetch_stats = {"pages": 1, "failed_pages": 0, "events": len(events)}
+    
+    # Dedupe by market id; later pages win if the API shifted under us
+    with metrics.stage("scan.parse"):
+        fetched_at = utcnow()
+        by_id = {}
+        # negRisk events list mutually exclusive outcomes
+        neg_risk = {}
+        listed = {}
+        for event in events:
+            neg_risk[event.get("id")] = bool(event.get("negRisk"))
+            markets = extract_markets(event, fetched_at)
+            listed[str(event.get("id"))] = {m.market_id for m in markets}
+            for market in markets:
+                by_id[market.market_id] = market
+        opportunities = list(by_id.values())
+        
+        # Sort by volume
+        opportunities.sort(key=attrgetter("volume_24h"), reverse=True)
+    metrics.inc("events_fetched", len(events))
+    metrics.inc("markets_parsed", len(opportunities))
+    
+    if stats is not None:
+        elapsed = time.perf_counter() - started
+        stats.update(fetch_stats)
+        stats["markets"] = len(opportunities)
+        stats["elapsed_s"] = elapsed
+        stats["pages_per_s"] = fetch_stats["pages"] / elapsed if elapsed > 0 else 0
+        stats["markets_per_s"] = len(opportunities) / elapsed if elapsed > 0 else 0
+    
+    # Persist only the markets that changed since the last scan
+    store = get_store()
+    with metrics.stage("scan.store"):
+        written = store.upsert_markets(opportunities)
+        store.upsert_events(neg_risk)
+    metrics.inc("markets_written", written)
+    with metrics.stage("scan.prune"):
+        held = {str(b["market_id"]) for b in get_ledger().open_bets() if b.get("market_id")}
+        # Stored markets a scanned event no longer lists have closed; left in
+        # its event they would price the basket with a dead leg
+        index = store.event_index
+        stale = {m for event_id, ids in listed.items() for m in index.markets(event_id) if m not in ids}
+        store.detach_events(stale & held)
+        # An empty or partial page-through says nothing about what else closed
+        if full and opportunities and not fetch_stats["failed_pages"]:
+            stale |= store.market_ids() - by_id.keys()
+        pruned = store.delete_markets(stale - held)
+    metrics.inc("markets_pruned", pruned)
+    if stats is not None:
+        stats["written"] = written
+        stats["pruned"] = pruned
+    if record_history:
+        with metrics.stage("scan.history"):
+            get_history_store().append_snapshot(
+                {m.market_id: (m.yes_price, m.no_price, m.volume_24h, m.liquidity) for m in opportunities},
+                ts=fetched_at
+            )
+        with metrics.stage("scan.analytics"):
+            analytics = get_analytics()
+            analytics.update({m.market_id: m.yes_price for m in opportunities}, ts=fetched_at)
+            analytics.save()
+    with metrics.stage("scan.arbitrage"):
+        # The whole stored universe, just upserted, so events this scan didn't page in still count
+        arbitrage = scan_arbitrage()
+    if stats is not None:
+        stats["arbitrage"] = len(arbitrage["opportunities"])
+        stats["arbitrage_unpriced"] = arbitrage["unpriced_events"]
     
     return opportunities
 
@@ -153,25 +463,51 @@ def place_paper_bet(
     outcome: str,  # "YES" or "NO"
     price: float,
     amount: float,
-    reasoning: str = ""
+    reasoning: str = "",
+    strategy: Optional[str] = None,
+    book: Optional[OrderBook] = None,
+    simulate: bool = True,
+    fee_rate_bps: float = FEE_RATE_BPS
 ) -> dict:
-    """Record a paper bet."""
-    bets = load_json(PAPER_BETS_FILE)
-    if "bets" not in bets:
-        bets["bets"] = []
+    """
+    Record a paper bet.
     
-    # Get market info from cache
-    cache = load_json(MARKET_CACHE_FILE)
-    market = cache.get("markets", {}).get(market_id, {})
+    With simulate=True, `price` is a limit: the order walks the current book
+    (or the one passed in, e.g. a replayed book) and the bet records the VWAP
+    fill, any partial fill, fees and slippage, sized so the fill plus its fee
+    spends at most `amount`. simulate=False records the fill at `price` with
+    unlimited liquidity, as before; that is also the fallback, with a warning,
+    when no book is available (offline, or a market not in the store).
+    """
+    # Get market info from the store
+    market = get_store().get(market_id)
     
+    fill = None
+    if simulate:
+        book = book or (current_book(market, outcome) if market else None)
+        if book is None:
+            print(f"Warning: no orderbook available for market {market_id}; "
+                  f"recording the bet at {price:.1%} without simulating the fill")
+        else:
+            fill = simulate_fill(book, amount, limit_price=price, fee_rate_bps=fee_rate_bps,
+                                 fee_inclusive=True)
+            if fill["shares"] <= 0:
+                return {"error": f"Nothing to fill at or below {price:.1%}"}
+            # Cost includes the fee, so P&L against $1/share stays net of fees
+            price, amount = fill["vwap"], fill["cost"]
+    
+    # The ledger allocates the id inside its write transaction
     bet = {
-        "id": f"bet_{len(bets['bets']) + 1}_{int(datetime.now().timestamp())}",
         "market_id": market_id,
-        "question": market.get("question", "Unknown"),
+        "question": market.question if market else "Unknown",
         "outcome": outcome.upper(),
+        "strategy": strategy,
+        # Category tags at placement, for the ledger's per-category totals
+        "categories": list(market.categories) if market else [],
         "entry_price": price,
         "amount": amount,  # In USDC
-        "shares": amount / price if price > 0 else 0,
+        "shares": fill["shares"] if fill else (amount / price if price > 0 else 0),
+        "fill": fill,
         "reasoning": reasoning,
         "placed_at": utcnow(),
         "status": "open",  # open, won, lost, sold
@@ -180,90 +516,151 @@ def place_paper_bet(
         "pnl": None
     }
     
-    bets["bets"].append(bet)
-    bets["updated"] = utcnow()
-    save_json(PAPER_BETS_FILE, bets)
-    
-    return bet
+    return get_ledger().place(bet)
 
 
-def check_open_bets() -> list:
-    """Check status of open paper bets and update prices."""
-    bets = load_json(PAPER_BETS_FILE)
-    open_bets = [b for b in bets.get("bets", []) if b["status"] == "open"]
+def mark_to_market(live: bool = True, workers: int = SCAN_WORKERS, record: bool = True) -> tuple:
+    """
+    Value every open paper bet in one pass.
+    
+    Bets are grouped by the outcome token they hold and each distinct token is
+    priced once: from a fresh market_stream snapshot when the daemon is
+    running, else through the CLOB's batch midpoint endpoint. Tokens that fail to quote (or
+    live=False) fall back to the cached scan. Unrealized P&L for the whole
+    book is then one vectorized step, and with record=True the portfolio's
+    equity (realized + unrealized P&L) is appended to the ledger's curve.
     
-    cache = load_json(MARKET_CACHE_FILE)
+    Returns (open bets annotated with current prices, equity point).
+    """
+    ledger = get_ledger()
+    open_bets = ledger.open_bets()
+    cached = get_store().get_many(b["market_id"] for b in open_bets if b["market_id"])
     
+    held, fallback = [], []
     for bet in open_bets:
-        market = cache.get("markets", {}).get(bet["market_id"], {})
-        if market:
-            # Get current price
-            idx = 0 if bet["outcome"] == "YES" else 1
-            current_price = market.get("yes_price" if idx == 0 else "no_price", bet["entry_price"])
-            
-            bet["current_price"] = current_price
-            bet["unrealized_pnl"] = (current_price - bet["entry_price"]) * bet["shares"]
-            bet["unrealized_pnl_pct"] = ((current_price / bet["entry_price"]) - 1) * 100 if bet["entry_price"] > 0 else 0
+        market = cached.get(bet["market_id"])
+        held.append(market.token_for(bet["outcome"]) if market else None)
+        fallback.append(market.price_for(bet["outcome"]) if market else None)
+    
+    prices = {}
+    if live and open_bets:
+        with metrics.stage("mark.quotes"):
+            tokens = load_live_snapshot().get("tokens", {})
+            prices = {t: tokens[t]["mid"] for t in held if t in tokens and tokens[t]["mid"] is not None}
+            missing = [t for t in dict.fromkeys(held) if t and t not in prices]
+            if missing:
+                prices.update(fetch_midpoints(missing, workers=workers))
+        metrics.inc("tokens_quoted", len(prices))
     
-    return open_bets
+    quoted = [prices.get(t, f) for t, f in zip(held, fallback)]
+    current = np.array([np.nan if p is None else p for p in quoted], dtype=np.float64)
+    entry = np.array([b["entry_price"] or 0.0 for b in open_bets], dtype=np.float64)
+    shares = np.array([b["shares"] or 0.0 for b in open_bets], dtype=np.float64)
+    cost = np.array([b["amount"] or 0.0 for b in open_bets], dtype=np.float64)
+    
+    priced = ~np.isnan(current)
+    # Unpriced bets are held at entry, so they add nothing to unrealized P&L
+    price = np.where(priced, current, entry)
+    unrealized = (price - entry) * shares
+    with np.errstate(divide="ignore", invalid="ignore"):
+        unrealized_pct = np.where(entry > 0, (price / entry - 1) * 100, 0.0)
+    
+    for i in np.flatnonzero(priced):
+        bet = open_bets[i]
+        bet["current_price"] = float(current[i])
+        bet["unrealized_pnl"] = float(unrealized[i])
+        bet["unrealized_pnl_pct"] = float(unrealized_pct[i])
+    metrics.inc("positions_marked", len(open_bets))
+    
+    realized = ledger.performance().get("realized_pnl", 0.0)
+    point = {
+        "ts": time.time(),
+        "positions": len(open_bets),
+        "cost": float(cost.sum()),
+        "value": float((shares * price).sum()),
+        "unrealized_pnl": float(unrealized.sum()),
+        "realized_pnl": realized,
+        "equity": realized + float(unrealized.sum()),
+    }
+    if record:
+        ledger.append_equity(point)
+    return open_bets, point
+
+
+def check_open_bets(live: bool = True, workers: int = SCAN_WORKERS) -> list:
+    """Check status of open paper bets and update prices (see mark_to_market)."""
+    return mark_to_market(live=live, workers=workers, record=False)[0]
+
+
+def equity_drawdown(curve: list) -> dict:
+    """Peak, current and maximum drawdown of a recorded equity curve."""
+    if not curve:
+        return {"peak": 0.0, "drawdown": 0.0, "max_drawdown": 0.0}
+    equity = np.array([p["equity"] for p in curve], dtype=np.float64)
+    peak = np.maximum.accumulate(equity)
+    drawdown = peak - equity
+    return {"peak": float(peak[-1]), "drawdown": float(drawdown[-1]), "max_drawdown": float(drawdown.max())}
 
 
 def resolve_bet(bet_id: str, outcome: str) -> dict:
     """Mark a bet as won or lost based on market resolution."""
-    bets = load_json(PAPER_BETS_FILE)
-    
-    for bet in bets.get("bets", []):
-        if bet["id"] == bet_id and bet["status"] == "open":
-            bet["status"] = outcome.lower()  # "won" or "lost"
-            bet["exit_at"] = utcnow()
-            
-            if outcome.lower() == "won":
-                bet["exit_price"] = 1.0
-                bet["pnl"] = bet["shares"] - bet["amount"]  # shares worth $1 each
-            else:
-                bet["exit_price"] = 0.0
-                bet["pnl"] = -bet["amount"]  # lost entire bet
-            
-            save_json(PAPER_BETS_FILE, bets)
-            return bet
-    
-    return {}
+    return get_ledger().resolve(bet_id, outcome)
 
 
-def calculate_performance() -> dict:
-    """Calculate overall trading performance."""
-    bets = load_json(PAPER_BETS_FILE)
-    all_bets = bets.get("bets", [])
-    
-    if not all_bets:
-        return {"error": "No bets recorded"}
-    
-    closed_bets = [b for b in all_bets if b["status"] in ["won", "lost", "sold"]]
-    open_bets = [b for b in all_bets if b["status"] == "open"]
+def sell_bet(bet_id: str, price: float) -> dict:
+    """Close an open bet early at `price` per share."""
+    return get_ledger().sell(bet_id, price)
+
+
+def calculate_performance(by: Optional[str] = None) -> dict:
+    """
+    Calculate overall trading performance from the ledger's running totals.
     
-    total_invested = sum(b["amount"] for b in all_bets)
-    realized_pnl = sum(b.get("pnl", 0) for b in closed_bets if b.get("pnl") is not None)
+    `by` ("strategy", "day" or "category") adds a breakdown under "by_<scope>".
+    """
+    ledger = get_ledger()
+    totals = ledger.performance()
     
-    wins = len([b for b in closed_bets if b["status"] == "won"])
-    losses = len([b for b in closed_bets if b["status"] == "lost"])
+    if not totals:
+        return {"error": "No bets recorded"}
     
     performance = {
-        "total_bets": len(all_bets),
-        "open_bets": len(open_bets),
-        "closed_bets": len(closed_bets),
-        "wins": wins,
-        "losses": losses,
-        "win_rate": wins / len(closed_bets) * 100 if closed_bets else 0,
-        "total_invested": total_invested,
-        "realized_pnl": realized_pnl,
-        "roi": realized_pnl / total_invested * 100 if total_invested > 0 else 0,
+        "total_bets": totals["total_bets"],
+        "open_bets": totals["open_bets"],
+        "closed_bets": totals["closed_bets"],
+        "wins": totals["wins"],
+        "losses": totals["losses"],
+        "win_rate": totals["win_rate"],
+        "total_invested": totals["invested"],
+        "realized_pnl": totals["realized_pnl"],
+        "roi": totals["roi"],
         "calculated_at": utcnow()
     }
+    if by:
+        performance[f"by_{by}"] = ledger.performance(by)
     
     save_json(PERFORMANCE_FILE, performance)
+    sync_strategy_performance(ledger.performance("strategy"))
     return performance
 
 
+def sync_strategy_performance(by_strategy: dict):
+    """Write ledger numbers into strategy_performance.json, keeping descriptions and status."""
+    doc = load_json(STRATEGY_PERFORMANCE_FILE)
+    strategies = doc.setdefault("strategies", {})
+    for name, totals in by_strategy.items():
+        entry = strategies.setdefault(name.replace("-", "_"), {})
+        entry.update({
+            "bets_placed": totals["total_bets"],
+            "bets_resolved": totals["closed_bets"],
+            "wins": totals["wins"],
+            "losses": totals["losses"],
+            "win_rate": totals["win_rate"] if totals["closed_bets"] else None,
+            "roi": totals["roi"] if totals["closed_bets"] else None,
+        })
+    save_json(STRATEGY_PERFORMANCE_FILE, doc)
+
+
 def print_opportunities(opportunities: list, limit: int = 10):
     """Print market opportunities in a readable format."""
     print(f"\n{'='*80}")
@@ -271,10 +668,10 @@ def print_opportunities(opportunities: list, limit: int = 10):
     print(f"{'='*80}\n")
     
     for i, m in enumerate(opportunities[:limit], 1):
-        print(f"{i}. {m['question'][:70]}...")
-        print(f"   YES: {m['yes_price']:.1%} | NO: {m['no_price']:.1%}")
-        print(f"   Volume 24h: ${m['volume_24h']:,.0f} | Liquidity: ${m['liquidity']:,.0f}")
-        print(f"   Market ID: {m['market_id']}")
+        print(f"{i}. {(m.question or '')[:70]}...")
+        print(f"   YES: {m.yes_price:.1%} | NO: {m.no_price:.1%} | Ends: {m.end_date or '?'}")
+        print(f"   Volume 24h: ${m.volume_24h:,.0f} | Liquidity: ${m.liquidity:,.0f}")
+        print(f"   Market ID: {m.market_id}")
         print()
 
 
@@ -284,20 +681,58 @@ def main():
     parser.add_argument("--bet", nargs=4, metavar=("MARKET_ID", "OUTCOME", "PRICE", "AMOUNT"),
                        help="Place a paper bet")
     parser.add_argument("--reason", default="", help="Reasoning for the bet")
+    parser.add_argument("--strategy", help="Strategy label for the bet")
+    parser.add_argument("--no-fill", action="store_true",
+                       help="With --bet, fill at PRICE instead of walking the book")
+    parser.add_argument("--fee-bps", type=float, default=FEE_RATE_BPS,
+                       help="With --bet, fee rate in bps for simulated fills")
     parser.add_argument("--check", action="store_true", help="Check open bets")
     parser.add_argument("--history", action="store_true", help="View bet history")
+    parser.add_argument("--equity", action="store_true", help="View the equity curve and drawdown")
     parser.add_argument("--performance", action="store_true", help="Calculate performance")
     parser.add_argument("--resolve", nargs=2, metavar=("BET_ID", "OUTCOME"),
                        help="Resolve a bet (won/lost)")
+    parser.add_argument("--auto-resolve", action="store_true",
+                       help="Resolve open bets whose markets have closed")
+    parser.add_argument("--sell", nargs=2, metavar=("BET_ID", "PRICE"),
+                       help="Close an open bet at PRICE per share")
+    parser.add_argument("--by", choices=["strategy", "day", "category"],
+                       help="With --performance, break results down by strategy, day or category")
+    parser.add_argument("--expiring", nargs=2, type=float, metavar=("MIN_HOURS", "MAX_HOURS"),
+                       help="List stored markets resolving within a time window")
     parser.add_argument("--limit", type=int, default=20, help="Number of results")
+    parser.add_argument("--full", action="store_true",
+                       help="With --scan, page through every active event")
+    parser.add_argument("--workers", type=int, default=SCAN_WORKERS,
+                       help="Concurrent requests for --full scans, --check and --auto-resolve")
+    parser.add_argument("--cached", action="store_true",
+                       help="With --check, use cached scan prices instead of live quotes")
+    metrics.add_cli_args(parser)
     
     args = parser.parse_args()
+    metrics.start_cli(args)
     
     if args.scan:
-        print("Scanning markets...")
-        opportunities = scan_markets(limit=args.limit)
+        print("Scanning markets..." if not args.full else "Scanning all active events...")
+        stats = {}
+        opportunities = scan_markets(limit=args.limit, full=args.full,
+                                     workers=args.workers, stats=stats)
         print_opportunities(opportunities, limit=args.limit)
-        print(f"Cached {len(opportunities)} markets to {MARKET_CACHE_FILE}")
+        print(f"Stored {len(opportunities)} markets ({stats['written']} changed, {stats['pruned']} closed "
+              f"removed) in {get_store().path}")
+        print(f"Fetched {stats['pages']} pages ({stats['failed_pages']} failed), "
+              f"{stats['events']} events in {stats['elapsed_s']:.2f}s "
+              f"({stats['pages_per_s']:.1f} pages/s, {stats['markets_per_s']:.0f} markets/s)")
+        print(f"{stats['arbitrage']} event arbitrage opportunities, {stats['arbitrage_unpriced']} events "
+              f"skipped for an unpriced market (python arbitrage.py for details)")
+        print_stats()
+        
+    elif args.expiring:
+        min_hours, max_hours = args.expiring
+        markets = get_store().expiring(max_hours, min_hours=min_hours)
+        markets.sort(key=attrgetter("volume_24h"), reverse=True)
+        print(f"\n{len(markets)} markets resolving in {min_hours:g}-{max_hours:g}h")
+        print_opportunities(markets, limit=args.limit)
         
     elif args.bet:
         market_id, outcome, price, amount = args.bet
@@ -306,17 +741,28 @@ def main():
             outcome=outcome,
             price=float(price),
             amount=float(amount),
-            reasoning=args.reason
+            reasoning=args.reason,
+            strategy=args.strategy,
+            simulate=not args.no_fill,
+            fee_rate_bps=args.fee_bps
         )
+        if "error" in bet:
+            print(f"\n{bet['error']}")
+            return
         print(f"\n✅ Paper bet placed!")
         print(f"   ID: {bet['id']}")
         print(f"   Market: {bet['question'][:50]}...")
         print(f"   Outcome: {bet['outcome']} @ {bet['entry_price']:.1%}")
         print(f"   Amount: ${bet['amount']:.2f} ({bet['shares']:.2f} shares)")
+        fill = bet["fill"]
+        if fill:
+            partial = f" (partial: ${fill['filled']:.2f} of ${fill['requested']:.2f})" if fill["partial"] else ""
+            print(f"   Fill: {fill['levels']} levels, slippage {fill['slippage_bps']:.0f} bps, "
+                  f"fee ${fill['fee']:.2f}{partial}")
         print(f"   Reasoning: {bet['reasoning']}")
         
     elif args.check:
-        open_bets = check_open_bets()
+        open_bets, point = mark_to_market(live=not args.cached, workers=args.workers)
         if not open_bets:
             print("\nNo open bets.")
         else:
@@ -331,17 +777,34 @@ def main():
                 if "current_price" in bet:
                     print(f"   Current: {bet['current_price']:.1%} | P&L: ${bet['unrealized_pnl']:.2f} ({bet['unrealized_pnl_pct']:.1f}%)")
                 print()
+            print(f"Open value: ${point['value']:.2f} on ${point['cost']:.2f} | "
+                  f"Unrealized: ${point['unrealized_pnl']:.2f} | Equity: ${point['equity']:.2f}")
+                
+    elif args.equity:
+        curve = get_ledger().equity_curve()
+        if not curve:
+            print("\nNo equity points recorded (run --check).")
+        else:
+            dd = equity_drawdown(curve)
+            print(f"\n{'='*60}")
+            print(f"EQUITY CURVE ({len(curve)} points)")
+            print(f"{'='*60}\n")
+            for p in curve[-args.limit:]:
+                stamp = datetime.fromtimestamp(p["ts"], timezone.utc).isoformat()[:19]
+                print(f"{stamp}  equity ${p['equity']:>9.2f}  unrealized ${p['unrealized_pnl']:>8.2f}  "
+                      f"positions {p['positions']}")
+            print(f"\nPeak: ${dd['peak']:.2f} | Drawdown: ${dd['drawdown']:.2f} | Max drawdown: ${dd['max_drawdown']:.2f}")
                 
     elif args.history:
-        bets = load_json(PAPER_BETS_FILE)
-        all_bets = bets.get("bets", [])
-        if not all_bets:
+        ledger = get_ledger()
+        total = ledger.count()
+        if not total:
             print("\nNo bets recorded.")
         else:
             print(f"\n{'='*60}")
-            print(f"BET HISTORY ({len(all_bets)} total)")
+            print(f"BET HISTORY ({total} total)")
             print(f"{'='*60}\n")
-            for bet in all_bets[-10:]:  # Last 10
+            for bet in ledger.tail(10):  # Last 10
                 status_emoji = {"open": "⏳", "won": "✅", "lost": "❌", "sold": "💰"}.get(bet["status"], "?")
                 pnl_str = f"P&L: ${bet.get('pnl', 0):.2f}" if bet.get("pnl") is not None else ""
                 print(f"{status_emoji} {bet['outcome']} @ {bet['entry_price']:.1%} - ${bet['amount']:.2f} {pnl_str}")
@@ -349,7 +812,7 @@ def main():
                 print()
                 
     elif args.performance:
-        perf = calculate_performance()
+        perf = calculate_performance(by=args.by)
         if "error" in perf:
             print(f"\n{perf['error']}")
         else:
@@ -363,7 +826,32 @@ def main():
             print(f"Total Invested: ${perf['total_invested']:.2f}")
             print(f"Realized P&L: ${perf['realized_pnl']:.2f}")
             print(f"ROI: {perf['roi']:.1f}%")
+            if args.by:
+                print(f"\n{args.by:<28} {'bets':>5} {'open':>5} {'W':>4} {'L':>4} {'win%':>6} "
+                      f"{'invested':>10} {'P&L':>9} {'ROI%':>7}")
+                for key, p in perf[f"by_{args.by}"].items():
+                    print(f"{key[:28]:<28} {p['total_bets']:>5} {p['open_bets']:>5} {p['wins']:>4} "
+                          f"{p['losses']:>4} {p['win_rate']:>6.1f} {p['invested']:>10.2f} "
+                          f"{p['realized_pnl']:>9.2f} {p['roi']:>7.1f}")
             
+    elif args.sell:
+        bet_id, price = args.sell
+        bet = sell_bet(bet_id, float(price))
+        if bet:
+            print(f"\n💰 Bet sold: {bet_id} @ {bet['exit_price']:.1%}")
+            print(f"   P&L: ${bet['pnl']:.2f}")
+        else:
+            print(f"\n❌ Bet not found or already closed: {bet_id}")
+            
+    elif args.auto_resolve:
+        result = resolve_closed_bets(workers=args.workers)
+        print(f"\nChecked {result['markets_checked']} markets: {result['markets_closed']} closed, "
+              f"{result['markets_settled']} settled, {result['markets_pruned']} removed from the store "
+              f"({result['failed_batches']} failed batches)")
+        for bet in result["resolved"]:
+            print(f"   {bet['id']}: {bet['status']} (P&L ${bet['pnl']:.2f}) {(bet['question'] or '')[:50]}")
+        print(f"Resolved {len(result['resolved'])} bets")
+        
     elif args.resolve:
         bet_id, outcome = args.resolve
         bet = resolve_bet(bet_id, outcome)
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Polymarket Price History
+Append-only, per-market columnar store for price snapshots.
+
+Each market gets its own directory of fixed-width column files:
+    history/<market_id>/ts.i64         epoch seconds (int64, ascending)
+    history/<market_id>/yes.f32        YES price (float32)
+    history/<market_id>/no.f32         NO price (float32)
+    history/<market_id>/volume.f32     24h volume at that point (float32)
+    history/<market_id>/liquidity.f32  liquidity at that point (float32)
+
+Volume and liquidity were added later and are NaN wherever they were not
+recorded; markets written before them gain the files (NaN-padded) on their
+next append.
+
+Writers take an exclusive flock on history/<market_id>/.lock, so appends from
+different processes (a scan and research_tools --track) never interleave
+their column writes.
+
+Appends write a few bytes to the end of each column, and reads memory-map the
+columns and bisect the timestamps, so nothing is ever loaded in full.
+
+Usage:
+    python price_history.py --stats                  # Markets and points stored
+    python price_history.py --show MARKET_ID         # Last 20 points
+    python price_history.py --import-json            # Import market_history.json
+"""
+
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+HISTORY_DIR = DATA_DIR / "history"
+MARKET_HISTORY = DATA_DIR / "market_history.json"
+
+COLUMNS = {
+    "ts": np.dtype("<i8"),
+    "yes": np.dtype("<f4"),
+    "no": np.dtype("<f4"),
+    "volume": np.dtype("<f4"),
+    "liquidity": np.dtype("<f4"),
+}
+FILE_NAMES = {"ts": "ts.i64", "yes": "yes.f32", "no": "no.f32",
+              "volume": "volume.f32", "liquidity": "liquidity.f32"}
+# Columns every row has; the rest may be shorter on disk and read as NaN
+REQUIRED = ("ts", "yes", "no")
+OPTIONAL = tuple(c for c in COLUMNS if c not in REQUIRED)
+
+
+def to_epoch(timestamp) -> int:
+    """Epoch seconds from an ISO string, datetime or number (naive = UTC)."""
+    if isinstance(timestamp, (int, float, np.integer, np.floating)):
+        return int(timestamp)
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return int(timestamp.timestamp())
+
+
+def _optional(values: Optional[Iterable], n: int) -> np.ndarray:
+    """An optional column as float32, NaN where missing."""
+    if values is None:
+        return np.full(n, np.nan, dtype=np.float32)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float32)
+
+
+class PriceHistoryStore:
+    """Memory-mapped per-market price columns with O(1) appends."""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or HISTORY_DIR)
+
+    def _market_dir(self, market_id: str) -> Path:
+        market_id = str(market_id)
+        if not market_id or "/" in market_id or market_id.startswith("."):
+            raise ValueError(f"Bad market id: {market_id!r}")
+        return self.root / market_id
+
+    def _length(self, market_dir: Path) -> int:
+        """Complete rows on disk; a torn append leaves some columns one row longer."""
+        sizes = []
+        for col in REQUIRED:
+            path = market_dir / FILE_NAMES[col]
+            sizes.append(path.stat().st_size // COLUMNS[col].itemsize if path.exists() else 0)
+        return min(sizes)
+
+    # -- writes --------------------------------------------------------------
+
+    def append(self, market_id: str, yes: float, no: float, ts=None,
+               volume: Optional[float] = None, liquidity: Optional[float] = None):
+        """Append one snapshot. Timestamps older than the last stored one are dropped."""
+        self.append_many(market_id, [to_epoch(ts) if ts is not None else None], [yes], [no],
+                         volume=[volume], liquidity=[liquidity])
+
+    def append_many(
+        self,
+        market_id: str,
+        ts: Iterable,
+        yes: Iterable,
+        no: Iterable,
+        volume: Optional[Iterable] = None,
+        liquidity: Optional[Iterable] = None
+    ) -> int:
+        """Append a batch of snapshots for one market. Returns rows written."""
+        now = int(datetime.now(timezone.utc).timestamp())
+        ts = np.array([now if t is None else t for t in ts], dtype=COLUMNS["ts"])
+        yes = np.asarray(list(yes), dtype=COLUMNS["yes"])
+        no = np.asarray(list(no), dtype=COLUMNS["no"])
+        volume = _optional(volume, len(ts))
+        liquidity = _optional(liquidity, len(ts))
+
+        market_dir = self._market_dir(market_id)
+        market_dir.mkdir(parents=True, exist_ok=True)
+
+        columns = {"ts": ts, "yes": yes, "no": no, "volume": volume, "liquidity": liquidity}
+        if len(ts) > 1 and np.any(np.diff(ts) < 0):
+            order = np.argsort(ts, kind="stable")
+            columns = {col: values[order] for col, values in columns.items()}
+
+        with self._locked(market_dir):
+            # Keep the time column sorted so range reads can bisect
+            last = self._last_ts(market_dir)
+            if last is not None:
+                keep = columns["ts"] >= last
+                columns = {col: values[keep] for col, values in columns.items()}
+            if not len(columns["ts"]):
+                return 0
+
+            self._align_columns(market_dir)
+            for col, values in columns.items():
+                with open(market_dir / FILE_NAMES[col], "ab") as f:
+                    f.write(values.tobytes())
+        return len(columns["ts"])
+
+    def append_snapshot(self, prices: dict, ts=None) -> int:
+        """
+        Append one point per market from {market_id: (yes, no)} or
+        {market_id: (yes, no, volume, liquidity)}.
+        """
+        epoch = to_epoch(ts) if ts is not None else None
+        written = 0
+        for market_id, point in prices.items():
+            yes, no, *sizes = point
+            volume, liquidity = sizes if sizes else (None, None)
+            written += self.append_many(market_id, [epoch], [yes], [no], volume=[volume], liquidity=[liquidity])
+        return written
+
+    @contextmanager
+    def _locked(self, market_dir: Path):
+        """Hold the market's writer lock, across processes."""
+        with open(market_dir / ".lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _last_ts(self, market_dir: Path) -> Optional[int]:
+        """Read just the final timestamp instead of mapping the column."""
+        rows = self._length(market_dir)
+        if rows == 0:
+            return None
+        itemsize = COLUMNS["ts"].itemsize
+        with open(market_dir / FILE_NAMES["ts"], "rb") as f:
+            f.seek((rows - 1) * itemsize)
+            return int(np.frombuffer(f.read(itemsize), dtype=COLUMNS["ts"])[0])
+
+    def _align_columns(self, market_dir: Path):
+        """Cut torn appends back to whole rows and NaN-pad optional columns recorded late."""
+        rows = self._length(market_dir)
+        for col, dtype in COLUMNS.items():
+            path = market_dir / FILE_NAMES[col]
+            size = path.stat().st_size if path.exists() else 0
+            if size > rows * dtype.itemsize:
+                os.truncate(path, rows * dtype.itemsize)
+            elif size < rows * dtype.itemsize and col in OPTIONAL:
+                with open(path, "ab") as f:
+                    f.write(np.full(rows - size // dtype.itemsize, np.nan, dtype=dtype).tobytes())
+
+    # -- reads ---------------------------------------------------------------
+
+    def _columns(self, market_id: str) -> Optional[dict]:
+        market_dir = self._market_dir(market_id)
+        rows = self._length(market_dir) if market_dir.exists() else 0
+        if rows == 0:
+            return None
+        cols = {}
+        for col, dtype in COLUMNS.items():
+            path = market_dir / FILE_NAMES[col]
+            stored = min(rows, path.stat().st_size // dtype.itemsize) if path.exists() else 0
+            if stored == rows:
+                cols[col] = np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
+            else:
+                # Optional column not recorded (yet) for every row
+                cols[col] = np.full(rows, np.nan, dtype=dtype)
+                if stored:
+                    cols[col][:stored] = np.memmap(path, dtype=dtype, mode="r", shape=(stored,))
+        return cols
+
+    def read(self, market_id: str, start=None, end=None) -> dict:
+        """
+        Snapshots with start <= ts < end as {"ts", "yes", "no", "volume",
+        "liquidity"} arrays (volume and liquidity NaN where not recorded).
+
+        The arrays are views on the memory-mapped files; copy them if you need
+        them to outlive later appends.
+        """
+        cols = self._columns(market_id)
+        if cols is None:
+            return {col: np.empty(0, dtype=dtype) for col, dtype in COLUMNS.items()}
+        lo = int(np.searchsorted(cols["ts"], to_epoch(start), side="left")) if start is not None else 0
+        hi = int(np.searchsorted(cols["ts"], to_epoch(end), side="left")) if end is not None else len(cols["ts"])
+        return {col: values[lo:hi] for col, values in cols.items()}
+
+    def latest(self, market_id: str) -> Optional[tuple]:
+        """(ts, yes, no) of the most recent snapshot, or None."""
+        cols = self._columns(market_id)
+        if cols is None:
+            return None
+        return int(cols["ts"][-1]), float(cols["yes"][-1]), float(cols["no"][-1])
+
+    def count(self, market_id: str) -> int:
+        market_dir = self._market_dir(market_id)
+        return self._length(market_dir) if market_dir.exists() else 0
+
+    def markets(self) -> list:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir())
+
+    # -- migration -----------------------------------------------------------
+
+    def import_json_history(self, path: Path = MARKET_HISTORY) -> int:
+        """Import the old market_history.json ("prices" or "snapshots" entries)."""
+        history = json.loads(Path(path).read_text())
+        written = 0
+        for market_id, entry in history.items():
+            points = entry.get("prices") or entry.get("snapshots") or []
+            ts, yes, no = [], [], []
+            for p in points:
+                price = p.get("yes", p.get("bid"))
+                if price is None:
+                    continue
+                ts.append(to_epoch(p["timestamp"]))
+                yes.append(price)
+                no.append(p.get("no", 1 - price))
+            written += self.append_many(market_id, ts, yes, no)
+        return written
+
+
+_store: Optional[PriceHistoryStore] = None
+
+
+def get_history_store() -> PriceHistoryStore:
+    global _store
+    if _store is None or _store.root != HISTORY_DIR:
+        _store = PriceHistoryStore()
+    return _store
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Polymarket price history store")
+    parser.add_argument("--stats", action="store_true", help="Markets and points stored")
+    parser.add_argument("--show", help="Print recent points for a market ID")
+    parser.add_argument("--import-json", action="store_true", help="Import market_history.json")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+    store = get_history_store()
+
+    if args.import_json:
+        print(f"Imported {store.import_json_history()} points from {MARKET_HISTORY}")
+    elif args.show:
+        data = store.read(args.show)
+        for t, y, n, v, l in list(zip(data["ts"], data["yes"], data["no"],
+                                      data["volume"], data["liquidity"]))[-20:]:
+            stamp = datetime.fromtimestamp(int(t), timezone.utc).isoformat()
+            print(f"  {stamp}  YES {y:.1%}  NO {n:.1%}  vol ${v:,.0f}  liq ${l:,.0f}")
+    elif args.stats:
+        markets = store.markets()
+        points = sum(store.count(m) for m in markets)
+        print(f"Markets: {len(markets)} | Points: {points} | Root: {store.root}")
+    else:
+        parser.print_help()
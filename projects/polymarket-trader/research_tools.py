@@ -9,16 +9,17 @@ import re
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
-import requests
+
+from http_client import CLOB_API, GAMMA_API, get_client
+from market_data import fetch_token_data
+from market_store import get_store
+from orderbook import ASK, BID, OrderBook
+from price_history import get_history_store
+from rolling_analytics import WINDOWS, get_analytics, print_movers, read_movers
 
 WORKSPACE = Path(__file__).parent.parent.parent
 DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
 RESEARCH_DIR = WORKSPACE / "projects" / "polymarket-trader" / "research"
-MARKET_CACHE = DATA_DIR / "market_cache.json"
-MARKET_HISTORY = DATA_DIR / "market_history.json"
-
-GAMMA_API = "https://gamma-api.polymarket.com"
-CLOB_API = "https://clob.polymarket.com"
 
 
 def load_json(path: Path) -> dict:
@@ -39,9 +40,7 @@ def utcnow() -> str:
 def fetch_market_detail(market_id: str) -> dict:
     """Fetch detailed market info from Gamma API."""
     try:
-        resp = requests.get(f"{GAMMA_API}/markets/{market_id}", timeout=15)
-        resp.raise_for_status()
-        return resp.json()
+        return get_client().get_json(f"{GAMMA_API}/markets/{market_id}", timeout=15, cache_ttl=300)
     except Exception as e:
         print(f"Error fetching market {market_id}: {e}")
         return {}
@@ -50,80 +49,72 @@ def fetch_market_detail(market_id: str) -> dict:
 def fetch_orderbook(token_id: str) -> dict:
     """Get full orderbook for a token."""
     try:
-        resp = requests.get(f"{CLOB_API}/book", params={"token_id": token_id}, timeout=10)
-        resp.raise_for_status()
-        return resp.json()
+        return get_client().get_json(f"{CLOB_API}/book", params={"token_id": token_id}, timeout=10)
     except Exception as e:
         print(f"Error fetching orderbook: {e}")
         return {}
 
 
-def analyze_orderbook(orderbook: dict) -> dict:
-    """Analyze orderbook for trading insights."""
-    bids = orderbook.get("bids", [])
-    asks = orderbook.get("asks", [])
+def analyze_orderbook(orderbook) -> dict:
+    """Analyze orderbook for trading insights. Accepts a /book payload or an OrderBook."""
+    book = orderbook if isinstance(orderbook, OrderBook) else OrderBook.from_json(orderbook)
     
-    if not bids or not asks:
+    if book.best_bid is None or book.best_ask is None:
         return {"error": "Empty orderbook"}
     
-    best_bid = float(bids[0]["price"]) if bids else 0
-    best_ask = float(asks[0]["price"]) if asks else 1
-    spread = best_ask - best_bid
+    best_bid = book.best_bid
+    best_ask = book.best_ask
+    spread = book.spread
     spread_pct = spread / best_ask * 100 if best_ask > 0 else 0
     
-    bid_depth = sum(float(b["size"]) for b in bids[:5])
-    ask_depth = sum(float(a["size"]) for a in asks[:5])
-    
     return {
         "best_bid": best_bid,
         "best_ask": best_ask,
         "spread": spread,
         "spread_pct": spread_pct,
-        "bid_depth_5": bid_depth,
-        "ask_depth_5": ask_depth,
-        "imbalance": (bid_depth - ask_depth) / (bid_depth + ask_depth) if (bid_depth + ask_depth) > 0 else 0
+        "microprice": book.microprice(),
+        "bid_depth_5": book.depth(BID, 5),
+        "ask_depth_5": book.depth(ASK, 5),
+        "imbalance": book.imbalance(5)
     }
 
 
-def track_price_history(market_id: str, yes_price: float, no_price: float):
-    """Log price to history for tracking over time."""
-    history = load_json(MARKET_HISTORY)
-    
-    if market_id not in history:
-        history[market_id] = {"prices": []}
-    
-    history[market_id]["prices"].append({
-        "timestamp": utcnow(),
-        "yes": yes_price,
-        "no": no_price
-    })
-    
-    # Keep last 1000 data points per market
-    history[market_id]["prices"] = history[market_id]["prices"][-1000:]
-    
-    save_json(MARKET_HISTORY, history)
+def track_price_history(
+    market_id: str,
+    yes_price: float,
+    no_price: float,
+    volume: Optional[float] = None,
+    liquidity: Optional[float] = None
+):
+    """Log price (and 24h volume and liquidity, when known) to history for tracking over time."""
+    get_history_store().append(market_id, yes_price, no_price, volume=volume, liquidity=liquidity)
+    analytics = get_analytics()
+    analytics.update({str(market_id): yes_price})
+    analytics.save()
 
 
 def calculate_price_momentum(market_id: str, hours: int = 24) -> dict:
-    """Calculate price momentum over time period."""
-    history = load_json(MARKET_HISTORY)
+    """
+    Calculate price momentum over time period, plus the market's rolling
+    EWMA, volatility, z-score and window ranges when the analytics track it.
+    """
+    store = get_history_store()
     
-    if market_id not in history:
+    if store.count(market_id) == 0:
         return {"error": "No history"}
-    
-    prices = history[market_id].get("prices", [])
-    if len(prices) < 2:
+    if store.count(market_id) < 2:
         return {"error": "Insufficient history"}
     
     # Get prices from N hours ago
-    cutoff = datetime.now(timezone.utc).timestamp() - (hours * 3600)
-    recent = [p for p in prices if datetime.fromisoformat(p["timestamp"]).timestamp() > cutoff]
+    cutoff = int(datetime.now(timezone.utc).timestamp()) - (hours * 3600) + 1
+    recent = store.read(market_id, start=cutoff)["yes"]
     
     if len(recent) < 2:
         return {"error": "Insufficient recent data"}
     
-    start_price = recent[0]["yes"]
-    end_price = recent[-1]["yes"]
+    # Stored as float32; round off the representation noise
+    start_price = round(float(recent[0]), 6)
+    end_price = round(float(recent[-1]), 6)
     change = end_price - start_price
     change_pct = (change / start_price * 100) if start_price > 0 else 0
     
@@ -133,14 +124,14 @@ def calculate_price_momentum(market_id: str, hours: int = 24) -> dict:
         "end_price": end_price,
         "change": change,
         "change_pct": change_pct,
-        "data_points": len(recent)
+        "data_points": len(recent),
+        "rolling": get_analytics().stats(market_id)
     }
 
 
 def generate_research_template(market_id: str) -> str:
     """Generate a research template for a market."""
-    cache = load_json(MARKET_CACHE)
-    market = cache.get("markets", {}).get(market_id, {})
+    market = get_store().get(market_id)
     
     if not market:
         # Try to fetch directly
@@ -228,24 +219,20 @@ def create_research_file(market_id: str) -> Path:
 
 def find_research_opportunities(min_volume: float = 1000000, max_price: float = 0.85, min_price: float = 0.15) -> list:
     """Find markets worth researching (high volume, not too certain)."""
-    cache = load_json(MARKET_CACHE)
     opportunities = []
     
-    for market_id, market in cache.get("markets", {}).items():
-        volume = market.get("volume_24h", 0)
-        yes_price = market.get("yes_price", 0.5)
-        liquidity = market.get("liquidity", 0)
-        
-        # Want high volume markets that aren't already at extreme prices
-        if volume >= min_volume and min_price <= yes_price <= max_price and liquidity > 50000:
-            opportunities.append({
-                "market_id": market_id,
-                "question": market.get("question"),
-                "yes_price": yes_price,
-                "volume_24h": volume,
-                "liquidity": liquidity,
-                "uncertainty": 1 - abs(yes_price - 0.5) * 2  # Higher = more uncertain
-            })
+    # Want high volume markets that aren't already at extreme prices
+    candidates = get_store().find(min_liquidity=50000, min_volume=min_volume,
+                                  min_yes=min_price, max_yes=max_price)
+    for market in candidates:
+        opportunities.append({
+            "market_id": market.market_id,
+            "question": market.question,
+            "yes_price": market.yes_price,
+            "volume_24h": market.volume_24h,
+            "liquidity": market.liquidity,
+            "uncertainty": 1 - abs(market.yes_price - 0.5) * 2  # Higher = more uncertain
+        })
     
     # Sort by volume * uncertainty (want high volume uncertain markets)
     opportunities.sort(key=lambda x: x["volume_24h"] * x["uncertainty"], reverse=True)
@@ -254,14 +241,21 @@ def find_research_opportunities(min_volume: float = 1000000, max_price: float =
 
 if __name__ == "__main__":
     import argparse
+
+    import metrics
     
     parser = argparse.ArgumentParser(description="Polymarket Research Tools")
     parser.add_argument("--opportunities", action="store_true", help="Find research opportunities")
     parser.add_argument("--research", help="Create research file for market ID")
     parser.add_argument("--analyze", help="Analyze orderbook for market ID")
     parser.add_argument("--track", help="Track price for market ID")
+    parser.add_argument("--movers", nargs="?", const="1h", choices=list(WINDOWS),
+                        help="Top movers across all markets over a window (default 1h)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent requests for --analyze")
+    metrics.add_cli_args(parser)
     
     args = parser.parse_args()
+    metrics.start_cli(args)
     
     if args.opportunities:
         opps = find_research_opportunities()
@@ -274,20 +268,48 @@ if __name__ == "__main__":
             print(f"  ID: {o['market_id']}")
             print()
     
+    elif args.movers:
+        movers = read_movers(args.movers, limit=15)
+        print(f"\nTOP MOVERS ({args.movers})")
+        print_movers(movers, args.movers)
+    
     elif args.research:
         filepath = create_research_file(args.research)
         print(f"\nResearch template created at: {filepath}")
         print("Fill in the template with your analysis.")
     
     elif args.analyze:
-        cache = load_json(MARKET_CACHE)
-        market = cache.get("markets", {}).get(args.analyze, {})
-        token_ids = market.get("token_ids", [])
-        if token_ids:
-            print(f"\nAnalyzing orderbook for: {market.get('question', 'Unknown')[:50]}...")
-            orderbook = fetch_orderbook(token_ids[0])
-            analysis = analyze_orderbook(orderbook)
-            print(json.dumps(analysis, indent=2))
+        market = get_store().get(args.analyze)
+        token_ids = market.token_ids if market else ()
+        if len(token_ids) >= 2:
+            print(f"\nAnalyzing orderbook for: {(market.question or 'Unknown')[:50]}...")
+            # Only the YES book is fetched; the NO book is its mirror image
+            yes_token, no_token = token_ids[:2]
+            token_data = fetch_token_data(token_ids[:2], workers=args.workers, books=[yes_token])
+            yes_book = OrderBook.from_json(token_data[yes_token]["book"] or {}, token_id=yes_token)
+            books = {yes_token: yes_book, no_token: yes_book.complement(token_id=no_token)}
+            for label, token_id in (("YES", yes_token), ("NO", no_token)):
+                data = token_data[token_id]
+                analysis = analyze_orderbook(books[token_id])
+                analysis["buy_price"] = data["buy"]
+                analysis["sell_price"] = data["sell"]
+                print(f"\n{label}:")
+                print(json.dumps(analysis, indent=2))
+        elif market:
+            print(f"\nNo orderbook tokens for market {args.analyze}")
+        else:
+            print(f"\nUnknown market: {args.analyze}")
+    
+    elif args.track:
+        market = get_store().get(args.track)
+        if market:
+            track_price_history(args.track, market.yes_price, market.no_price,
+                                volume=market.volume_24h, liquidity=market.liquidity)
+            print(f"\nTracked {args.track}: YES {market.yes_price:.1%} / NO {market.no_price:.1%}")
+            momentum = calculate_price_momentum(args.track)
+            print(json.dumps(momentum, indent=2))
+        else:
+            print(f"\nUnknown market: {args.track}")
     
     else:
         parser.print_help()
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+"""
+Polymarket Rolling Analytics
+Incremental momentum and volatility statistics for every tracked market.
+
+Each scan snapshot updates the state of all markets at once with array
+operations; nothing is re-read from the history store. Per market:
+    ewma_<h>     time-decayed mean YES price for each half-life in EWMA_HALFLIVES
+    vol          realized volatility: EWMA of squared price moves, per sqrt(hour)
+    zscore       the latest move in units of the volatility before it
+    <window>     min, max and change of the YES price over each of WINDOWS
+
+Window statistics come from a ring of WINDOW_BUCKETS time buckets per
+window, so they are exact to within one bucket (window / WINDOW_BUCKETS);
+the completed buckets are only re-aggregated when a new bucket starts.
+After every update the top movers of each window are ranked once, so
+"top movers in the last hour" is a constant-time read, also straight from
+the saved state file without loading the arrays.
+
+Usage:
+    python rolling_analytics.py --movers 1h          # Biggest YES moves in the last hour
+    python rolling_analytics.py --market MARKET_ID   # Every statistic for one market
+    python rolling_analytics.py --rebuild            # Replay the price history store
+"""
+
+import json
+import math
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from price_history import get_history_store, to_epoch
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+ANALYTICS_FILE = DATA_DIR / "analytics.npz"
+
+# Rolling windows (seconds) for min/max/change and top movers
+WINDOWS = {"1h": 3600, "6h": 6 * 3600, "24h": 24 * 3600}
+WINDOW_BUCKETS = 12
+EWMA_HALFLIVES = {"1h": 3600, "24h": 24 * 3600}
+VOL_HALFLIFE = 6 * 3600
+TOP_K = 50
+INITIAL_CAPACITY = 1024
+STATE_VERSION = 1
+
+
+def _nan(*shape, dtype=np.float64) -> np.ndarray:
+    return np.full(shape, np.nan, dtype=dtype)
+
+
+class WindowRing:
+    """
+    Open/min/max of one rolling window for every market, kept in a ring of
+    time buckets (the current one plus `buckets` completed ones).
+    """
+
+    def __init__(self, window: float, buckets: int = WINDOW_BUCKETS, capacity: int = INITIAL_CAPACITY):
+        self.window = window
+        self.buckets = buckets
+        self.width = window / buckets
+        self.slots = buckets + 1
+        self.slot_bucket = np.full(self.slots, -1, dtype=np.int64)
+        self.current = -1
+        # float32 is plenty for prices and keeps 100k markets x 13 slots small
+        self.open = _nan(capacity, self.slots, dtype=np.float32)
+        self.min = _nan(capacity, self.slots, dtype=np.float32)
+        self.max = _nan(capacity, self.slots, dtype=np.float32)
+        self.closed_open = _nan(capacity)
+        self.closed_min = _nan(capacity)
+        self.closed_max = _nan(capacity)
+
+    def grow(self, capacity: int):
+        for name in ("open", "min", "max"):
+            old = getattr(self, name)
+            new = _nan(capacity, self.slots, dtype=np.float32)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        for name in ("closed_open", "closed_min", "closed_max"):
+            old = getattr(self, name)
+            new = _nan(capacity)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def roll(self, ts: float):
+        """Move the current bucket up to `ts`, clearing expired slots and re-aggregating the closed ones."""
+        bucket = int(ts // self.width)
+        if bucket <= self.current:
+            return
+        first = max(self.current + 1, bucket - self.slots + 1)
+        for b in range(first, bucket + 1):
+            s = b % self.slots
+            self.open[:, s] = self.min[:, s] = self.max[:, s] = np.nan
+            self.slot_bucket[s] = b
+        self.current = bucket
+
+        # Completed buckets still inside the window, oldest first
+        closed = [b % self.slots for b in range(bucket - self.buckets, bucket) if b >= 0
+                  and self.slot_bucket[b % self.slots] == b]
+        self.closed_open[:] = self.closed_min[:] = self.closed_max[:] = np.nan
+        if closed:
+            self.closed_min[:] = np.fmin.reduce(self.min[:, closed], axis=1)
+            self.closed_max[:] = np.fmax.reduce(self.max[:, closed], axis=1)
+            for s in reversed(closed):
+                opened = self.open[:, s]
+                self.closed_open = np.where(np.isnan(opened), self.closed_open, opened)
+
+    def update(self, rows: np.ndarray, price: np.ndarray):
+        s = self.current % self.slots
+        opened = self.open[rows, s]
+        self.open[rows, s] = np.where(np.isnan(opened), price, opened)
+        self.min[rows, s] = np.fmin(self.min[rows, s], price)
+        self.max[rows, s] = np.fmax(self.max[rows, s], price)
+
+    def values(self, rows) -> tuple:
+        """(open, min, max) over the window for `rows` (an index, slice or index array)."""
+        s = self.current % self.slots
+        opened = self.closed_open[rows]
+        opened = np.where(np.isnan(opened), self.open[rows, s], opened)
+        return (opened, np.fmin(self.closed_min[rows], self.min[rows, s]),
+                np.fmax(self.closed_max[rows], self.max[rows, s]))
+
+
+class RollingAnalytics:
+    """Per-market rolling statistics over YES prices; see the module docstring."""
+
+    def __init__(
+        self,
+        windows: Optional[dict] = None,
+        halflives: Optional[dict] = None,
+        vol_halflife: float = VOL_HALFLIFE,
+        buckets: int = WINDOW_BUCKETS,
+        top_k: int = TOP_K,
+        capacity: int = INITIAL_CAPACITY
+    ):
+        self.windows = dict(windows or WINDOWS)
+        self.halflives = dict(halflives or EWMA_HALFLIVES)
+        self.vol_halflife = vol_halflife
+        self.buckets = buckets
+        self.top_k = top_k
+        self.ids = []
+        self.index = {}
+        self.n = 0
+        self.capacity = capacity
+        self.updated_at = None
+        self.last_ts = np.zeros(capacity, dtype=np.int64)
+        self.last = _nan(capacity)
+        self.ewma = {h: _nan(capacity) for h in self.halflives}
+        self.var = _nan(capacity)
+        self.zscore = _nan(capacity)
+        self.rings = {w: WindowRing(secs, buckets, capacity) for w, secs in self.windows.items()}
+        self.movers = {w: [] for w in self.windows}
+        self._last_ids = self._last_rows = None
+
+    def __len__(self) -> int:
+        return self.n
+
+    # -- updates -------------------------------------------------------------
+
+    def _rows(self, market_ids: list) -> np.ndarray:
+        # Consecutive scans usually cover the same markets in the same order
+        if market_ids == self._last_ids:
+            return self._last_rows
+        index = self.index
+        new = [m for m in market_ids if m not in index]
+        if self.n + len(new) > self.capacity:
+            self._grow(max(self.capacity * 2, self.n + len(new)))
+        for market_id in new:
+            index[market_id] = self.n
+            self.ids.append(market_id)
+            self.n += 1
+        rows = np.fromiter(map(index.__getitem__, market_ids), dtype=np.int64, count=len(market_ids))
+        self._last_ids, self._last_rows = market_ids, rows
+        return rows
+
+    def _grow(self, capacity: int):
+        def grown(old, fill):
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            return new
+
+        self.last_ts = grown(self.last_ts, 0)
+        self.last = grown(self.last, np.nan)
+        self.ewma = {h: grown(v, np.nan) for h, v in self.ewma.items()}
+        self.var = grown(self.var, np.nan)
+        self.zscore = grown(self.zscore, np.nan)
+        for ring in self.rings.values():
+            ring.grow(capacity)
+        self.capacity = capacity
+
+    def update(self, prices: dict, ts=None) -> int:
+        """
+        Fold one snapshot {market_id (str): YES price} taken at `ts` (default
+        now) into every statistic. Markets already updated at or after `ts`
+        are skipped. Returns the number of markets updated.
+        """
+        ts = to_epoch(ts) if ts is not None else int(datetime.now(timezone.utc).timestamp())
+        rows = self._rows(list(prices))
+        price = np.fromiter(prices.values(), dtype=np.float64, count=len(rows))
+        fresh = (self.last_ts[rows] < ts) & ~np.isnan(price)
+        rows, price = rows[fresh], price[fresh]
+
+        seen = self.last_ts[rows] > 0
+        dt = np.where(seen, ts - self.last_ts[rows], 0).astype(np.float64)
+        # Moves are scaled to one hour so irregular scan intervals compare
+        with np.errstate(divide="ignore", invalid="ignore"):
+            move = np.where(seen, (price - self.last[rows]) / np.sqrt(dt / 3600), np.nan)
+            prev_var = self.var[rows]
+            self.zscore[rows] = np.where(prev_var > 0, move / np.sqrt(prev_var), np.nan)
+        decay = 1 - np.exp(-dt * math.log(2) / self.vol_halflife)
+        self.var[rows] = np.where(np.isnan(prev_var), move ** 2, prev_var + decay * (move ** 2 - prev_var))
+        for h, halflife in self.halflives.items():
+            decay = 1 - np.exp(-dt * math.log(2) / halflife)
+            ewma = self.ewma[h][rows]
+            self.ewma[h][rows] = np.where(seen, ewma + decay * (price - ewma), price)
+        self.last[rows] = price
+        self.last_ts[rows] = ts
+
+        for ring in self.rings.values():
+            ring.roll(ts)
+            ring.update(rows, price.astype(np.float32))
+        self.updated_at = max(ts, self.updated_at or 0)
+        self._rank()
+        return len(rows)
+
+    def _rank(self):
+        """Rank each window's biggest absolute moves among markets still quoted inside it."""
+        n = self.n
+        for w, ring in self.rings.items():
+            opened, _, _ = ring.values(slice(0, n))
+            change = self.last[:n] - opened
+            stale = self.last_ts[:n] < self.updated_at - self.windows[w]
+            score = np.where(np.isnan(change) | stale, -np.inf, np.abs(change))
+            k = min(self.top_k, int(np.isfinite(score).sum()))
+            if k == 0:
+                self.movers[w] = []
+                continue
+            top = np.argpartition(-score, k - 1)[:k]
+            self.movers[w] = [self._row_stats(int(i), windows=[w]) for i in top[np.argsort(-score[top])]]
+
+    # -- reads ---------------------------------------------------------------
+
+    def _row_stats(self, i: int, windows: Optional[Iterable] = None) -> dict:
+        def num(value) -> Optional[float]:
+            value = float(value)
+            return None if math.isnan(value) else value
+
+        stats = {
+            "market_id": self.ids[i],
+            "ts": int(self.last_ts[i]),
+            "price": num(self.last[i]),
+            **{f"ewma_{h}": num(v[i]) for h, v in self.ewma.items()},
+            "vol": num(np.sqrt(self.var[i])),
+            "zscore": num(self.zscore[i]),
+        }
+        for w in windows if windows is not None else self.windows:
+            opened, low, high = self.rings[w].values(i)
+            stats[w] = {"open": num(opened), "min": num(low), "max": num(high), "change": num(self.last[i] - opened)}
+        return stats
+
+    def stats(self, market_id: str) -> Optional[dict]:
+        """Every statistic for one market, or None if it has never been updated."""
+        i = self.index.get(str(market_id))
+        return None if i is None else self._row_stats(i)
+
+    def top_movers(self, window: str = "1h", limit: int = 10) -> list:
+        """Biggest absolute YES moves over `window`, ranked at the last update."""
+        return self.movers[window][:limit]
+
+    def arrays(self) -> dict:
+        """Column views of the current statistics for all markets, e.g. for a MarketUniverse join."""
+        n = self.n
+        out = {"ids": np.array(self.ids, dtype=object), "price": self.last[:n], "vol": np.sqrt(self.var[:n]),
+               "zscore": self.zscore[:n], **{f"ewma_{h}": v[:n] for h, v in self.ewma.items()}}
+        for w, ring in self.rings.items():
+            opened, low, high = ring.values(slice(0, n))
+            out.update({f"{w}_min": low, f"{w}_max": high, f"{w}_change": self.last[:n] - opened})
+        return out
+
+    # -- persistence ---------------------------------------------------------
+
+    def save(self, path: Path = None):
+        """Write the state (and the ranked movers) to an .npz file, atomically."""
+        path = Path(path or ANALYTICS_FILE)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        n = self.n
+        config = {
+            "version": STATE_VERSION, "windows": self.windows, "halflives": self.halflives,
+            "vol_halflife": self.vol_halflife, "buckets": self.buckets, "top_k": self.top_k,
+            "updated_at": self.updated_at, "currents": {w: r.current for w, r in self.rings.items()},
+        }
+        arrays = {
+            "config": np.array(json.dumps(config)),
+            "ids": np.array(self.ids, dtype=str),
+            "last_ts": self.last_ts[:n], "last": self.last[:n], "var": self.var[:n], "zscore": self.zscore[:n],
+        }
+        for h, v in self.ewma.items():
+            arrays[f"ewma_{h}"] = v[:n]
+        for w, ring in self.rings.items():
+            arrays[f"movers_{w}"] = np.array(json.dumps(self.movers[w]))
+            arrays[f"{w}_slot_bucket"] = ring.slot_bucket
+            for name in ("open", "min", "max"):
+                arrays[f"{w}_{name}"] = getattr(ring, name)[:n]
+            for name in ("closed_open", "closed_min", "closed_max"):
+                arrays[f"{w}_{name}"] = getattr(ring, name)[:n]
+        tmp = path.with_name(path.stem + ".tmp.npz")
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path = None) -> "RollingAnalytics":
+        path = Path(path or ANALYTICS_FILE)
+        with np.load(path) as data:
+            config = json.loads(str(data["config"]))
+            if config["version"] != STATE_VERSION:
+                raise ValueError(f"{path} is state version {config['version']}, expected {STATE_VERSION}")
+            ids = [str(m) for m in data["ids"]]
+            engine = cls(config["windows"], config["halflives"], config["vol_halflife"], config["buckets"],
+                         config["top_k"], capacity=max(len(ids), INITIAL_CAPACITY))
+            n = engine.n = len(ids)
+            engine.ids = ids
+            engine.index = {m: i for i, m in enumerate(ids)}
+            engine.updated_at = config["updated_at"]
+            engine.last_ts[:n] = data["last_ts"]
+            engine.last[:n] = data["last"]
+            engine.var[:n] = data["var"]
+            engine.zscore[:n] = data["zscore"]
+            for h in engine.ewma:
+                engine.ewma[h][:n] = data[f"ewma_{h}"]
+            for w, ring in engine.rings.items():
+                engine.movers[w] = json.loads(str(data[f"movers_{w}"]))
+                ring.current = config["currents"][w]
+                ring.slot_bucket[:] = data[f"{w}_slot_bucket"]
+                for name in ("open", "min", "max", "closed_open", "closed_min", "closed_max"):
+                    getattr(ring, name)[:n] = data[f"{w}_{name}"]
+        return engine
+
+    @classmethod
+    def from_history(cls, store=None, **kwargs) -> "RollingAnalytics":
+        """Replay every stored price snapshot, in time order, into a new engine."""
+        store = store or get_history_store()
+        market_ids, ts, yes = [], [], []
+        for market_id in store.markets():
+            cols = store.read(market_id)
+            market_ids.append(np.full(len(cols["ts"]), market_id, dtype=object))
+            ts.append(np.asarray(cols["ts"]))
+            yes.append(np.asarray(cols["yes"], dtype=np.float64))
+        engine = cls(**kwargs)
+        if not ts:
+            return engine
+        market_ids, ts, yes = np.concatenate(market_ids), np.concatenate(ts), np.concatenate(yes)
+        order = np.argsort(ts, kind="stable")
+        market_ids, ts, yes = market_ids[order], ts[order], yes[order]
+        bounds = np.flatnonzero(np.diff(ts)) + 1
+        for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(ts)]):
+            engine.update(dict(zip(market_ids[lo:hi], yes[lo:hi])), ts=int(ts[lo]))
+        return engine
+
+
+def read_movers(window: str = "1h", limit: int = 10, path: Path = None) -> list:
+    """Top movers straight from the saved state, without loading the per-market arrays."""
+    path = Path(path or ANALYTICS_FILE)
+    if not path.exists():
+        return []
+    with np.load(path) as data:
+        return json.loads(str(data[f"movers_{window}"]))[:limit]
+
+
+_engine: Optional[RollingAnalytics] = None
+_engine_path: Optional[Path] = None
+
+
+def get_analytics() -> RollingAnalytics:
+    """The process-wide engine: the saved state, else a replay of the history store."""
+    global _engine, _engine_path
+    if _engine is None or _engine_path != ANALYTICS_FILE:
+        _engine = RollingAnalytics.load() if ANALYTICS_FILE.exists() else RollingAnalytics.from_history()
+        _engine_path = ANALYTICS_FILE
+    return _engine
+
+
+def print_movers(movers: list, window: str):
+    print(f"\n{'market':<12} {'price':>7} {'change':>8} {'min':>7} {'max':>7} {'vol':>7} {'z':>6}")
+    for m in movers:
+        w = m[window]
+        vol = f"{m['vol']:.3f}" if m["vol"] is not None else "-"
+        z = f"{m['zscore']:+.1f}" if m["zscore"] is not None else "-"
+        print(f"{m['market_id']:<12} {m['price']:>7.1%} {w['change']:>+8.1%} {w['min']:>7.1%} "
+              f"{w['max']:>7.1%} {vol:>7} {z:>6}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Rolling momentum and volatility analytics")
+    parser.add_argument("--movers", choices=list(WINDOWS), help="Top movers over a window")
+    parser.add_argument("--market", help="Every statistic for one market")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the state from the price history store")
+    parser.add_argument("--limit", type=int, default=20, help="Movers to print")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+
+    if args.rebuild:
+        engine = RollingAnalytics.from_history()
+        engine.save()
+        print(f"Rebuilt {len(engine)} markets into {ANALYTICS_FILE}")
+    elif args.movers:
+        movers = read_movers(args.movers, args.limit)
+        print(f"Top {len(movers)} movers over {args.movers}")
+        print_movers(movers, args.movers)
+    elif args.market:
+        print(json.dumps(get_analytics().stats(args.market), indent=2))
+    else:
+        parser.print_help()
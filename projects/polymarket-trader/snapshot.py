@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+Polymarket Snapshots
+Typed, schema-versioned binary snapshots of markets, signals and price history.
+
+A snapshot file is a small JSON header followed by fixed-width column blobs:
+
+    b"PMSNAP\\0\\0"  magic
+    uint32          format version
+    uint32          header length
+    header          {"kind", "schema", "meta", "tables": {name: {"rows", "columns"}}}
+    columns         64-byte aligned; f8/f4/i8/u1 arrays, 32-byte big-endian u256
+                    (CLOB token ids), or int64 offsets + UTF-8 bytes (+ a u1
+                    null mask if needed) for str and json columns
+
+Opening a snapshot memory-maps the file and parses only the header. Numeric
+columns are NumPy views on the map (no copy, no parse); string columns decode
+a row at a time when asked. Missing floats are NaN on disk and None in rows;
+markets come back as market_record.Market records.
+
+Usage:
+    python snapshot.py --export markets            # data/markets.snap from the store
+    python snapshot.py --export signals            # data/signals.snap from signals.json
+    python snapshot.py --export history            # data/history.snap from price history
+    python snapshot.py --show data/markets.snap    # Header and first rows
+    python snapshot.py --bench                     # Size / load time vs the JSON files
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from market_record import Market
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+MARKETS_SNAPSHOT = DATA_DIR / "markets.snap"
+SIGNALS_SNAPSHOT = DATA_DIR / "signals.snap"
+HISTORY_SNAPSHOT = DATA_DIR / "history.snap"
+
+MAGIC = b"PMSNAP\0\0"
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct("<8sII")
+ALIGN = 64
+
+NUMERIC_TYPES = {"f8": "<f8", "f4": "<f4", "i8": "<i8", "u1": "u1"}
+
+# Per-kind column schemas; bump the version whenever a schema changes shape.
+# Token ids are stored as two u256 columns rather than a JSON string; a column
+# holding anything but uint256 decimals falls back to str.
+MARKET_SCHEMA = {
+    "market_id": "str", "event_id": "str", "event_title": "str", "question": "str", "slug": "str",
+    "yes_price": "f8", "no_price": "f8", "volume_24h": "f8", "liquidity": "f8",
+    "yes_token": "u256", "no_token": "u256", "end_date": "str", "end_epoch": "f8", "fetched_at": "str",
+}
+HISTORY_MARKET_SCHEMA = {"market_id": "str", "start": "i8", "count": "i8"}
+HISTORY_POINT_SCHEMA = {"ts": "i8", "yes": "f4", "no": "f4", "volume": "f4", "liquidity": "f4"}
+SCHEMA_VERSIONS = {"markets": 1, "signals": 1, "history": 2}
+
+
+def _align(n: int) -> int:
+    return -n % ALIGN
+
+
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
+
+def _encode_column(kind: str, values: list) -> tuple:
+    """(column header, [blobs]) for one column; blob offsets are filled in later."""
+    if kind in NUMERIC_TYPES:
+        if kind.startswith("f") and not isinstance(values, np.ndarray):
+            values = [math.nan if v is None else v for v in values]
+        array = np.asarray(values, dtype=NUMERIC_TYPES[kind])
+        return {"type": kind}, [("data", array.tobytes())]
+    if kind == "u256":
+        if all(v is None or (isinstance(v, str) and v.isdigit() and int(v) < 1 << 256) for v in values):
+            data = b"".join(b"\0" * 32 if v is None else int(v).to_bytes(32, "big") for v in values)
+            blobs = [("data", data)]
+            if any(v is None for v in values):
+                blobs.append(("nulls", np.fromiter((v is None for v in values), dtype="u1",
+                                                   count=len(values)).tobytes()))
+            return {"type": kind}, blobs
+        kind = "str"
+
+    to_text = json.dumps if kind == "json" else str
+    encoded = [b"" if v is None else to_text(v).encode() for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype="<i8")
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    blobs = [("offsets", offsets.tobytes()), ("data", b"".join(encoded))]
+    if any(v is None for v in values):
+        blobs.append(("nulls", np.fromiter((v is None for v in values), dtype="u1", count=len(values)).tobytes()))
+    return {"type": kind}, blobs
+
+
+def write_snapshot(path: Path, kind: str, tables: dict, meta: Optional[dict] = None) -> Path:
+    """
+    Write {table: {column: (type, values)}} as a snapshot of `kind`.
+
+    Written to a temporary file and renamed into place, so readers (which may
+    have the old file mapped) never see a partial snapshot.
+    """
+    header = {"kind": kind, "schema": SCHEMA_VERSIONS.get(kind, 1), "meta": meta or {}, "tables": {}}
+    blobs = []
+    for name, columns in tables.items():
+        lengths = {len(values) for _, values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns of table {name!r} differ in length")
+        table = {"rows": lengths.pop() if lengths else 0, "columns": {}}
+        for column, (col_type, values) in columns.items():
+            col_header, col_blobs = _encode_column(col_type, values if isinstance(values, np.ndarray) else list(values))
+            table["columns"][column] = col_header
+            for part, data in col_blobs:
+                blobs.append((col_header, part, data))
+        header["tables"][name] = table
+
+    # Offsets depend on the header length, which depends on the offsets' digits;
+    # settle it by reserving a fixed-width field per offset.
+    for col_header, part, data in blobs:
+        col_header[part] = [0, len(data)]
+    raw = json.dumps(header, separators=(",", ":")).encode()
+    reserve = len(raw) + 24 * len(blobs)
+    position = PREAMBLE.size + reserve
+    position += _align(position)
+    for col_header, part, data in blobs:
+        col_header[part] = [position, len(data)]
+        position += len(data) + _align(len(data))
+    raw = json.dumps(header, separators=(",", ":")).encode()
+    raw += b" " * (reserve - len(raw))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(raw)))
+        f.write(raw)
+        f.write(b"\0" * _align(PREAMBLE.size + len(raw)))
+        for _, _, data in blobs:
+            f.write(data)
+            f.write(b"\0" * _align(len(data)))
+    os.replace(tmp, path)
+    return path
+
+
+def write_markets(markets: Iterable[dict], path: Path = MARKETS_SNAPSHOT) -> Path:
+    """Snapshot Market records (or dicts with the same fields)."""
+    markets = [Market.from_dict(m) for m in markets]
+    columns = {field: (col_type, [getattr(m, field) for m in markets])
+               for field, col_type in MARKET_SCHEMA.items()}
+    return write_snapshot(path, "markets", {"markets": columns})
+
+
+def _infer_type(values: list) -> str:
+    present = [v for v in values if v is not None]
+    # u1 and i8 have no null mask; a column with gaps keeps exact values as json
+    nullable = len(present) < len(values)
+    if present and all(isinstance(v, bool) for v in present):
+        return "json" if nullable else "u1"
+    if present and all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        if nullable or not all(-2 ** 63 <= v < 2 ** 63 for v in present):
+            return "json"
+        return "i8"
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return "f8"
+    if all(isinstance(v, str) for v in present):
+        return "str"
+    return "json"
+
+
+def write_signals(signals: dict, path: Path = SIGNALS_SNAPSHOT) -> Path:
+    """Snapshot an analyze_all() result: one table per signal, scalars in meta."""
+    tables, meta = {}, {}
+    for key, value in signals.items():
+        if isinstance(value, list):
+            fields = list(dict.fromkeys(f for row in value for f in row))
+            tables[key] = {}
+            for field in fields:
+                values = [row.get(field) for row in value]
+                tables[key][field] = (_infer_type(values), values)
+        else:
+            meta[key] = value
+    return write_snapshot(path, "signals", tables, meta=meta)
+
+
+def write_history(history=None, path: Path = HISTORY_SNAPSHOT, market_ids: Optional[list] = None) -> Path:
+    """Snapshot recorded price history: a per-market index table plus one points table."""
+    if history is None:
+        from price_history import get_history_store
+        history = get_history_store()
+    market_ids = market_ids if market_ids is not None else history.markets()
+    ids, starts, counts = [], [], []
+    parts = {col: [] for col in HISTORY_POINT_SCHEMA}
+    start = 0
+    for market_id in market_ids:
+        cols = history.read(market_id)
+        n = len(cols["ts"])
+        if not n:
+            continue
+        ids.append(str(market_id))
+        starts.append(start)
+        counts.append(n)
+        start += n
+        for col in parts:
+            parts[col].append(np.asarray(cols[col]))
+    points = {
+        col: (col_type, np.concatenate(parts[col]) if parts[col] else np.empty(0, dtype=NUMERIC_TYPES[col_type]))
+        for col, col_type in HISTORY_POINT_SCHEMA.items()
+    }
+    tables = {
+        "markets": {"market_id": ("str", ids), "start": ("i8", starts), "count": ("i8", counts)},
+        "points": points,
+    }
+    return write_snapshot(path, "history", tables)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+
+class StrColumn:
+    """Lazily decoded string column over the mapped file."""
+
+    def __init__(self, buf: np.ndarray, spec: dict, rows: int):
+        start, _ = spec["offsets"]
+        self.offsets = np.frombuffer(buf, dtype="<i8", count=rows + 1, offset=start)
+        data_start, data_len = spec["data"]
+        self.data = buf[data_start:data_start + data_len]
+        self.nulls = None
+        if "nulls" in spec:
+            self.nulls = np.frombuffer(buf, dtype="u1", count=rows, offset=spec["nulls"][0])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        if self.nulls is not None and self.nulls[i]:
+            return None
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes().decode()
+
+    def tolist(self) -> list:
+        data = self.data.tobytes()
+        bounds = self.offsets.tolist()
+        text = data.decode()
+        # Byte offsets are character offsets when the column is pure ASCII
+        source = text if len(text) == len(data) else data
+        values = [source[a:b] for a, b in zip(bounds, bounds[1:])]
+        if source is data:
+            values = [v.decode() for v in values]
+        if self.nulls is not None:
+            for i in np.flatnonzero(self.nulls).tolist():
+                values[i] = None
+        return values
+
+
+class U256Column(StrColumn):
+    """Token ids stored as 32-byte integers, decoded back to decimal strings."""
+
+    def __init__(self, buf: np.ndarray, spec: dict, rows: int):
+        start, length = spec["data"]
+        self.data = buf[start:start + length]
+        self.rows = rows
+        self.nulls = None
+        if "nulls" in spec:
+            self.nulls = np.frombuffer(buf, dtype="u1", count=rows, offset=spec["nulls"][0])
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, i: int) -> Optional[str]:
+        if self.nulls is not None and self.nulls[i]:
+            return None
+        return str(int.from_bytes(self.data[i * 32:(i + 1) * 32].tobytes(), "big"))
+
+    def tolist(self) -> list:
+        data = self.data.tobytes()
+        values = [str(int.from_bytes(data[i:i + 32], "big")) for i in range(0, len(data), 32)]
+        if self.nulls is not None:
+            for i in np.flatnonzero(self.nulls).tolist():
+                values[i] = None
+        return values
+
+
+class Table:
+    """One table of a snapshot. Columns are built on first access."""
+
+    def __init__(self, buf: np.ndarray, spec: dict):
+        self._buf = buf
+        self.rows = spec["rows"]
+        self.specs = spec["columns"]
+        self._columns = {}
+        self._index = {}
+
+    def __len__(self) -> int:
+        return self.rows
+
+    @property
+    def column_names(self) -> list:
+        return list(self.specs)
+
+    def column(self, name: str):
+        """A read-only NumPy view for numeric columns, a StrColumn for strings."""
+        if name not in self._columns:
+            spec = self.specs[name]
+            if spec["type"] in ("str", "json"):
+                self._columns[name] = StrColumn(self._buf, spec, self.rows)
+            elif spec["type"] == "u256":
+                self._columns[name] = U256Column(self._buf, spec, self.rows)
+            else:
+                self._columns[name] = np.frombuffer(self._buf, dtype=NUMERIC_TYPES[spec["type"]],
+                                                    count=self.rows, offset=spec["data"][0])
+        return self._columns[name]
+
+    def __getitem__(self, name: str):
+        return self.column(name)
+
+    def _value(self, name: str, i: int):
+        value = self.column(name)[i]
+        kind = self.specs[name]["type"]
+        if kind in ("str", "u256"):
+            return value
+        if kind == "json":
+            return None if value is None else json.loads(value)
+        if kind == "u1":
+            return bool(value)
+        if kind == "i8":
+            return int(value)
+        return None if math.isnan(value) else float(value)
+
+    def row(self, i: int, fields: Optional[list] = None) -> dict:
+        return {name: self._value(name, i) for name in fields or self.specs}
+
+    def rows_iter(self, fields: Optional[list] = None):
+        for i in range(self.rows):
+            yield self.row(i, fields)
+
+    def find(self, name: str, value) -> Optional[int]:
+        """Row number where column `name` equals `value` (index built on first use)."""
+        if name not in self._index:
+            column = self.column(name)
+            values = column.tolist()
+            self._index[name] = {v: i for i, v in enumerate(values)}
+        return self._index[name].get(value)
+
+
+class Snapshot:
+    """A memory-mapped snapshot file; see the module docstring for the layout."""
+
+    def __init__(self, path: Path, kind: Optional[str] = None):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = np.frombuffer(self._mmap, dtype=np.uint8)
+        magic, version, header_len = PREAMBLE.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a snapshot file")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: snapshot format {version}, expected {FORMAT_VERSION}")
+        header = json.loads(self._mmap[PREAMBLE.size:PREAMBLE.size + header_len])
+        self.kind = header["kind"]
+        self.schema = header["schema"]
+        if kind is not None and self.kind != kind:
+            raise ValueError(f"{self.path} holds {self.kind!r}, not {kind!r}")
+        if self.schema != SCHEMA_VERSIONS.get(self.kind, 1):
+            raise ValueError(f"{self.path}: {self.kind} schema v{self.schema} is stale; re-export it")
+        self.meta = header["meta"]
+        self.tables = {name: Table(buf, spec) for name, spec in header["tables"].items()}
+
+    def __getitem__(self, name: str) -> Table:
+        return self.tables[name]
+
+    # -- kind-specific views -------------------------------------------------
+
+    def market(self, market_id: str) -> Optional[Market]:
+        """One market record."""
+        table = self.tables["markets"]
+        i = table.find("market_id", str(market_id))
+        return None if i is None else _market(table.row(i))
+
+    def markets(self) -> dict:
+        """Every market -> {market_id: Market}."""
+        table = self.tables["markets"]
+        names = [n for n in table.column_names if n not in ("yes_token", "no_token")]
+        # Written from records, so NaN only ever means "no end date" and passes straight through
+        values = [table.column(n).tolist() for n in names]
+        yes_tokens, no_tokens = (table.column(n).tolist() for n in ("yes_token", "no_token"))
+        markets = {}
+        for row, yes, no in zip(zip(*values), yes_tokens, no_tokens):
+            market = Market(**dict(zip(names, row)), token_ids=tuple(t for t in (yes, no) if t is not None))
+            markets[market.market_id] = market
+        return markets
+
+    def signals(self) -> dict:
+        """The analyze_all() dict this snapshot was written from."""
+        return {**self.meta, **{name: list(table.rows_iter()) for name, table in self.tables.items()}}
+
+    def history(self, market_id: str) -> dict:
+        """{"ts", "yes", "no", "volume", "liquidity"} views for one market's recorded history."""
+        index, points = self.tables["markets"], self.tables["points"]
+        i = index.find("market_id", str(market_id))
+        if i is None:
+            return {col: np.empty(0, dtype=NUMERIC_TYPES[t]) for col, t in HISTORY_POINT_SCHEMA.items()}
+        start, count = int(index["start"][i]), int(index["count"][i])
+        return {col: points[col][start:start + count] for col in HISTORY_POINT_SCHEMA}
+
+
+def _market(row: dict) -> Market:
+    tokens = tuple(t for t in (row.pop("yes_token"), row.pop("no_token")) if t is not None)
+    return Market(**row, token_ids=tokens)
+
+
+def read_snapshot(path: Path, kind: Optional[str] = None) -> Snapshot:
+    return Snapshot(path, kind=kind)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench(repeat: int = 5) -> list:
+    """
+    Compare each JSON data file with its snapshot: bytes on disk, full load,
+    and reading one numeric column (what the signal pass needs).
+    """
+    from market_store import MARKET_CACHE_FILE
+    from strategies import SIGNALS_FILE
+
+    results = []
+    if MARKET_CACHE_FILE.exists():
+        cache = json.loads(MARKET_CACHE_FILE.read_text())
+        path = write_markets(cache.get("markets", {}).values(), DATA_DIR / "bench_markets.snap")
+        results.append({
+            "file": MARKET_CACHE_FILE.name,
+            "records": len(cache.get("markets", {})),
+            "json_bytes": MARKET_CACHE_FILE.stat().st_size,
+            "snapshot_bytes": path.stat().st_size,
+            # Both sides end in the Market records every module works with
+            "json_load_s": _best_of(lambda: [Market.from_dict(m) for m in
+                                             json.loads(MARKET_CACHE_FILE.read_text())["markets"].values()], repeat),
+            "snapshot_load_s": _best_of(lambda: read_snapshot(path).markets(), repeat),
+            "json_column_s": _best_of(lambda: np.array(
+                [m["liquidity"] for m in json.loads(MARKET_CACHE_FILE.read_text())["markets"].values()]), repeat),
+            "snapshot_column_s": _best_of(lambda: read_snapshot(path)["markets"]["liquidity"].sum(), repeat),
+            "snapshot_lookup_s": _best_of(lambda: read_snapshot(path).market(next(iter(cache["markets"]))), repeat),
+        })
+        path.unlink()
+    if SIGNALS_FILE.exists():
+        signals = json.loads(SIGNALS_FILE.read_text())
+        path = write_signals(signals, DATA_DIR / "bench_signals.snap")
+        results.append({
+            "file": SIGNALS_FILE.name,
+            "records": sum(len(v) for v in signals.values() if isinstance(v, list)),
+            "json_bytes": SIGNALS_FILE.stat().st_size,
+            "snapshot_bytes": path.stat().st_size,
+            "json_load_s": _best_of(lambda: json.loads(SIGNALS_FILE.read_text()), repeat),
+            "snapshot_load_s": _best_of(lambda: read_snapshot(path).signals(), repeat),
+        })
+        path.unlink()
+    return results
+
+
+def print_bench(results: list):
+    print(f"\n{'file':<22} {'records':>8} {'json KB':>9} {'snap KB':>9} {'size':>6} "
+          f"{'json load':>10} {'snap load':>10} {'one column':>16} {'one record':>11}")
+    for r in results:
+        column = lookup = ""
+        if "json_column_s" in r:
+            column = f"{r['json_column_s'] * 1e3:.1f}->{r['snapshot_column_s'] * 1e3:.2f}ms"
+            lookup = f"{r['snapshot_lookup_s'] * 1e3:.2f}ms"
+        print(f"{r['file']:<22} {r['records']:>8} {r['json_bytes'] / 1024:>9.1f} {r['snapshot_bytes'] / 1024:>9.1f} "
+              f"{r['snapshot_bytes'] / r['json_bytes']:>6.0%} {r['json_load_s'] * 1e3:>8.2f}ms "
+              f"{r['snapshot_load_s'] * 1e3:>8.2f}ms {column:>16} {lookup:>11}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Binary market/signal/history snapshots")
+    parser.add_argument("--export", choices=list(SCHEMA_VERSIONS), help="Write a snapshot")
+    parser.add_argument("--out", help="Output path (default: data/<kind>.snap)")
+    parser.add_argument("--show", help="Print a snapshot's header and first rows")
+    parser.add_argument("--bench", action="store_true", help="Compare with the JSON data files")
+    parser.add_argument("--json", action="store_true", help="Print --bench results as JSON")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+
+    if args.export:
+        default = {"markets": MARKETS_SNAPSHOT, "signals": SIGNALS_SNAPSHOT, "history": HISTORY_SNAPSHOT}
+        out = Path(args.out) if args.out else default[args.export]
+        started = time.perf_counter()
+        if args.export == "markets":
+            from market_store import get_store
+            path = write_markets(get_store().all_markets().values(), out)
+        elif args.export == "signals":
+            from strategies import SIGNALS_FILE
+            path = write_signals(json.loads(SIGNALS_FILE.read_text()), out)
+        else:
+            path = write_history(path=out)
+        print(f"Wrote {path} ({path.stat().st_size / 1024:.1f} KB) in {time.perf_counter() - started:.2f}s")
+    elif args.show:
+        snap = read_snapshot(args.show)
+        print(f"{snap.path}: {snap.kind} (schema v{snap.schema})")
+        for key, value in snap.meta.items():
+            print(f"   {key}: {value}")
+        for name, table in snap.tables.items():
+            print(f"\n{name}: {len(table)} rows")
+            for i in range(min(len(table), 3)):
+                print(f"   {table.row(i)}")
+    elif args.bench:
+        results = bench()
+        if args.json:
+            print(json.dumps(results, indent=2))
+        else:
+            print_bench(results)
+    else:
+        parser.print_help()
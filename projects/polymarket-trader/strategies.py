@@ -6,183 +6,306 @@ Identifies potential mispriced markets using various signals.
 
 import json
 import re
+import time
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 from typing import Optional
-import requests
+
+import numpy as np
+
+import metrics
+from market_data import DEFAULT_WORKERS, fetch_market_quotes
+from market_record import as_markets
+from market_store import get_store
+from market_stream import live_quotes
+from market_universe import MarketUniverse
+from tagging import get_tagger
 
 WORKSPACE = Path(__file__).parent.parent.parent
 DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
 SIGNALS_FILE = DATA_DIR / "signals.json"
-MARKET_CACHE_FILE = DATA_DIR / "market_cache.json"
-
-
-def load_json(path: Path) -> dict:
-    if path.exists():
-        return json.loads(path.read_text())
-    return {}
 
 
 def save_json(path: Path, data: dict):
     path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, indent=2))
+    with metrics.stage("file.write", file=path.name):
+        path.write_text(json.dumps(data, indent=2))
 
 
 def utcnow() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+class Signal:
+    """
+    A registered signal.
+    
+    `score(universe, now, **params)` returns (keys, build): one sort key per
+    candidate, in market order (higher ranks first), and build(j, key) which
+    turns candidate j into its result dict.
+    """
+    
+    def __init__(self, key: str, score, top_k: Optional[int], params: dict):
+        self.key = key
+        self.score = score
+        self.top_k = top_k
+        self.params = params
+
+
+SIGNAL_REGISTRY = {}
+
+
+def register_signal(key: str, top_k: Optional[int] = None, **params):
+    """Register a signal scorer under its analyze_all key, with default params."""
+    def decorator(score):
+        SIGNAL_REGISTRY[key] = Signal(key, score, top_k, params)
+        return score
+    return decorator
+
+
+def top_k_indices(keys: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """
+    Positions of the k largest keys, best first, ties in original order.
+    
+    Partitions around the k-th key instead of sorting everything, so picking
+    the top k of n costs O(n + k log k).
+    """
+    n = len(keys)
+    if k is None or k >= n:
+        return np.lexsort((np.arange(n), -keys))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    
+    part = np.argpartition(-keys, k - 1)[:k]
+    threshold = keys[part].min()
+    above = np.flatnonzero(keys > threshold)
+    ties = np.flatnonzero(keys == threshold)[:k - len(above)]
+    selected = np.concatenate([above, ties])
+    return selected[np.lexsort((selected, -keys[selected]))]
+
+
+@register_signal("extreme_prices", top_k=20, min_liquidity=10000, min_price=0.01, max_price=0.15)
+def score_extreme_prices(
+    u: MarketUniverse,
+    now: float,
+    min_liquidity: float = 10000,
+    min_price: float = 0.01,
+    max_price: float = 0.15
+):
+    """
+    Markets with extreme prices (1-15% by default) that might be mispriced.
+    Extreme prices are where edge is highest if you're right.
+    
+    Strategy: If a market is priced at 5% YES, and you think it's actually 15%,
+    you can 3x your money if right.
+    """
+    liquid = u.liquidity >= min_liquidity
+    
+    # Look for extreme YES prices (undervalued YES) and extreme NO prices (undervalued NO)
+    yes_rows = np.flatnonzero(liquid & (u.yes >= min_price) & (u.yes <= max_price))
+    no_rows = np.flatnonzero(liquid & (u.no >= min_price) & (u.no <= max_price))
+    
+    rows = np.concatenate([yes_rows, no_rows])
+    is_no = np.concatenate([np.zeros(len(yes_rows), bool), np.ones(len(no_rows), bool)])
+    # Market order, YES before NO, so ties rank the way a per-market loop would
+    order = np.lexsort((is_no, rows))
+    rows, is_no = rows[order], is_no[order]
+    prices = np.where(is_no, u.no[rows], u.yes[rows])
+    returns = (1 / prices) - 1  # If wins at $1
+    
+    def build(j: int, key: float) -> dict:
+        i, price = rows[j], float(prices[j])
+        if is_no[j]:
+            signal, reasoning = "EXTREME_LOW_NO", f"NO priced at {price:.1%}. If outcome unlikely, easy profit."
+        else:
+            signal, reasoning = "EXTREME_LOW_YES", f"YES priced at {price:.1%}. If actually >50% likely, massive upside."
+        return {
+            "market_id": u.ids[i],
+            "question": u.questions[i],
+            "signal": signal,
+            "current_price": price,
+            "potential_return": float(key),
+            "liquidity": float(u.liquidity[i]),
+            "volume_24h": float(u.volume[i]),
+            "reasoning": reasoning
+        }
+    
+    return returns, build
+
+
+@register_signal("high_volume", top_k=15, volume_threshold=1000000)
+def score_high_volume(u: MarketUniverse, now: float, volume_threshold: float = 1000000):
+    """Markets with unusually high volume (potential information asymmetry)."""
+    rows = np.flatnonzero(u.volume >= volume_threshold)
+    liquidity = u.liquidity[rows]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vol_to_liq = np.where(liquidity > 0, u.volume[rows] / liquidity, 0.0)
+    
+    def build(j: int, key: float) -> dict:
+        i, volume, ratio = rows[j], float(key), float(vol_to_liq[j])
+        return {
+            "market_id": u.ids[i],
+            "question": u.questions[i],
+            "signal": "HIGH_VOLUME",
+            "volume_24h": volume,
+            "liquidity": float(u.liquidity[i]),
+            "vol_to_liq_ratio": ratio,
+            "yes_price": float(u.yes[i]),
+            "reasoning": f"${volume:,.0f} volume (ratio: {ratio:.1f}x). Smart money moving?"
+        }
+    
+    return u.volume[rows], build
+
+
+@register_signal("resolving_soon", top_k=10, hours_until_resolve=48)
+def score_resolving_soon(u: MarketUniverse, now: float, hours_until_resolve: float = 48):
+    """Markets resolving soon where information edge matters most."""
+    rows = u.expiring_rows(now, now + hours_until_resolve * 3600)
+    hours_left = (u.end_epoch[rows] - now) / 3600
+    
+    def build(j: int, key: float) -> dict:
+        i, h = rows[j], -float(key)
+        return {
+            "market_id": u.ids[i],
+            "question": u.questions[i],
+            "signal": "RESOLVING_SOON",
+            "hours_left": h,
+            "end_date": u.end_dates[i],
+            "yes_price": float(u.yes[i]),
+            "liquidity": float(u.liquidity[i]),
+            "reasoning": f"Resolves in {h:.1f}h. Last chance for edge."
+        }
+    
+    # Soonest first
+    return -hours_left, build
+
+
+@register_signal("political", top_k=15)
+def score_political(u: MarketUniverse, now: float):
+    """Political markets where news might create edge."""
+    # Backtests leave volume NaN where none was recorded; those can't be ranked
+    rows = np.flatnonzero(u.category_mask("politics") & ~np.isnan(u.volume))
+    tagger = get_tagger()
+    
+    def build(j: int, key: float) -> dict:
+        i = rows[j]
+        return {
+            "market_id": u.ids[i],
+            "question": u.questions[i],
+            "signal": "POLITICAL",
+            "yes_price": float(u.yes[i]),
+            "volume_24h": float(key),
+            "liquidity": float(u.liquidity[i]),
+            "keywords": tagger.matches(u.questions[i]).get("politics", [])
+        }
+    
+    return u.volume[rows], build
+
+
 class MarketAnalyzer:
-    """Analyzes markets for trading opportunities."""
+    """
+    Analyzes markets for trading opportunities.
     
-    def __init__(self):
-        self.cache = load_json(MARKET_CACHE_FILE)
-        self.markets = self.cache.get("markets", {})
+    Markets are loaded once into a columnar MarketUniverse. Signals registered
+    with @register_signal are vectorized masks and scores over it; only the
+    top-k hits per signal are ever turned into dicts. Pass `category` to load
+    just one tagged category through the store's tag index.
+    """
     
-    def find_extreme_prices(self, min_liquidity: float = 10000) -> list:
+    def __init__(
+        self,
+        quotes: Optional[dict] = None,
+        stream: bool = True,
+        markets: Optional[dict] = None,
+        category: Optional[str] = None
+    ):
+        tags = None
+        if markets is None:
+            store = get_store()
+            markets = store.by_tag(category) if category else store.all_markets()
+            tags = store.tag_index()
+        self.markets = as_markets(markets)
+        self.universe = MarketUniverse(self.markets, tags=tags)
+        # Prices from a running market_stream daemon beat the last scan
+        if stream:
+            self.apply_quotes(live_quotes())
+        if quotes:
+            self.apply_quotes(quotes)
+    
+    def apply_quotes(self, quotes: dict):
+        """Overlay live YES/NO prices (from market_data.fetch_market_quotes) on the loaded records in place."""
+        for market_id, quote in quotes.items():
+            market = self.markets.get(market_id)
+            if market is not None:
+                market.yes_price = quote["yes_price"]
+                market.no_price = quote["no_price"]
+        self.universe.update_prices(quotes)
+    
+    def refresh_prices(self, workers: int = DEFAULT_WORKERS):
+        """Re-price every cached market from the CLOB in one parallel round."""
+        self.apply_quotes(fetch_market_quotes(self.markets, workers=workers))
+    
+    def run_signal(self, key: str, top_k: Optional[int] = None, now: Optional[float] = None, **params) -> list:
+        """Run one registered signal. top_k=None returns every hit, ranked."""
+        signal = SIGNAL_REGISTRY[key]
+        now = now if now is not None else datetime.now(timezone.utc).timestamp()
+        keys, build = signal.score(self.universe, now, **{**signal.params, **params})
+        return [build(j, keys[j]) for j in top_k_indices(keys, top_k)]
+    
+    def run_signals(self, keys: Optional[list] = None, params: Optional[dict] = None) -> tuple:
         """
-        Find markets with extreme prices (1-10% or 90-99%) that might be mispriced.
-        Extreme prices are where edge is highest if you're right.
+        Run every registered signal (or `keys`) over the universe as one batch,
+        keeping each signal's registered top-k.
         
-        Strategy: If a market is priced at 5% YES, and you think it's actually 15%,
-        you can 3x your money if right.
+        `params` maps signal key -> parameter overrides.
+        Returns ({key: results}, {key: elapsed milliseconds}).
         """
-        opportunities = []
-        
-        for market_id, market in self.markets.items():
-            if market.get("liquidity", 0) < min_liquidity:
-                continue
-            
-            yes_price = market.get("yes_price", 0.5)
-            no_price = market.get("no_price", 0.5)
-            
-            # Look for extreme YES prices (undervalued YES)
-            if 0.01 <= yes_price <= 0.15:
-                opportunities.append({
-                    "market_id": market_id,
-                    "question": market.get("question"),
-                    "signal": "EXTREME_LOW_YES",
-                    "current_price": yes_price,
-                    "potential_return": (1 / yes_price) - 1,  # If wins at $1
-                    "liquidity": market.get("liquidity"),
-                    "volume_24h": market.get("volume_24h"),
-                    "reasoning": f"YES priced at {yes_price:.1%}. If actually >50% likely, massive upside."
-                })
-            
-            # Look for extreme NO prices (undervalued NO) 
-            if 0.01 <= no_price <= 0.15:
-                opportunities.append({
-                    "market_id": market_id,
-                    "question": market.get("question"),
-                    "signal": "EXTREME_LOW_NO",
-                    "current_price": no_price,
-                    "potential_return": (1 / no_price) - 1,
-                    "liquidity": market.get("liquidity"),
-                    "volume_24h": market.get("volume_24h"),
-                    "reasoning": f"NO priced at {no_price:.1%}. If outcome unlikely, easy profit."
-                })
-        
-        return sorted(opportunities, key=lambda x: x["potential_return"], reverse=True)
+        now = datetime.now(timezone.utc).timestamp()
+        params = params or {}
+        results, timings = {}, {}
+        for key in keys or list(SIGNAL_REGISTRY):
+            started = time.perf_counter()
+            results[key] = self.run_signal(key, top_k=SIGNAL_REGISTRY[key].top_k, now=now, **params.get(key, {}))
+            elapsed = time.perf_counter() - started
+            timings[key] = elapsed * 1000
+            metrics.observe("signal_seconds", elapsed, signal=key)
+            metrics.inc("signals_emitted", len(results[key]), signal=key)
+        return results, timings
+    
+    def find_extreme_prices(self, min_liquidity: float = 10000) -> list:
+        """Find markets with extreme prices that might be mispriced (see score_extreme_prices)."""
+        return self.run_signal("extreme_prices", min_liquidity=min_liquidity)
     
     def find_high_volume_movers(self, volume_threshold: float = 1000000) -> list:
-        """
-        Find markets with unusually high volume (potential information asymmetry).
-        """
-        movers = []
-        
-        for market_id, market in self.markets.items():
-            volume = market.get("volume_24h", 0)
-            liquidity = market.get("liquidity", 1)
-            
-            if volume >= volume_threshold:
-                vol_to_liq = volume / liquidity if liquidity > 0 else 0
-                
-                movers.append({
-                    "market_id": market_id,
-                    "question": market.get("question"),
-                    "signal": "HIGH_VOLUME",
-                    "volume_24h": volume,
-                    "liquidity": liquidity,
-                    "vol_to_liq_ratio": vol_to_liq,
-                    "yes_price": market.get("yes_price"),
-                    "reasoning": f"${volume:,.0f} volume (ratio: {vol_to_liq:.1f}x). Smart money moving?"
-                })
-        
-        return sorted(movers, key=lambda x: x["volume_24h"], reverse=True)
+        """Find markets with unusually high volume (potential information asymmetry)."""
+        return self.run_signal("high_volume", volume_threshold=volume_threshold)
     
     def find_time_sensitive(self, hours_until_resolve: int = 48) -> list:
-        """
-        Find markets resolving soon where information edge matters most.
-        """
-        soon = []
-        now = datetime.now(timezone.utc)
-        
-        for market_id, market in self.markets.items():
-            end_date_str = market.get("end_date")
-            if not end_date_str:
-                continue
-            
-            try:
-                # Parse end date
-                end_date = datetime.fromisoformat(end_date_str.replace("Z", "+00:00"))
-                time_left = end_date - now
-                hours_left = time_left.total_seconds() / 3600
-                
-                if 0 < hours_left <= hours_until_resolve:
-                    soon.append({
-                        "market_id": market_id,
-                        "question": market.get("question"),
-                        "signal": "RESOLVING_SOON",
-                        "hours_left": hours_left,
-                        "end_date": end_date_str,
-                        "yes_price": market.get("yes_price"),
-                        "liquidity": market.get("liquidity"),
-                        "reasoning": f"Resolves in {hours_left:.1f}h. Last chance for edge."
-                    })
-            except (ValueError, TypeError):
-                continue
-        
-        return sorted(soon, key=lambda x: x["hours_left"])
+        """Find markets resolving soon where information edge matters most."""
+        return self.run_signal("resolving_soon", hours_until_resolve=hours_until_resolve)
     
     def find_political_opportunities(self) -> list:
-        """
-        Find political markets where news might create edge.
-        """
-        political = []
-        political_keywords = [
-            "trump", "biden", "election", "congress", "senate", 
-            "president", "democrat", "republican", "nomination",
-            "fed", "tariff", "ukraine", "china", "iran"
-        ]
-        
-        for market_id, market in self.markets.items():
-            question = market.get("question", "").lower()
-            
-            if any(kw in question for kw in political_keywords):
-                political.append({
-                    "market_id": market_id,
-                    "question": market.get("question"),
-                    "signal": "POLITICAL",
-                    "yes_price": market.get("yes_price"),
-                    "volume_24h": market.get("volume_24h"),
-                    "liquidity": market.get("liquidity"),
-                    "keywords": [kw for kw in political_keywords if kw in question]
-                })
-        
-        return sorted(political, key=lambda x: x["volume_24h"], reverse=True)
+        """Find political markets where news might create edge."""
+        return self.run_signal("political")
 
 
-def analyze_all() -> dict:
-    """Run all analysis strategies and compile signals."""
-    analyzer = MarketAnalyzer()
+def analyze_all(live: bool = False, workers: int = DEFAULT_WORKERS, category: Optional[str] = None) -> dict:
+    """Run all registered signals and compile them."""
+    with metrics.stage("analyze.load"):
+        analyzer = MarketAnalyzer(category=category)
+    metrics.inc("markets_analyzed", len(analyzer.markets))
+    if live:
+        with metrics.stage("analyze.quotes"):
+            analyzer.refresh_prices(workers=workers)
     
+    with metrics.stage("analyze.signals"):
+        results, timings = analyzer.run_signals()
     signals = {
         "generated_at": utcnow(),
         "total_markets": len(analyzer.markets),
-        "extreme_prices": analyzer.find_extreme_prices()[:20],
-        "high_volume": analyzer.find_high_volume_movers()[:15],
-        "resolving_soon": analyzer.find_time_sensitive()[:10],
-        "political": analyzer.find_political_opportunities()[:15]
+        "category": category,
+        **results,
+        "timings_ms": timings
     }
     
     save_json(SIGNALS_FILE, signals)
@@ -194,6 +317,9 @@ def print_signals(signals: dict):
     print(f"\n{'='*80}")
     print(f"POLYMARKET TRADING SIGNALS - {signals['generated_at'][:19]}")
     print(f"Analyzed {signals['total_markets']} markets")
+    timings = signals.get("timings_ms", {})
+    if timings:
+        print("Signal timings: " + ", ".join(f"{k} {v:.1f}ms" for k, v in timings.items()))
     print(f"{'='*80}\n")
     
     print("🎯 EXTREME PRICES (high potential return):")
@@ -227,7 +353,18 @@ def print_signals(signals: dict):
 
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Polymarket Trading Strategies")
+    parser.add_argument("--live", action="store_true", help="Re-price cached markets from the CLOB first")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent requests for --live")
+    parser.add_argument("--category", help="Only analyze one tagged category (politics, crypto, sports, macro)")
+    metrics.add_cli_args(parser)
+    
+    args = parser.parse_args()
+    metrics.start_cli(args)
+    
     print("Analyzing markets...")
-    signals = analyze_all()
+    signals = analyze_all(live=args.live, workers=args.workers, category=args.category)
     print_signals(signals)
     print(f"\nSignals saved to {SIGNALS_FILE}")
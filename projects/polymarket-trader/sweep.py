@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Polymarket Parameter Sweep
+Grid or random search over signal thresholds, scored by backtest on an
+in-sample window and checked on the out-of-sample window that follows it.
+
+The step-by-market price, volume and liquidity matrices are built once and placed in shared
+memory; pool workers attach to them instead of receiving copies, and each
+task backtests a batch of parameter sets for one signal in a single pass, so
+throughput grows with the number of worker processes.
+
+Usage:
+    python sweep.py                                   # Default grid, all cores
+    python sweep.py --signal extreme_prices --random 200
+    python sweep.py --metric roi --split 0.6 --step 1800 --workers 4
+"""
+
+import itertools
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from backtest import (DEFAULT_BET_SIZE, DEFAULT_STEP, STEP_FIELDS, Backtester, Strategy, closed_on_gamma,
+                      fixed_size, history_markets, infer_resolutions, load_resolutions, price_matrix,
+                      settled_markets)
+from price_history import get_history_store
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+SWEEP_FILE = DATA_DIR / "sweep_results.json"
+
+# Values tried per parameter in a grid search; random search samples within
+# each list's range (log-uniformly for the dollar thresholds).
+SWEEP_SPACE = {
+    "extreme_prices": {
+        "min_liquidity": [1000, 5000, 10000, 25000, 50000],
+        "min_price": [0.01, 0.02, 0.05],
+        "max_price": [0.10, 0.15, 0.20, 0.30],
+    },
+    "high_volume": {
+        "volume_threshold": [100000, 250000, 500000, 1000000, 2000000],
+    },
+    "resolving_soon": {
+        "hours_until_resolve": [6, 12, 24, 48, 96, 168],
+    },
+}
+LOG_PARAMS = {"min_liquidity", "volume_threshold"}
+
+METRICS = {
+    "pnl": lambda r: r["total_pnl"],
+    "roi": lambda r: r["roi"],
+    "win_rate": lambda r: r["win_rate"],
+    # P&L per dollar of worst drawdown
+    "calmar": lambda r: r["total_pnl"] / r["max_drawdown"] if r["max_drawdown"] > 0 else r["total_pnl"],
+}
+
+DEFAULT_SPLIT = 0.7
+
+
+def utcnow() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Parameter sets
+# ---------------------------------------------------------------------------
+
+def grid(space: dict) -> list:
+    """Every combination of a signal's parameter values."""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_sets(space: dict, n: int, seed: Optional[int] = None) -> list:
+    """n parameter sets sampled within each parameter's range."""
+    rng = random.Random(seed)
+    sets = []
+    for _ in range(n):
+        params = {}
+        for key, values in space.items():
+            low, high = min(values), max(values)
+            if key in LOG_PARAMS and low > 0:
+                params[key] = round(math.exp(rng.uniform(math.log(low), math.log(high))), 2)
+            else:
+                params[key] = round(rng.uniform(low, high), 4)
+        sets.append(params)
+    return sets
+
+
+def _valid(signal: str, params: dict) -> bool:
+    return not (signal == "extreme_prices" and params["min_price"] >= params["max_price"])
+
+
+# ---------------------------------------------------------------------------
+# Shared memory
+# ---------------------------------------------------------------------------
+
+def share_arrays(arrays: dict) -> tuple:
+    """Copy arrays into shared memory. Returns (segments, {name: (shm_name, shape, dtype)})."""
+    segments, specs = [], {}
+    for name, array in arrays.items():
+        shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+        segments.append(shm)
+        specs[name] = (shm.name, array.shape, array.dtype.str)
+    return segments, specs
+
+
+# Per-worker state, set once by _init_worker
+_worker = {}
+
+
+def _init_worker(specs: dict, markets: dict, resolutions: dict, step: float):
+    arrays = {}
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        # Keep the segment open for the worker's lifetime
+        _worker.setdefault("segments", []).append(shm)
+        arrays[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    _worker.update(arrays=arrays, markets=markets, resolutions=resolutions, step=step)
+
+
+def _run_batch(signal: str, batch: list, windows: list, bet_size: float) -> list:
+    """Backtest a batch of parameter sets for one signal over each window."""
+    arrays = _worker["arrays"]
+    prices = (arrays["ends"], *(arrays[field] for field in STEP_FIELDS))
+    strategies = [Strategy(f"{signal}#{i}", signal, params=params, sizing=fixed_size(bet_size))
+                  for i, params in enumerate(batch)]
+    by_window = []
+    for start, end in windows:
+        backtester = Backtester(strategies, markets=_worker["markets"], resolutions=_worker["resolutions"],
+                                start=start, end=end, step=_worker["step"], prices=prices)
+        by_window.append(backtester.run()["strategies"])
+    return [[window[s.name] for window in by_window] for s in strategies]
+
+
+# ---------------------------------------------------------------------------
+# Sweep
+# ---------------------------------------------------------------------------
+
+def run_sweep(
+    signals: Optional[list] = None,
+    n_random: Optional[int] = None,
+    metric: str = "pnl",
+    split: float = DEFAULT_SPLIT,
+    step: float = DEFAULT_STEP,
+    workers: Optional[int] = None,
+    bet_size: float = DEFAULT_BET_SIZE,
+    markets: Optional[dict] = None,
+    history=None,
+    resolutions: Optional[dict] = None,
+    seed: Optional[int] = None
+) -> dict:
+    """
+    Score every parameter set on [start, split) and report it on [split, end].
+
+    Returns {"results": [...ranked by in-sample score...], ...run info}.
+    """
+    started = time.perf_counter()
+    history = history or get_history_store()
+    if markets is None:
+        markets = history_markets(history)
+    market_ids = [str(m) for m in markets]
+    if resolutions is None:
+        resolutions = {**infer_resolutions(history, markets), **load_resolutions()}
+
+    columns, first, last = {}, [], []
+    for market_id in market_ids:
+        cols = history.read(market_id)
+        if len(cols["ts"]):
+            columns[market_id] = cols
+            first.append(int(cols["ts"][0]))
+            last.append(int(cols["ts"][-1]))
+    if not columns:
+        return {"error": "No recorded price history"}
+    start, end = min(first), max(last)
+    # Workers have no history to fall back on, so date every resolution here
+    resolutions = {
+        m: (outcome, ts if ts is not None else (int(columns[m]["ts"][-1]) if m in columns else end))
+        for m, (outcome, ts) in resolutions.items() if m in markets
+    }
+
+    ends = np.arange(start + step, end + step, step, dtype=np.float64)
+    matrices = dict(zip(STEP_FIELDS, price_matrix(columns, market_ids, ends, fields=STEP_FIELDS)))
+    cut = start + (end - start) * split
+    windows = [(start, cut), (cut, end)]
+
+    tasks = []
+    for signal in signals or list(SWEEP_SPACE):
+        space = SWEEP_SPACE[signal]
+        sets = random_sets(space, n_random, seed=seed) if n_random else grid(space)
+        tasks.extend((signal, params) for params in sets if _valid(signal, params))
+
+    workers = workers or os.cpu_count() or 1
+    # A few batches per worker keeps every core busy to the end
+    batch_size = max(1, math.ceil(len(tasks) / (workers * 4)))
+    batches = []
+    for signal in dict.fromkeys(s for s, _ in tasks):
+        sets = [p for s, p in tasks if s == signal]
+        batches.extend((signal, sets[i:i + batch_size]) for i in range(0, len(sets), batch_size))
+
+    segments, specs = share_arrays({"ends": ends, **matrices})
+    score = METRICS[metric]
+    results = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(specs, markets, resolutions, step)) as pool:
+            futures = [(signal, batch, pool.submit(_run_batch, signal, batch, windows, bet_size))
+                       for signal, batch in batches]
+            for signal, batch, future in futures:
+                for params, (train, test) in zip(batch, future.result()):
+                    results.append({
+                        "signal": signal,
+                        "params": params,
+                        "in_sample": score(train),
+                        "out_of_sample": score(test),
+                        "in_sample_bets": train["bets"],
+                        "out_of_sample_bets": test["bets"],
+                        "out_of_sample_win_rate": test["win_rate"],
+                        "out_of_sample_max_drawdown": test["max_drawdown"],
+                    })
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+    results.sort(key=lambda r: r["in_sample"], reverse=True)
+    return {
+        "generated_at": utcnow(),
+        "metric": metric,
+        "split_at": cut,
+        "start": start,
+        "end": end,
+        "step_s": step,
+        "markets": len(market_ids),
+        "parameter_sets": len(results),
+        "workers": workers,
+        "elapsed_s": time.perf_counter() - started,
+        "results": results,
+    }
+
+
+def print_sweep(sweep: dict, limit: int = 20):
+    """Print the ranked sweep table."""
+    print(f"\n{'='*100}")
+    print(f"PARAMETER SWEEP ({sweep['metric']}): {sweep['parameter_sets']} sets over "
+          f"{sweep['markets']} markets on {sweep['workers']} workers in {sweep['elapsed_s']:.1f}s")
+    print(f"{'='*100}\n")
+    print(f"{'#':>3} {'signal':<16} {'in-sample':>10} {'out-sample':>11} {'bets':>6} {'oos bets':>9}  params")
+    for i, r in enumerate(sweep["results"][:limit], 1):
+        params = ", ".join(f"{k}={v:g}" for k, v in r["params"].items())
+        print(f"{i:>3} {r['signal']:<16} {r['in_sample']:>10.2f} {r['out_of_sample']:>11.2f} "
+              f"{r['in_sample_bets']:>6} {r['out_of_sample_bets']:>9}  {params}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import metrics
+
+    parser = argparse.ArgumentParser(description="Polymarket signal parameter sweep")
+    parser.add_argument("--signal", action="append", choices=list(SWEEP_SPACE),
+                        help="Signal to sweep (repeatable; default: all)")
+    parser.add_argument("--random", type=int, help="Random search with N sets per signal instead of the grid")
+    parser.add_argument("--seed", type=int, help="Random search seed")
+    parser.add_argument("--metric", choices=list(METRICS), default="pnl", help="Score to rank by")
+    parser.add_argument("--split", type=float, default=DEFAULT_SPLIT, help="In-sample fraction of the history")
+    parser.add_argument("--step", type=float, default=DEFAULT_STEP, help="Seconds between decisions")
+    parser.add_argument("--size", type=float, default=DEFAULT_BET_SIZE, help="Fixed bet size in USDC")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--resolutions", help="Resolutions JSON (default: data/resolutions.json)")
+    parser.add_argument("--check-closed", action="store_true",
+                        help="Ask Gamma which settled-looking markets have closed")
+    parser.add_argument("--limit", type=int, default=20, help="Rows to print")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+
+    history = get_history_store()
+    markets = history_markets(history)
+    closed = closed_on_gamma(settled_markets(history, markets)) if args.check_closed else ()
+    resolutions = {
+        **infer_resolutions(history, markets, closed=closed),
+        **(load_resolutions(args.resolutions) if args.resolutions else load_resolutions()),
+    }
+
+    sweep = run_sweep(signals=args.signal, n_random=args.random, metric=args.metric, split=args.split,
+                      step=args.step, workers=args.workers, bet_size=args.size, markets=markets,
+                      history=history, resolutions=resolutions, seed=args.seed)
+    if "error" in sweep:
+        print(sweep["error"])
+    else:
+        print_sweep(sweep, limit=args.limit)
+        SWEEP_FILE.parent.mkdir(parents=True, exist_ok=True)
+        SWEEP_FILE.write_text(json.dumps(sweep, indent=2))
+        print(f"\nResults saved to {SWEEP_FILE}")
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Polymarket Category Tagging
+Compiles keyword taxonomies (politics, crypto, sports, macro) into a single
+Aho-Corasick automaton, so a market question is tagged in one pass over its
+characters no matter how many keywords there are.
+
+Taxonomies can be overridden with data/taxonomies.json:
+    {"crypto": {"keywords": ["bitcoin", "btc"], "whole_words": true}, ...}
+
+Usage:
+    python tagging.py --tag "Will Bitcoin reach $100k?"   # Tag a question
+    python tagging.py --retag                             # Retag every stored market
+    python tagging.py --stats                             # Markets per category
+"""
+
+import hashlib
+import json
+from collections import deque
+from pathlib import Path
+from typing import Optional
+
+try:
+    import ahocorasick  # optional: pyahocorasick's C automaton
+except ImportError:
+    ahocorasick = None
+
+WORKSPACE = Path(__file__).parent.parent.parent
+DATA_DIR = WORKSPACE / "projects" / "polymarket-trader" / "data"
+TAXONOMY_FILE = DATA_DIR / "taxonomies.json"
+
+# whole_words=False keeps plain substring matching ("fed" matches "federal"),
+# which is how the political signal has always matched.
+DEFAULT_TAXONOMIES = {
+    "politics": {
+        "keywords": [
+            "trump", "biden", "election", "congress", "senate",
+            "president", "democrat", "republican", "nomination",
+            "fed", "tariff", "ukraine", "china", "iran"
+        ],
+        "whole_words": False,
+    },
+    "crypto": {
+        "keywords": [
+            "bitcoin", "btc", "ethereum", "eth", "solana", "sol", "xrp",
+            "cardano", "ada", "litecoin", "ltc", "dogecoin", "doge",
+            "crypto", "stablecoin", "microstrategy", "coinbase"
+        ],
+        "whole_words": True,
+    },
+    "sports": {
+        "keywords": [
+            "nba", "nfl", "nhl", "mlb", "mls", "premier league", "champions league",
+            "la liga", "serie a", "bundesliga", "super bowl", "world cup", "stanley cup",
+            "world series", "grand slam", "wimbledon", "ufc", "f1", "grand prix",
+            "olympics", "match", "vs."
+        ],
+        "whole_words": True,
+    },
+    "macro": {
+        "keywords": [
+            "fed", "fomc", "interest rate", "interest rates", "rate cut", "rate hike",
+            "bps", "cpi", "inflation", "jobless claims", "unemployment", "nonfarm",
+            "payrolls", "gdp", "recession", "pmi", "treasury", "yield", "powell",
+            "fed chair"
+        ],
+        "whole_words": True,
+    },
+}
+
+
+def load_taxonomies(path: Path = TAXONOMY_FILE) -> dict:
+    """Taxonomies from data/taxonomies.json, falling back to the defaults."""
+    if Path(path).exists():
+        return json.loads(Path(path).read_text())
+    return DEFAULT_TAXONOMIES
+
+
+def taxonomy_version(taxonomies: dict) -> str:
+    """Stable fingerprint, so stored tags can be checked against the current config."""
+    payload = json.dumps(taxonomies, sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=8).hexdigest()
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over lowercase keywords.
+
+    Each state has goto transitions, a failure link, and the outputs of every
+    keyword ending there (including those inherited through failure links), so
+    all overlapping matches are found in a single scan. Uses pyahocorasick's
+    C implementation when it is installed.
+    """
+
+    def __init__(self, keywords):
+        keywords = list(keywords)
+        self._native = None
+        if ahocorasick is not None and keywords:
+            self._native = ahocorasick.Automaton()
+            for keyword in keywords:
+                self._native.add_word(keyword, keyword)
+            self._native.make_automaton()
+
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for keyword in keywords:
+            self._insert(keyword)
+        self._link()
+
+    def _insert(self, keyword: str):
+        state = 0
+        for ch in keyword:
+            nxt = self.goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[state][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append([])
+            state = nxt
+        if keyword not in self.out[state]:
+            self.out[state].append(keyword)
+
+    def _link(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def find(self, text: str):
+        """Yield (end_index, keyword) for every keyword occurrence in `text`."""
+        if self._native is not None:
+            yield from self._native.iter(text)
+            return
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for keyword in out[state]:
+                    yield i, keyword
+
+
+class Tagger:
+    """Tags text with every taxonomy category whose keywords it contains."""
+
+    def __init__(self, taxonomies: Optional[dict] = None):
+        self.taxonomies = taxonomies if taxonomies is not None else load_taxonomies()
+        self.version = taxonomy_version(self.taxonomies)
+        self.categories = list(self.taxonomies)
+        # keyword -> [(category, whole_words, rank within its taxonomy)]
+        self._targets = {}
+        for category, spec in self.taxonomies.items():
+            for rank, keyword in enumerate(spec["keywords"]):
+                self._targets.setdefault(keyword.lower(), []).append(
+                    (category, spec.get("whole_words", False), rank)
+                )
+        self.automaton = KeywordAutomaton(self._targets)
+
+    def matches(self, text: str) -> dict:
+        """{category: [keywords found]}, keywords in taxonomy order."""
+        text = (text or "").lower()
+        found = {}
+        for end, keyword in self.automaton.find(text):
+            start = end - len(keyword) + 1
+            bounded = (start == 0 or not text[start - 1].isalnum()) and \
+                      (end + 1 == len(text) or not text[end + 1].isalnum())
+            for category, whole_words, rank in self._targets[keyword]:
+                if whole_words and not bounded:
+                    continue
+                found.setdefault(category, {})[keyword] = rank
+        return {c: sorted(kws, key=kws.get) for c, kws in found.items()}
+
+    def tag(self, text: str) -> list:
+        """Categories for `text`, in taxonomy order."""
+        found = self.matches(text)
+        return [c for c in self.categories if c in found]
+
+    def tag_markets(self, markets) -> dict:
+        """{market_id: [categories]} for an iterable of market dicts."""
+        return {m["market_id"]: self.tag(m.get("question")) for m in markets}
+
+
+_tagger: Optional[Tagger] = None
+
+
+def get_tagger() -> Tagger:
+    """Shared tagger, rebuilt if the taxonomy config changed on disk."""
+    global _tagger
+    taxonomies = load_taxonomies()
+    if _tagger is None or _tagger.version != taxonomy_version(taxonomies):
+        _tagger = Tagger(taxonomies)
+    return _tagger
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    import metrics
+    from market_store import get_store
+
+    parser = argparse.ArgumentParser(description="Polymarket category tagging")
+    parser.add_argument("--tag", help="Tag a question and print the matches")
+    parser.add_argument("--retag", action="store_true", help="Retag every stored market")
+    parser.add_argument("--stats", action="store_true", help="Markets per category")
+    metrics.add_cli_args(parser)
+
+    args = parser.parse_args()
+    metrics.start_cli(args)
+
+    if args.tag:
+        print(json.dumps(get_tagger().matches(args.tag), indent=2))
+    elif args.retag:
+        started = time.perf_counter()
+        tagged = get_store().retag(get_tagger())
+        print(f"Retagged {tagged} markets in {time.perf_counter() - started:.3f}s")
+    elif args.stats:
+        store = get_store()
+        for category in get_tagger().categories:
+            print(f"  {category}: {len(store.ids_with_tag(category))} markets")
+    else:
+        parser.print_help()